@@ -5,7 +5,14 @@ from dotenv import load_dotenv
 from datetime import timedelta
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+
+def cors_headers(origin=None):
+    return {
+        "Access-Control-Allow-Origin": origin or "http://localhost:5173",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Methods": "GET,POST,PUT,PATCH,DELETE,OPTIONS",
+        "Access-Control-Allow-Credentials": "true"
+    }
 
 def create_app():
     print("✅ create_app() executed")
@@ -13,15 +20,28 @@ def create_app():
 
     app = Flask(__name__)
 
+    # === JSON: Decimal-aware, orjson-backed serialization of DynamoDB items ===
+    from app.utils.json_provider import DynamoJSONProvider
+    app.json = DynamoJSONProvider(app)
+
+    # === Metrics: per-route latency histograms, Prometheus text on /metrics (registered first so it times the other hooks) ===
+    from app.utils.request_metrics import init_request_metrics
+    init_request_metrics(app)
+
+    # === Reads: per-request memo for app.services.reads ===
+    from app.services.reads import init_read_memo
+    init_read_memo(app)
+
+    # === Compression: br / gzip for JSON bodies above COMPRESS_MIN_BYTES ===
+    from app.utils.compression import init_compression
+    init_compression(app)
+
     # === CORS Setup ===
     CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
 
     @app.after_request
     def apply_cors_headers(response):
-        response.headers["Access-Control-Allow-Origin"] = request.headers.get("Origin", "http://localhost:5173")
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization"
-        response.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,PATCH,DELETE,OPTIONS"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers.update(cors_headers(request.headers.get("Origin")))
         return response
 
     # === JWT Configuration ===
@@ -29,15 +49,23 @@ def create_app():
     app.config['JWT_TOKEN_LOCATION'] = ['headers']
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv("JWT_EXPIRE_MINUTES", 60)))
 
-    JWTManager(app)
+    jwt = JWTManager(app)
+
+    # Optional LRU of verified token claims (0 disables it)
+    claims_cache_size = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", 0))
+    if claims_cache_size:
+        from app.utils.role_utils import install_claims_cache
+        install_claims_cache(jwt, claims_cache_size)
 
-    # === Logging ===
-    log_path = 'flask_app.log'
-    handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=3)
-    logging.basicConfig(handlers=[handler], level=logging.INFO,
-                        format='%(asctime)s [%(levelname)s] %(message)s')
+    # === Logging: JSON lines with a request id, written by a background thread ===
+    from app.utils.logs import init_logging
+    init_logging(app)
     logging.info("🚀 Flask app initialized")
 
+    # === Rate limiting (429) per identity and role, admission control (503) per process ===
+    from app.utils.rate_limit import init_rate_limit
+    init_rate_limit(app)
+
     # === Health Routes ===
     @app.route("/health")
     def health():
@@ -53,12 +81,14 @@ def create_app():
     from app.routes.delivery import delivery_bp
     from app.routes.auth import auth_bp
     from app.routes.admin import admin_bp
+    from app.routes.events import events_bp
 
     app.register_blueprint(customer_bp, url_prefix="/customer")
     app.register_blueprint(restaurant_bp, url_prefix="/restaurant")
     app.register_blueprint(delivery_bp, url_prefix="/delivery")
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(events_bp, url_prefix="/events")
 
     logging.info("✅ All blueprints registered")
     return app
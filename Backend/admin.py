@@ -1,37 +1,42 @@
 from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.utils.role_utils import role_required
+from flask_jwt_extended import get_jwt_identity
+from app.utils.role_utils import jwt_required, role_required
+from app.utils.rate_limit import rate_cost
 from app.services.db import users_table, orders_table
+from app.services.parallel_scan import parallel_scan
+from app.services.metrics import snapshot
+from app.utils.pagination import list_response
+from functools import partial
 import logging
 
 admin_bp = Blueprint("admin", __name__)
 
 # ✅ Get all users
 @admin_bp.route("/users", methods=["GET"])
+@rate_cost(20)
 @jwt_required()
 @role_required("admin")
 def get_all_users():
     admin = get_jwt_identity()
     try:
-        response = users_table.scan()
-        logging.info(f"👤 Admin '{admin}' viewed all users.")
-        return jsonify(response.get("Items", [])), 200
+        logging.info("👤 Admin '%s' viewed all users.", admin)
+        return list_response(users_table.scan, all_items=partial(parallel_scan, users_table))
     except Exception as e:
-        logging.error(f"❌ Admin '{admin}' failed to fetch users: {str(e)}")
+        logging.error("❌ Admin '%s' failed to fetch users: %s", admin, e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Get all orders
 @admin_bp.route("/orders", methods=["GET"])
+@rate_cost(20)
 @jwt_required()
 @role_required("admin")
 def get_all_orders():
     admin = get_jwt_identity()
     try:
-        response = orders_table.scan()
-        logging.info(f"📦 Admin '{admin}' viewed all orders.")
-        return jsonify(response.get("Items", [])), 200
+        logging.info("📦 Admin '%s' viewed all orders.", admin)
+        return list_response(orders_table.scan, all_items=partial(parallel_scan, orders_table))
     except Exception as e:
-        logging.error(f"❌ Admin '{admin}' failed to fetch orders: {str(e)}")
+        logging.error("❌ Admin '%s' failed to fetch orders: %s", admin, e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Delete a user by username
@@ -42,10 +47,10 @@ def delete_user(username):
     admin = get_jwt_identity()
     try:
         users_table.delete_item(Key={"username": username})
-        logging.info(f"🗑️ Admin '{admin}' deleted user '{username}'.")
+        logging.info("🗑️ Admin '%s' deleted user '%s'.", admin, username)
         return jsonify({"message": f"🗑️ User '{username}' deleted successfully"}), 200
     except Exception as e:
-        logging.error(f"❌ Admin '{admin}' failed to delete user '{username}': {str(e)}")
+        logging.error("❌ Admin '%s' failed to delete user '%s': %s", admin, username, e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Delete an order by order_id
@@ -56,17 +61,24 @@ def delete_order(order_id):
     admin = get_jwt_identity()
     try:
         orders_table.delete_item(Key={"order_id": order_id})
-        logging.info(f"🗑️ Admin '{admin}' deleted order '{order_id}'.")
+        logging.info("🗑️ Admin '%s' deleted order '%s'.", admin, order_id)
         return jsonify({"message": f"🗑️ Order '{order_id}' deleted successfully"}), 200
     except Exception as e:
-        logging.error(f"❌ Admin '{admin}' failed to delete order '{order_id}': {str(e)}")
+        logging.error("❌ Admin '%s' failed to delete order '%s': %s", admin, order_id, e)
         return jsonify({"error": str(e)}), 500
 
+# ✅ Runtime metrics (cache hit ratios, ...)
+@admin_bp.route("/metrics", methods=["GET"])
+@jwt_required()
+@role_required("admin")
+def get_metrics():
+    return jsonify(snapshot()), 200
+
 # ✅ Admin test route
 @admin_bp.route("/test", methods=["GET"])
 @jwt_required()
 @role_required("admin")
 def test_admin():
     admin = get_jwt_identity()
-    logging.info(f"🛡️ Admin test route accessed by '{admin}'.")
+    logging.info("🛡️ Admin test route accessed by '%s'.", admin)
     return jsonify({"message": "✅ Admin route access confirmed!"}), 200
@@ -0,0 +1,113 @@
+# app/services/aio_db.py
+"""
+Non-blocking DynamoDB access for the async serving mode.
+
+With aioboto3 installed, table calls go through its native asyncio client;
+otherwise each call runs on the pooled boto3 client (app.services.aws) in a
+dedicated thread pool, so the event loop never waits on the network either
+way. `run_sync` is the same escape hatch for the other blocking helpers
+(catalog cache loads, order intake, the outbox).
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+from app.services.aws import MAX_POOL_CONNECTIONS, client_config
+from app.services.db import orders_table
+
+try:
+    import aioboto3
+except ImportError:  # optional: thread-pool fallback below
+    aioboto3 = None
+
+THREADS = int(os.getenv("AIO_DB_THREADS", MAX_POOL_CONNECTIONS))
+USE_AIOBOTO3 = os.getenv("AIO_DB_NATIVE", "true").lower() == "true"
+
+executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="aio-db")
+_native = None          # aioboto3 DynamoDB resource, opened by `open()`
+_native_tables = {}
+_stack = None
+
+
+async def run_sync(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args, **kwargs))
+
+
+async def open():
+    """Open the native aioboto3 resource (ASGI lifespan startup); a no-op without aioboto3."""
+    global _native, _stack
+    if aioboto3 is None or not USE_AIOBOTO3 or _native is not None:
+        return
+    _stack = AsyncExitStack()
+    _native = await _stack.enter_async_context(aioboto3.Session().resource("dynamodb", config=client_config()))
+
+
+async def close():
+    global _native, _stack
+    if _stack is not None:
+        await _stack.aclose()
+    _native, _stack = None, None
+    _native_tables.clear()
+
+
+class AsyncTable:
+    """Awaitable counterpart of a boto3 Table with the same call signatures."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @property
+    def name(self):
+        return self.table.name
+
+    async def _call(self, operation, **params):
+        if _native is not None:
+            native = _native_tables.get(self.name)
+            if native is None:
+                native = _native_tables[self.name] = await _native.Table(self.name)
+            return await getattr(native, operation)(**params)
+        return await run_sync(getattr(self.table, operation), **params)
+
+    async def get_item(self, **params):
+        return await self._call("get_item", **params)
+
+    async def put_item(self, **params):
+        return await self._call("put_item", **params)
+
+    async def update_item(self, **params):
+        return await self._call("update_item", **params)
+
+    async def query(self, **params):
+        return await self._call("query", **params)
+
+    async def scan(self, **params):
+        return await self._call("scan", **params)
+
+
+async def query_all(table, **params):
+    """Async `db.query_all`: follow LastEvaluatedKey until every matching item is read."""
+    items = []
+    while True:
+        response = await table.query(**params)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+async def fetch_page(table, limit, start_key=None, **params):
+    """Async `pagination.fetch_page` on a decoded start key: (items, last_evaluated_key)."""
+    items = []
+    while True:
+        params["Limit"] = limit - len(items)
+        if start_key:
+            params["ExclusiveStartKey"] = start_key
+        response = await table.query(**params)
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key or len(items) >= limit:
+            return items, start_key
+
+
+orders = AsyncTable(orders_table)
@@ -0,0 +1,376 @@
+# app/utils/asgi.py
+"""
+Minimal ASGI plumbing for the async serving mode (see app.routes.async_api).
+
+`AsgiApp` dispatches HTTP requests to async handlers registered on a
+`Router`; anything the router does not know (or a handler hands back with
+`FALLBACK`) is served by the regular Flask app through `WsgiFallback`, so the
+async mode exposes exactly the same URL surface. Responses are serialized
+with the Flask app's JSON provider to keep bodies byte-for-byte identical.
+Async handlers are rate limited and admission-controlled like the Flask
+routes they shadow, at the same token cost (app.utils.rate_limit).
+"""
+import asyncio
+import io
+import json
+import re
+import sys
+import time
+from functools import partial, wraps
+from urllib.parse import parse_qs
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+from app.utils.compression import compressible, negotiate, weak_etag
+from app.utils.rate_limit import (
+    CHARGED_ENVIRON_KEY, RATE_LIMIT_ENABLED, admission, client_key, endpoint_cost, limiter, rate_limited_requests,
+    server_busy, shed_requests, too_many_requests
+)
+from app.utils.request_metrics import request_seconds
+from app.utils.logs import request_id, new_request_id
+
+FALLBACK = object()   # handler result meaning "let the WSGI app answer this one"
+
+
+class Request:
+    def __init__(self, scope, body, params):
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.body = body
+        self.params = params
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        self.args = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        self.identity = None
+        self.claims = {}
+        self.auth = None          # (claims, error response), see AsgiApp.authenticate
+        self.charged = self.admitted = False
+
+    def get_json(self):
+        if not self.body:
+            return None
+        return json.loads(self.body)
+
+
+class Response:
+    def __init__(self, body=b"", status=200, headers=None, content_type="application/json"):
+        self.body = body if isinstance(body, bytes) else body.encode()
+        self.status = status
+        self.headers = dict(headers or {})
+        if content_type and self.body:
+            self.headers.setdefault("Content-Type", content_type)
+
+    def compress(self, accept_encoding):
+        """Same negotiation as the Flask app (app.utils.compression)."""
+        content_type = self.headers.get("Content-Type")
+        if not compressible(content_type):
+            return
+        self.headers["Vary"] = "Accept-Encoding"
+        if 200 <= self.status and self.status not in (204, 304):
+            self.body, coding = negotiate(self.body, content_type, accept_encoding)
+            if coding is not None:
+                self.headers["Content-Encoding"] = coding
+                if "ETag" in self.headers:
+                    self.headers["ETag"] = weak_etag(self.headers["ETag"])
+
+    def _raw_headers(self):
+        return [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in self.headers.items()]
+
+    async def send(self, send, receive=None):
+        headers = self._raw_headers()
+        headers.append((b"content-length", str(len(self.body)).encode()))
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class StreamingResponse(Response):
+    """Body sent chunk by chunk from an async iterator (e.g. Server-Sent Events) until it ends or the client leaves."""
+
+    def __init__(self, chunks, status=200, headers=None, content_type="text/event-stream; charset=utf-8"):
+        super().__init__(b"", status, headers, content_type=None)
+        self.headers.setdefault("Content-Type", content_type)
+        self.chunks = chunks
+
+    def compress(self, accept_encoding):
+        pass    # streamed bodies are sent as they are, like the Flask app's
+
+    async def send(self, send, receive=None):
+        await send({"type": "http.response.start", "status": self.status, "headers": self._raw_headers()})
+        # The request body is already read, so the next message is the client disconnecting
+        disconnected = asyncio.ensure_future(receive()) if receive is not None else None
+        try:
+            async for chunk in self.chunks:
+                if disconnected is not None and disconnected.done():
+                    return
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        except OSError:
+            pass    # client went away mid-write
+        finally:
+            if disconnected is not None:
+                disconnected.cancel()
+            await self.chunks.aclose()
+
+
+class Router:
+    def __init__(self):
+        self.routes = []
+
+    def route(self, path, methods=("GET",)):
+        pattern = re.compile("^" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", path) + "$")
+
+        def register(handler):
+            self.routes.append((pattern, frozenset(methods), handler, path))
+            return handler
+        return register
+
+    def match(self, method, path):
+        """(handler, path parameters, route template), or Nones when no route matches."""
+        for pattern, methods, handler, template in self.routes:
+            if method in methods:
+                found = pattern.match(path)
+                if found:
+                    return handler, found.groupdict(), template
+        return None, None, None
+
+
+# === JWT (verified by flask_jwt_extended itself: same config, callbacks and error bodies) ===
+def auth_required(allowed_roles=None):
+    """Async counterpart of @jwt_required() + @role_required(...); sets request.identity / claims."""
+    if isinstance(allowed_roles, str):
+        allowed_roles = [allowed_roles]
+    allowed_roles = frozenset(allowed_roles) if allowed_roles else None
+
+    def wrapper(handler):
+        @wraps(handler)
+        async def decorator(app, request, **params):
+            claims, error = app.authenticate(request)
+            if error is not None:
+                return error
+
+            request.claims = claims
+            if allowed_roles is not None and claims.get("role") not in allowed_roles:
+                return app.json({"error": f"❌ Access denied. Role '{claims.get('role')}' not permitted."}, 403)
+            return await handler(app, request, **params)
+        return decorator
+    return wrapper
+
+
+# === WSGI fallback ===
+class WsgiFallback:
+    """Serve one buffered ASGI request with a WSGI app on a worker thread."""
+
+    def __init__(self, wsgi_app, executor=None):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    def _environ(self, scope, body, extra=None):
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+            **(extra or {}),
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[name] = value
+            else:
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _call(self, scope, body, extra=None):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = headers
+
+        result = self.wsgi_app(self._environ(scope, body, extra), start_response)
+        try:
+            chunks = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return started["status"], started["headers"], chunks
+
+    async def __call__(self, scope, body, send, extra=None):
+        """`extra`: entries added to the WSGI environ."""
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(self.executor, self._call, scope, body, extra)
+        raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": chunks})
+
+
+# === Application ===
+class AsgiApp:
+    def __init__(self, flask_app, router, executor=None, on_startup=(), on_shutdown=(), extra_headers=None):
+        self.flask_app = flask_app
+        self.extra_headers = extra_headers   # callable(request) -> dict, e.g. the CORS headers of after_request
+        self.router = router
+        self.fallback = WsgiFallback(flask_app.wsgi_app, executor)
+        # Same formatting as jsonify(): compact unless the provider / debug mode asks for indentation
+        compact = getattr(flask_app.json, "compact", None)
+        pretty = compact is False or (compact is None and flask_app.debug)
+        dumpb = getattr(flask_app.json, "dumpb", None)
+        if dumpb is not None:
+            # Provider encodes straight to bytes (app.utils.json_provider)
+            self.encode = partial(dumpb, indent=2 if pretty else None, newline=True)
+        else:
+            dump_args = {"indent": 2} if pretty else {"separators": (",", ":")}
+            self.encode = lambda body: f"{flask_app.json.dumps(body, **dump_args)}\n".encode()
+        self.on_startup = list(on_startup)
+        self.on_shutdown = list(on_shutdown)
+        self.url_adapter = None
+        self.endpoints = {}       # (method, route template) -> (Flask endpoint, rate limit cost)
+
+    # --- response helpers (mirror jsonify / conditional_json) ---
+    def json(self, body, status=200, headers=None):
+        return Response(self.encode(body), status, headers)
+
+    def conditional_json(self, request, body, entry, status=200):
+        headers = {
+            "ETag": quote_etag(entry.etag),
+            "Last-Modified": http_date(entry.last_modified),
+            "Cache-Control": "no-cache"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = parse_date(request.headers.get("if-modified-since"))
+        if if_none_match:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            not_modified = parse_etags(if_none_match).contains_weak(entry.etag)
+        else:
+            not_modified = bool(if_modified_since and entry.last_modified and entry.last_modified <= if_modified_since)
+        if not_modified:
+            return Response(b"", 304, headers)
+        return self.json(body() if callable(body) else body, status, headers)
+
+    # --- authentication and rate limiting (mirror @jwt_required() and app.utils.rate_limit) ---
+    def _decode_token(self, request):
+        # verify_jwt_in_request in a bare request context: the app's JWT settings, blocklist and
+        # verification callbacks apply, and failures get the app's own JWT error responses
+        header = request.headers.get("authorization")
+        with self.flask_app.test_request_context(headers={"Authorization": header} if header else {}):
+            try:
+                verify_jwt_in_request()
+                request.identity = get_jwt_identity()
+                return dict(get_jwt()), None
+            except Exception as e:
+                error = self.flask_app.make_response(self.flask_app.handle_user_exception(e))
+        return None, Response(error.get_data(), error.status_code, content_type=error.content_type)
+
+    def authenticate(self, request):
+        """(claims, None) for a valid access token, else (None, error response); decoded once per request."""
+        if request.auth is None:
+            request.auth = self._decode_token(request)
+        return request.auth
+
+    def _endpoint(self, request, template):
+        """(endpoint, cost) of the Flask route a handler shadows, looked up once per route."""
+        key = (request.method, template)
+        if key not in self.endpoints:
+            if self.url_adapter is None:
+                self.url_adapter = self.flask_app.url_map.bind("localhost")
+            try:
+                endpoint = self.url_adapter.match(request.path, request.method)[0]
+            except HTTPException:
+                endpoint = None
+            view = self.flask_app.view_functions.get(endpoint)
+            self.endpoints[key] = (endpoint or "<unmatched>", endpoint_cost(endpoint, view))
+        return self.endpoints[key]
+
+    def admit(self, request, template):
+        """None when the request may run (holding an admission slot if it took one), else its 429 / 503."""
+        endpoint, cost = self._endpoint(request, template)
+        if not RATE_LIMIT_ENABLED or not cost:
+            return None
+        claims = self.authenticate(request)[0] if request.headers.get("authorization") else None
+        peer = (request.scope.get("client") or ("", 0))[0]
+        key, role = client_key(claims, peer, request.headers.get("x-forwarded-for"))
+        decision = limiter.take(key, role, cost)
+        request.charged = True
+        if not decision.allowed:
+            rate_limited_requests.inc(1, role, endpoint)
+            body, headers = too_many_requests(decision)
+            return self.json(body, 429, headers)
+        # The event loop must not wait for a slot: without one the request is shed right away
+        if not admission.enter(timeout=0):
+            shed_requests.inc(1, endpoint)
+            body, headers = server_busy()
+            return self.json(body, 503, headers)
+        request.admitted = True
+        return None
+
+    # --- ASGI ---
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            hooks = self.on_startup if message["type"] == "lifespan.startup" else self.on_shutdown
+            try:
+                for hook in hooks:
+                    result = hook()
+                    if asyncio.iscoroutine(result):
+                        await result
+            except Exception as e:
+                await send({"type": f"{message['type']}.failed", "message": str(e)})
+                return
+            await send({"type": f"{message['type']}.complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+
+    async def _read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        started = time.perf_counter()
+        body = await self._read_body(receive)
+        handler, params, template = self.router.match(scope["method"], scope["path"])
+        charged = False
+        if handler is not None:
+            request = Request(scope, body, params)
+            request_id.set(new_request_id(request.headers.get("x-request-id")))
+            response = self.admit(request, template)
+            if response is None:
+                try:
+                    response = await handler(self, request, **params)
+                finally:
+                    if request.admitted:
+                        admission.leave()
+            charged = request.charged
+            if response is not FALLBACK:
+                response.headers["X-Request-ID"] = request_id.get()
+                if self.extra_headers is not None:
+                    response.headers.update(self.extra_headers(request))
+                response.compress(request.headers.get("accept-encoding"))
+                # Same series as the Flask routes (fallback requests are timed by the Flask hooks)
+                request_seconds.observe(time.perf_counter() - started, template, request.method, response.status)
+                return await response.send(send, receive)
+        # A request charged here is not charged again by the Flask hooks
+        await self.fallback(scope, body, send, {CHARGED_ENVIRON_KEY: True} if charged else None)
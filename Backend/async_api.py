@@ -0,0 +1,173 @@
+# app/routes/async_api.py
+"""
+Async (ASGI) serving mode: the hot catalog / order endpoints as coroutines.
+
+Same URLs, status codes and JSON bodies as the Flask blueprints they shadow;
+every other route (and streamed or ?fields= projected list responses) falls
+through to the Flask app. The order event stream (/events/stream) must be
+served here: the WSGI fallback buffers whole responses, and each open stream
+costs a queue instead of a thread. Serve with an ASGI server, e.g.
+`uvicorn asgi:app` from Frontend/.
+"""
+import asyncio
+import logging
+from app import cors_headers
+from app.services import aio_db
+from app.services.aio_db import run_sync
+from app.services.cache import cached_menu_entry, cached_restaurants_entry
+from app.services.order_stats import restaurant_stats
+from app.services.event_hub import (
+    hub, AsyncSubscription, STREAM_HEADERS, STREAM_ROLES, aiter_stream, stream_deadline, user_channel
+)
+from app.services.db import customer_orders_query, restaurant_orders_query
+from app.services.order_intake import place_order, InvalidOrder
+from app.utils.asgi import AsgiApp, Router, StreamingResponse, FALLBACK, auth_required
+from app.utils.pagination import InvalidPageRequest, decode_token, encode_token, is_page_request, page_args
+from app.routes.customer import _notify_restaurant, _with_delivery_defaults
+from app.routes.restaurant import _valid_restaurant, price_orders
+
+router = Router()
+
+
+# ✅ Get all restaurants (customer view)
+@router.route("/customer/restaurants")
+@auth_required("customer")
+async def get_restaurants(app, request):
+    if is_page_request(request.args):
+        return FALLBACK
+    try:
+        logging.info("📍 Restaurants list requested")
+        entry = await run_sync(cached_restaurants_entry)
+        return app.conditional_json(request, {"restaurants": entry.items}, entry)
+    except Exception as e:
+        logging.error("❌ Failed to fetch restaurants: %s", e)
+        return app.json({"error": "Failed to retrieve restaurants"}, 500)
+
+
+# ✅ Fetch all restaurants (restaurant view)
+@router.route("/restaurant/restaurants")
+@auth_required(["restaurant", "customer"])
+async def get_all_restaurants(app, request):
+    if is_page_request(request.args):
+        return FALLBACK
+    try:
+        entry = await run_sync(cached_restaurants_entry)
+        return app.conditional_json(request, lambda: [r for r in entry.items if _valid_restaurant(r)], entry)
+    except Exception as e:
+        return app.json({"error": str(e)}, 500)
+
+
+# ✅ Get menu of a selected restaurant
+@router.route("/customer/menu/<restaurant_id>")
+@auth_required("customer")
+async def get_menu_by_restaurant(app, request, restaurant_id):
+    try:
+        entry = await run_sync(cached_menu_entry, restaurant_id)
+        logging.info("🍽️ Menu fetched for restaurant_id=%s → %s items", restaurant_id, len(entry.items))
+        return app.conditional_json(request, {"menu": entry.items}, entry)
+    except Exception as e:
+        logging.error("❌ Failed to fetch menu for restaurant %s: %s", restaurant_id, e)
+        return app.json({"error": "Failed to retrieve menu"}, 500)
+
+
+# ✅ Get menu for a restaurant (public)
+@router.route("/restaurant/menu/<restaurant_id>")
+async def get_menu(app, request, restaurant_id):
+    try:
+        entry = await run_sync(cached_menu_entry, restaurant_id)
+        return app.conditional_json(request, entry.items, entry)
+    except Exception as e:
+        return app.json({"error": str(e)}, 500)
+
+
+# ✅ Create new order
+@router.route("/customer/order", methods=["POST"])
+@auth_required("customer")
+async def create_order(app, request):
+    try:
+        data = request.get_json()
+        if not data:
+            return app.json({"error": "Missing order data"}, 400)
+
+        customer_id = request.identity
+        logging.info("📨 Creating order for restaurant_id=%s by '%s'", data.get('restaurant_id'), customer_id)
+
+        order = await run_sync(place_order, customer_id, data)
+        logging.info("🛒 Order placed by '%s' → Order ID: %s", customer_id, order['order_id'])
+
+        await run_sync(_notify_restaurant, order)
+        return app.json({"message": "✅ Order placed successfully", "order_id": order["unique_customer_id"]}, 201)
+
+    except InvalidOrder as e:
+        return app.json({"error": str(e)}, 400)
+    except Exception as e:
+        logging.error("❌ Failed to place order: %s", e)
+        return app.json({"error": str(e)}, 500)
+
+
+# ✅ View customer's own orders
+@router.route("/customer/orders")
+@auth_required("customer")
+async def get_orders(app, request):
+    username = request.identity
+    try:
+        limit, next_token, stream = page_args(request.args)
+        if stream or "fields" in request.args:
+            return FALLBACK
+
+        params = customer_orders_query(username)
+        if limit is None:
+            orders = await aio_db.query_all(aio_db.orders, **params)
+            return app.json({"orders": [_with_delivery_defaults(o) for o in orders]})
+
+        orders, last_key = await aio_db.fetch_page(aio_db.orders, limit, decode_token(next_token), **params)
+        token = encode_token(last_key)
+        body = {"orders": [_with_delivery_defaults(o) for o in orders], "next_token": token}
+        return app.json(body, headers={"X-Next-Token": token} if token else None)
+    except InvalidPageRequest as e:
+        return app.json({"error": str(e)}, 400)
+    except Exception as e:
+        logging.error("❌ Error retrieving orders for '%s': %s", username, e)
+        return app.json({"error": str(e)}, 500)
+
+
+# ✅ View orders for restaurant (orders and earnings aggregate are fetched concurrently)
+@router.route("/restaurant/orders")
+@auth_required("restaurant")
+async def view_orders(app, request):
+    try:
+        if "fields" in request.args:
+            return FALLBACK
+        restaurant_id = request.args.get("restaurant_id")
+        if not restaurant_id:
+            return app.json({"error": "Missing restaurant_id in query parameters"}, 400)
+
+        orders, stats = await asyncio.gather(
+            aio_db.query_all(aio_db.orders, **restaurant_orders_query(restaurant_id)),
+            run_sync(restaurant_stats, restaurant_id)
+        )
+        return app.json({"orders": price_orders(orders), "total_earnings": stats["total_earnings"]})
+    except Exception as e:
+        return app.json({"error": str(e)}, 500)
+
+
+# ✅ Live order updates for the signed-in user (Server-Sent Events)
+@router.route("/events/stream")
+@auth_required(list(STREAM_ROLES))
+async def stream_events(app, request):
+    role = request.claims.get("role")
+    subscription = AsyncSubscription(user_channel(role, request.identity), asyncio.get_running_loop())
+    last_event_id = request.headers.get("last-event-id") or request.args.get("last_event_id")
+    missed = hub.subscribe(subscription, last_event_id)
+    logging.info("📡 Event stream opened by '%s' (%s)", request.identity, role)
+    return StreamingResponse(aiter_stream(subscription, missed, stream_deadline(request.claims)), headers=STREAM_HEADERS)
+
+
+def create_asgi_app(flask_app, on_startup=(), on_shutdown=()):
+    """Wrap a Flask app (from `create_app()`) in the async serving mode."""
+    return AsgiApp(
+        flask_app, router, executor=aio_db.executor,
+        on_startup=[aio_db.open, *on_startup],
+        on_shutdown=[*on_shutdown, aio_db.close],
+        extra_headers=lambda request: cors_headers(request.headers.get("origin"))
+    )
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
-from passlib.hash import bcrypt
 from flask_jwt_extended import create_access_token
+from app.utils.rate_limit import rate_cost
+from botocore.exceptions import ClientError
 from app.services.db import users_table
+from app.services.passwords import hash_password, verify_password, PasswordPoolSaturated
 import logging
 
 auth_bp = Blueprint('auth', __name__)
 
+def _saturated(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
 # ✅ REGISTER
 @auth_bp.route('/register', methods=['POST'])
+@rate_cost(5)
 def register():
     data = request.json
     username = data.get('username')
@@ -21,7 +27,7 @@ def register():
     # ✅ Updated to support admin role too
     valid_roles = ['customer', 'restaurant', 'delivery', 'admin']
     if role not in valid_roles:
-        logging.warning(f"Registration failed: Invalid role '{role}'")
+        logging.warning("Registration failed: Invalid role '%s'", role)
         return jsonify({
             "error": f"Invalid role. Must be one of: {', '.join(valid_roles)}"
         }), 400
@@ -30,28 +36,34 @@ def register():
     try:
         existing = users_table.get_item(Key={'username': username})
         if 'Item' in existing:
-            logging.warning(f"Registration failed: Username '{username}' already exists")
+            logging.warning("Registration failed: Username '%s' already exists", username)
             return jsonify({"error": "User already exists"}), 400
     except Exception as e:
-        logging.error(f"DynamoDB error while checking user existence: {str(e)}")
+        logging.error("DynamoDB error while checking user existence: %s", e)
         return jsonify({"error": f"DynamoDB error: {str(e)}"}), 500
 
-    # ✅ Hash password and store user
-    hashed_password = bcrypt.hash(password)
+    # ✅ Hash password (in the password worker pool) and store user
+    try:
+        hashed_password = hash_password(password)
+    except PasswordPoolSaturated as e:
+        logging.warning("Registration deferred for '%s': password pool saturated", username)
+        return _saturated(e)
+
     try:
         users_table.put_item(Item={
             'username': username,
             'password': hashed_password,
             'role': role
         })
-        logging.info(f"User '{username}' registered successfully with role '{role}'")
+        logging.info("User '%s' registered successfully with role '%s'", username, role)
         return jsonify({"message": "✅ User registered successfully"}), 201
     except Exception as e:
-        logging.error(f"Failed to store user '{username}': {str(e)}")
+        logging.error("Failed to store user '%s': %s", username, e)
         return jsonify({"error": f"Failed to store user: {str(e)}"}), 500
 
 # ✅ LOGIN
 @auth_bp.route('/login', methods=['POST'])
+@rate_cost(5)
 def login():
     data = request.json
     username = data.get('username')
@@ -65,21 +77,37 @@ def login():
         response = users_table.get_item(Key={'username': username})
         user = response.get('Item')
 
-        if not user or not bcrypt.verify(password, user['password']):
-            logging.warning(f"Login failed for '{username}': Invalid credentials")
+        matches, new_hash = verify_password(password, user['password']) if user else (False, None)
+        if not matches:
+            logging.warning("Login failed for '%s': Invalid credentials", username)
             return jsonify({"error": "Invalid username or password"}), 401
 
+        # ✅ Stored hash used another bcrypt cost: upgrade it (unless the password changed meanwhile)
+        if new_hash:
+            try:
+                users_table.update_item(
+                    Key={'username': username},
+                    UpdateExpression="SET password = :new",
+                    ConditionExpression="password = :old",
+                    ExpressionAttributeValues={":new": new_hash, ":old": user['password']}
+                )
+            except ClientError as e:
+                logging.warning("Password rehash skipped for '%s': %s", username, e)
+
         access_token = create_access_token(
             identity=username,
             additional_claims={"role": user["role"]}
         )
-        logging.info(f"User '{username}' logged in successfully as '{user['role']}'")
+        logging.info("User '%s' logged in successfully as '%s'", username, user['role'])
         return jsonify({
             "message": "✅ Login successful",
             "token": access_token,
             "role": user["role"]
         }), 200
 
+    except PasswordPoolSaturated as e:
+        logging.warning("Login deferred for '%s': password pool saturated", username)
+        return _saturated(e)
     except Exception as e:
-        logging.error(f"Login failed for '{username}': {str(e)}")
+        logging.error("Login failed for '%s': %s", username, e)
         return jsonify({"error": f"Login failed: {str(e)}"}), 500
@@ -0,0 +1,281 @@
+# app/services/aws.py
+"""
+Shared boto3 clients, created once per process with a tuned HTTP pool.
+
+The default botocore config gives every client 10 pooled connections, legacy
+retries and a 60 s read timeout; with a threaded server the pool runs dry and
+requests queue behind it or open throwaway connections. Clients built here
+get a pool sized for the worker threads, short connect / read timeouts,
+`adaptive` retries (client-side throttling backoff) and TCP keepalive.
+
+Clients are not fork-safe, so nothing is created at import: `client()` /
+`resource()` build on first use in each process (e.g. after gunicorn forks
+its workers), and `table()` / `lazy_client()` return proxies that resolve
+through them on every attribute access.
+
+Every client is also timed per call (`CallTimer`): a latency histogram by
+service, operation and table, error counts by code and, for DynamoDB, the
+consumed capacity (ReturnConsumedCapacity is requested on every call that
+supports it, unless AWS_RETURN_CONSUMED_CAPACITY=NONE) and the items scanned
+vs. returned, all exposed on /metrics.
+"""
+import logging
+import os
+import threading
+import time
+import boto3
+from botocore.config import Config
+from app.services.metrics import register_collector, histogram, counter
+
+REGION = os.getenv("AWS_REGION", "eu-north-1")
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 50))
+CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", 2))
+READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", 5))
+RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", 5))
+TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+RETURN_CONSUMED_CAPACITY = os.getenv("AWS_RETURN_CONSUMED_CAPACITY", "TOTAL").upper()
+
+THROTTLE_CODES = {
+    "ThrottlingException", "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded", "Throttling", "TooManyRequestsException"
+}
+
+
+# Called (no arguments) on every throttled attempt, e.g. by admission control (app.utils.rate_limit)
+throttle_listeners = []
+
+
+def client_config(**overrides):
+    settings = {
+        "region_name": REGION,
+        "max_pool_connections": MAX_POOL_CONNECTIONS,
+        "connect_timeout": CONNECT_TIMEOUT,
+        "read_timeout": READ_TIMEOUT,
+        "retries": {"mode": RETRY_MODE, "max_attempts": MAX_ATTEMPTS},
+        "tcp_keepalive": TCP_KEEPALIVE,
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+
+class CallStats:
+    """Pool utilization and retry counters for one service, fed by botocore events."""
+
+    def __init__(self, pool_size):
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.in_flight = self.peak_in_flight = 0
+        self.calls = self.attempts = self.throttled = self.transport_errors = 0
+
+    def _before_call(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+
+    def _before_send(self, **kwargs):
+        with self.lock:
+            self.attempts += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _response_received(self, exception=None, parsed_response=None, **kwargs):
+        code = ((parsed_response or {}).get("Error") or {}).get("Code")
+        with self.lock:
+            self.in_flight -= 1
+            if exception is not None:
+                self.transport_errors += 1
+            elif code in THROTTLE_CODES:
+                self.throttled += 1
+        if code in THROTTLE_CODES:
+            for listener in throttle_listeners:
+                listener()
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register("before-call", self._before_call)
+        events.register("before-send", self._before_send)
+        events.register("response-received", self._response_received)
+        return client
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "pool_utilization": round(self.peak_in_flight / self.pool_size, 2) if self.pool_size else None,
+                "calls": self.calls,
+                "retries": self.attempts - self.calls,
+                "throttled": self.throttled,
+                "transport_errors": self.transport_errors
+            }
+
+
+call_seconds = histogram("aws_call_duration_seconds", "AWS API call latency, retries included", ("service", "operation", "table"))
+call_errors = counter("aws_call_errors", "AWS API calls that failed, by error code", ("service", "operation", "code"))
+consumed_capacity = counter("dynamodb_consumed_capacity_units", "DynamoDB capacity units consumed", ("operation", "table"))
+items_scanned = counter("dynamodb_items_scanned", "Items DynamoDB read for Scan / Query (before filters)", ("operation", "table"))
+items_returned = counter("dynamodb_items_returned", "Items Scan / Query returned (after filters)", ("operation", "table"))
+
+
+def _table_of(params):
+    if "TableName" in params:
+        return params["TableName"]
+    tables = params.get("RequestItems") or ()
+    if len(tables) == 1:
+        return next(iter(tables))
+    return "multiple" if tables or "TransactItems" in params else ""
+
+
+class CallTimer:
+    """Per-call latency, errors and DynamoDB capacity / item counts, fed by botocore events."""
+
+    def _before_parameter_build(self, params, model, context, **kwargs):
+        service = model.service_model.service_name
+        context["metrics"] = (time.perf_counter(), service, model.name, _table_of(params))
+        if (service == "dynamodb" and RETURN_CONSUMED_CAPACITY != "NONE"
+                and "ReturnConsumedCapacity" not in params and "ReturnConsumedCapacity" in model.input_shape.members):
+            params["ReturnConsumedCapacity"] = RETURN_CONSUMED_CAPACITY
+
+    def _after_call(self, parsed, context, **kwargs):
+        started, service, operation, table = context["metrics"]
+        call_seconds.observe(time.perf_counter() - started, service, operation, table)
+        code = (parsed.get("Error") or {}).get("Code")
+        if code:
+            call_errors.inc(1, service, operation, code)
+        elif service == "dynamodb":
+            capacity = parsed.get("ConsumedCapacity")
+            for used in capacity if isinstance(capacity, list) else [capacity] if capacity else ():
+                consumed_capacity.inc(used.get("CapacityUnits", 0), operation, used.get("TableName", table))
+            if "ScannedCount" in parsed:
+                items_scanned.inc(parsed["ScannedCount"], operation, table)
+                items_returned.inc(parsed.get("Count", 0), operation, table)
+
+    def _after_call_error(self, exception, context, **kwargs):
+        # No response at all (connection / timeout errors, after the retries)
+        started, service, operation, table = context["metrics"]
+        call_seconds.observe(time.perf_counter() - started, service, operation, table)
+        call_errors.inc(1, service, operation, type(exception).__name__)
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register("before-parameter-build", self._before_parameter_build)
+        events.register("after-call", self._after_call)
+        events.register("after-call-error", self._after_call_error)
+        return client
+
+
+call_timer = CallTimer()
+
+
+class _PoolFullCounter(logging.Filter):
+    """Counts urllib3's "Connection pool is full, discarding connection" (more threads than pooled sockets)."""
+
+    def __init__(self):
+        super().__init__()
+        self.discards = 0
+
+    def filter(self, record):
+        if record.getMessage().startswith("Connection pool is full"):
+            self.discards += 1
+        return True
+
+
+pool_full = _PoolFullCounter()
+logging.getLogger("urllib3.connectionpool").addFilter(pool_full)
+
+
+# === Per-process registry ===
+_lock = threading.Lock()
+_pid = None
+_session = None
+_clients = {}
+_resources = {}
+_call_stats = {}
+
+
+def _reset():
+    global _pid, _session
+    _pid = os.getpid()
+    _session = boto3.session.Session()
+    _clients.clear()
+    _resources.clear()
+    _call_stats.clear()
+
+
+def _ensure_process():
+    # Caller holds _lock; a forked child inherits the parent's registry and must not reuse its sockets
+    if _pid != os.getpid():
+        _reset()
+
+
+def _stats_for(service):
+    if service not in _call_stats:
+        _call_stats[service] = CallStats(MAX_POOL_CONNECTIONS)
+    return _call_stats[service]
+
+
+def client(service):
+    """The process-wide low-level client for `service`."""
+    with _lock:
+        _ensure_process()
+        if service not in _clients:
+            created = call_timer.attach(_session.client(service, config=client_config()))
+            _clients[service] = _stats_for(service).attach(created)
+        return _clients[service]
+
+
+def resource(service):
+    """The process-wide boto3 resource for `service` (its client is instrumented like `client()`)."""
+    with _lock:
+        _ensure_process()
+        if service not in _resources:
+            created = _session.resource(service, config=client_config())
+            _stats_for(f"{service}.resource").attach(call_timer.attach(created.meta.client))
+            _resources[service] = created
+        return _resources[service]
+
+
+class _ProcessLocal:
+    """Attribute proxy over an object built lazily in each process."""
+
+    def __init__(self, build, label):
+        self._build = build
+        self._label = label
+        self._pid = None
+        self._target = None
+
+    def _resolve(self):
+        if self._pid != os.getpid():
+            self._target = self._build()
+            self._pid = os.getpid()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __repr__(self):
+        return f"<{self._label} (lazy)>"
+
+
+def table(name):
+    return _ProcessLocal(lambda: resource("dynamodb").Table(name), f"dynamodb.Table({name!r})")
+
+
+def lazy_resource(service):
+    return _ProcessLocal(lambda: resource(service), f"{service} resource")
+
+
+def lazy_client(service):
+    return _ProcessLocal(lambda: client(service), f"{service} client")
+
+
+def stats():
+    with _lock:
+        stats_by_service = dict(_call_stats) if _pid == os.getpid() else {}
+    result = {service: call_stats.stats() for service, call_stats in stats_by_service.items()}
+    result["http_pool"] = {"full_discards": pool_full.discards}
+    return result
+
+
+register_collector("aws", stats)
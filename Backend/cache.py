@@ -0,0 +1,264 @@
+# app/services/cache.py
+"""
+Read-through TTL caches for rarely-changing catalog data (restaurant menus and
+the restaurant list).
+
+The in-process backend is an LRU bounded by entry count; set MENU_CACHE_REDIS_URL
+to share entries between workers through Redis instead. Writers must call the
+matching `invalidate_*` helper after changing the underlying table.
+
+Catalog entries carry a content-hash version (ETag) and the time that version
+was first seen (Last-Modified), so conditional GETs can be answered from cache.
+
+Redis holds entries as JSON, never pickles, so whoever can write to the shared
+Redis cannot run code in the workers. Decimals and sets are tagged to come back
+exactly as boto3 returned them.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+from app.services.db import menus_table, restaurants_table, menus_for_restaurant_query, query_all
+from app.services.metrics import register_collector
+from app.services.reads import read, forget
+
+_MISSING = object()
+
+
+class LocalBackend:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def size(self):
+        return len(self.entries)
+
+
+def _encode(o):
+    if isinstance(o, Decimal):
+        return {"__decimal__": str(o)}
+    if isinstance(o, (set, frozenset)):
+        return {"__set__": list(o)}
+    raise TypeError(f"{type(o).__name__} is not cacheable")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        if "__decimal__" in obj:
+            return Decimal(obj["__decimal__"])
+        if "__set__" in obj:
+            return set(obj["__set__"])
+    return obj
+
+
+def dumps(value):
+    """JSON for a cached value: DynamoDB items, plain dicts or a CatalogEntry."""
+    if isinstance(value, CatalogEntry):
+        value = {"__catalog__": [value.items, value.etag, value.last_modified.isoformat()]}
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+
+def loads(raw):
+    value = json.loads(raw, object_hook=_decode)
+    if isinstance(value, dict) and len(value) == 1 and "__catalog__" in value:
+        items, etag, last_modified = value["__catalog__"]
+        return CatalogEntry(items, etag, datetime.fromisoformat(last_modified))
+    return value
+
+
+class RedisBackend:
+    """Shared backend; `client` is a redis.Redis (or compatible stand-in) instance."""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return _MISSING if raw is None else loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def size(self):
+        return None
+
+
+class TTLCache:
+    def __init__(self, name, ttl, backend):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+        register_collector(f"cache.{name}", self.stats)
+
+    def get_or_load(self, key, loader):
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            with self.lock:
+                self.hits += 1
+            return value
+
+        with self.lock:
+            self.misses += 1
+            generation = self.generations.get(key, 0)
+        # Concurrent misses on one key share a single load
+        value = read((f"cache.{self.name}", key), loader, memoize=False)
+        with self.lock:
+            # Skip the store if a writer invalidated the key while we were loading
+            if self.generations.get(key, 0) == generation:
+                self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, key):
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            self.backend.delete(key)
+            self.invalidations += 1
+        forget((f"cache.{self.name}", key))
+
+    def stats(self):
+        with self.lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "invalidations": invalidations,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "size": self.backend.size()
+        }
+
+
+def _backend(prefix, maxsize):
+    redis_url = os.getenv("MENU_CACHE_REDIS_URL")
+    if not redis_url:
+        return LocalBackend(maxsize)
+    import redis  # optional dependency, only needed for the shared backend
+    return RedisBackend(redis.Redis.from_url(redis_url), prefix)
+
+
+MENU_CACHE_MAX_ENTRIES = int(os.getenv("MENU_CACHE_MAX_ENTRIES", 1024))
+
+menu_cache = TTLCache(
+    "menus",
+    ttl=float(os.getenv("MENU_CACHE_TTL_SECONDS", 300)),
+    backend=_backend("menu:", MENU_CACHE_MAX_ENTRIES)
+)
+
+# restaurant_id -> {lower-cased item name: menu_id}, derived from the cached menu
+menu_name_cache = TTLCache(
+    "menu_names",
+    ttl=float(os.getenv("MENU_CACHE_TTL_SECONDS", 300)),
+    backend=_backend("menu_names:", MENU_CACHE_MAX_ENTRIES)
+)
+
+restaurant_cache = TTLCache(
+    "restaurants",
+    ttl=float(os.getenv("RESTAURANT_CACHE_TTL_SECONDS", 60)),
+    backend=_backend("restaurants:", 1)
+)
+
+CatalogEntry = namedtuple("CatalogEntry", ["items", "etag", "last_modified"])
+
+# cache key -> (etag, first seen); keeps Last-Modified stable across TTL reloads.
+# An LRU as large as the menu cache plus the restaurant list: menu ids come from
+# unauthenticated URLs, so unknown ones must not pile up here.
+_versions = OrderedDict()
+_versions_lock = threading.Lock()
+
+
+def _versioned(key, items):
+    canonical = json.dumps(items, sort_keys=True, default=str, separators=(",", ":"))
+    etag = hashlib.sha1(canonical.encode()).hexdigest()
+    with _versions_lock:
+        seen = _versions.get(key)
+        if seen is None or seen[0] != etag:
+            seen = _versions[key] = (etag, datetime.now(timezone.utc).replace(microsecond=0))
+        _versions.move_to_end(key)
+        while len(_versions) > MENU_CACHE_MAX_ENTRIES + 1:
+            _versions.popitem(last=False)
+    return CatalogEntry(items, etag, seen[1])
+
+
+def _load_restaurants():
+    items = []
+    params = {}
+    while True:
+        response = restaurants_table.scan(**params)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return _versioned("restaurants", items)
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+# ✅ Catalog access (returned items are shared between requests: treat them as read-only)
+def cached_menu_entry(restaurant_id):
+    return menu_cache.get_or_load(
+        restaurant_id,
+        lambda: _versioned(
+            f"menu:{restaurant_id}",
+            query_all(menus_table, **menus_for_restaurant_query(restaurant_id))
+        )
+    )
+
+
+def cached_menu(restaurant_id):
+    return cached_menu_entry(restaurant_id).items
+
+
+def cached_menu_names(restaurant_id):
+    return menu_name_cache.get_or_load(
+        restaurant_id,
+        lambda: {item["name"].lower(): item["menu_id"] for item in cached_menu(restaurant_id)}
+    )
+
+
+def cached_restaurants_entry():
+    return restaurant_cache.get_or_load("all", _load_restaurants)
+
+
+def invalidate_menu(*restaurant_ids):
+    for restaurant_id in set(restaurant_ids):
+        if restaurant_id:
+            menu_cache.invalidate(restaurant_id)
+            menu_name_cache.invalidate(restaurant_id)
+
+
+def invalidate_restaurants():
+    restaurant_cache.invalidate("all")
@@ -0,0 +1,84 @@
+# app/utils/compression.py
+"""
+Negotiated response compression (br / gzip) above a size threshold.
+
+Only JSON / text bodies of at least COMPRESS_MIN_BYTES are compressed; below
+that the CPU costs more than the bytes saved. Brotli is preferred when the
+optional `brotli` package is installed and the client accepts it, gzip
+otherwise. Streamed responses are sent as they are. A compressed response
+carries the weak form of its ETag (W/"..."), as nginx does, and conditional
+requests compare ETags weakly, so revalidation keeps working.
+"""
+import gzip
+import os
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+# Dynamic responses: higher brotli qualities cost far more CPU for a few % smaller bodies
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding):
+    """The best coding we support from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.quality(coding) > 0:
+            return coding
+    return None
+
+
+def compress(body, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def negotiate(body, content_type, accept_encoding, min_bytes=MIN_BYTES):
+    """(body, coding): the body compressed for this client, or unchanged with coding None."""
+    if len(body) < min_bytes or not compressible(content_type):
+        return body, None
+    coding = choose_encoding(accept_encoding)
+    if coding is None:
+        return body, None
+    return compress(body, coding), coding
+
+
+def weak_etag(etag):
+    return etag if not etag or etag.startswith("W/") else f"W/{etag}"
+
+
+def init_compression(app, min_bytes=MIN_BYTES):
+    @app.after_request
+    def compress_response(response):
+        if not compressible(response.mimetype):
+            return response
+        response.vary.add("Accept-Encoding")
+        if (response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+
+        body, coding = negotiate(response.get_data(), response.mimetype,
+                                 request.headers.get("Accept-Encoding"), min_bytes)
+        if coding is not None:
+            response.set_data(body)
+            response.headers["Content-Encoding"] = coding
+            if "ETag" in response.headers:
+                response.headers["ETag"] = weak_etag(response.headers["ETag"])
+        return response
+    return app
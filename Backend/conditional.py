@@ -0,0 +1,37 @@
+# app/utils/conditional.py
+"""
+Conditional GET helpers for versioned catalog responses.
+
+`conditional_json` answers If-None-Match / If-Modified-Since with a bodyless 304
+before anything is serialized; callers pass an entry that is already cached,
+so a revalidation never touches DynamoDB.
+"""
+from flask import jsonify, make_response, request
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since and compares weakly (RFC 9110):
+        # compressed responses carry W/"<etag>"
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_json(body, entry, status=200):
+    """
+    Return `body` as JSON tagged with the entry's ETag / Last-Modified, or a 304
+    if the client already holds this version. `body` may be a callable so it is
+    only built when needed.
+    """
+    if _not_modified(entry.etag, entry.last_modified):
+        response = make_response("", 304)
+    else:
+        response = make_response(jsonify(body() if callable(body) else body), status)
+
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    # Clients may keep the payload but must revalidate before reusing it
+    response.headers["Cache-Control"] = "no-cache"
+    return response
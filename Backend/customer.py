@@ -1,10 +1,14 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.db import orders_table, menus_table, restaurants_table, sns
-from app.utils.role_utils import role_required
-from boto3.dynamodb.conditions import Attr
-from datetime import datetime
-import uuid
+from flask_jwt_extended import get_jwt_identity
+from app.services.db import orders_table, restaurants_table, customer_orders_query
+from app.services.cache import cached_menu_entry, cached_restaurants_entry
+from app.services.order_intake import place_order, place_orders, InvalidOrder
+from app.services.order_state import transition, OrderNotFound, StaleTransition
+from app.services.outbox import enqueue
+from app.utils.role_utils import jwt_required, role_required
+from app.utils.rate_limit import rate_cost
+from app.utils.pagination import list_response, is_page_request
+from app.utils.conditional import conditional_json
 import logging
 
 customer_bp = Blueprint('customer', __name__)
@@ -15,12 +19,13 @@ customer_bp = Blueprint('customer', __name__)
 @role_required("customer")
 def get_restaurants():
     try:
-        response = restaurants_table.scan()
-        restaurants = response.get("Items", [])
-        logging.info(f"📍 Total restaurants fetched: {len(restaurants)}")
-        return jsonify({"restaurants": restaurants}), 200
+        logging.info("📍 Restaurants list requested")
+        if is_page_request():
+            return list_response(restaurants_table.scan, envelope="restaurants")
+        entry = cached_restaurants_entry()
+        return conditional_json({"restaurants": entry.items}, entry)
     except Exception as e:
-        logging.error(f"❌ Failed to fetch restaurants: {str(e)}")
+        logging.error("❌ Failed to fetch restaurants: %s", e)
         return jsonify({"error": "Failed to retrieve restaurants"}), 500
 
 # ✅ Get menu of a selected restaurant
@@ -29,18 +34,16 @@ def get_restaurants():
 @role_required("customer")
 def get_menu_by_restaurant(restaurant_id):
     try:
-        response = menus_table.scan(
-            FilterExpression=Attr("restaurant_id").eq(restaurant_id)
-        )
-        menu = response.get("Items", [])
-        logging.info(f"🍽️ Menu fetched for restaurant_id={restaurant_id} → {len(menu)} items")
-        return jsonify({"menu": menu}), 200
+        entry = cached_menu_entry(restaurant_id)
+        logging.info("🍽️ Menu fetched for restaurant_id=%s → %s items", restaurant_id, len(entry.items))
+        return conditional_json({"menu": entry.items}, entry)
     except Exception as e:
-        logging.error(f"❌ Failed to fetch menu for restaurant {restaurant_id}: {str(e)}")
+        logging.error("❌ Failed to fetch menu for restaurant %s: %s", restaurant_id, e)
         return jsonify({"error": "Failed to retrieve menu"}), 500
 
 # ✅ Create new order (includes customer details and unique ID)
 @customer_bp.route("/order", methods=["POST"])
+@rate_cost(2)
 @jwt_required()
 @role_required("customer")
 def create_order():
@@ -49,131 +52,108 @@ def create_order():
         if not data:
             return jsonify({"error": "Missing order data"}), 400
 
-        required_fields = {"restaurant_id", "items", "customer_name", "customer_email", "customer_contact", "unique_customer_id"}
-        if not required_fields.issubset(data):
-            return jsonify({"error": "Missing required fields"}), 400
-
-        restaurant_id = data["restaurant_id"]
-        items = data["items"]
         customer_id = get_jwt_identity()
+        logging.info("📨 Creating order for restaurant_id=%s by '%s'", data.get('restaurant_id'), customer_id)
 
-        customer_name = data["customer_name"]
-        customer_email = data["customer_email"]
-        customer_contact = data["customer_contact"]
-        unique_id = data["unique_customer_id"]
+        order = place_order(customer_id, data)
+        logging.info("🛒 Order placed by '%s' → Order ID: %s", customer_id, order['order_id'])
 
-        logging.info(f"📨 Creating order for restaurant_id={restaurant_id} by '{customer_id}'")
+        _notify_restaurant(order)
+        return jsonify({"message": "✅ Order placed successfully", "order_id": order["unique_customer_id"]}), 201
 
-        menu_response = menus_table.scan(
-            FilterExpression=Attr("restaurant_id").eq(restaurant_id)
-        )
-        menu_items = menu_response.get("Items", [])
-
-        menu_dict = {item["name"].lower(): item for item in menu_items}
-
-        order_items = []
-        for i in items:
-            name = i.get("name", "").lower()
-            size = i.get("size", "").lower()
-            quantity = int(i.get("quantity", 1))
-
-            if name not in menu_dict or size not in ["small", "medium", "large"]:
-                return jsonify({"error": f"Invalid item: {i}"}), 400
-
-            menu_item = menu_dict[name]
-            order_items.append({
-                "name": menu_item["name"],
-                "menu_id": menu_item["menu_id"],
-                "size": size,
-                "quantity": quantity,
-                "price_small": menu_item.get("price_small", "0"),
-                "price_medium": menu_item.get("price_medium", "0"),
-                "price_large": menu_item.get("price_large", "0"),
-                "prep_time": menu_item.get("prep_time", "1")
-            })
-
-        order_id = str(uuid.uuid4())
-        order_time = datetime.utcnow().isoformat()
-
-        order_data = {
-            "order_id": order_id,
-            "unique_customer_id": unique_id,
-            "customer": customer_id,
-            "restaurant_id": restaurant_id,
-            "items": order_items,
-            "status": "pending",
-            "order_time": order_time,
-            "customer_name": customer_name,
-            "customer_email": customer_email,
-            "customer_contact": customer_contact
-        }
-
-        orders_table.put_item(Item=order_data)
-        logging.info(f"🛒 Order placed by '{customer_id}' → Order ID: {order_id}")
-
-        sns.publish(
-            TopicArn="arn:aws:sns:eu-north-1:075664900901:RestaurantAlert",
-            Message=f"🛒 New order from {customer_name}\nOrder ID: {unique_id}",
-            Subject="New Food Order Placed"
-        )
+    except InvalidOrder as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error("❌ Failed to place order: %s", e)
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify({"message": "✅ Order placed successfully", "order_id": unique_id}), 201
+# ✅ Create many orders at once (group / corporate ordering)
+@customer_bp.route("/orders/batch", methods=["POST"])
+@rate_cost(10)
+@jwt_required()
+@role_required("customer")
+def create_orders_batch():
+    try:
+        data = request.get_json()
+        payloads = (data or {}).get("orders")
+        if not payloads or not isinstance(payloads, list):
+            return jsonify({"error": "Missing 'orders' list"}), 400
+
+        customer_id = get_jwt_identity()
+        orders, failed = place_orders(customer_id, payloads)
+        logging.info("🛒 Batch of %s orders placed by '%s'", len(orders), customer_id)
 
+        for order in orders:
+            _notify_restaurant(order)
+        if failed:
+            # Partly written: the client resubmits only the failed orders
+            logging.error("❌ %s orders of a batch by '%s' were not written", len(failed), customer_id)
+            return jsonify({
+                "message": f"⚠️ {len(orders)} of {len(orders) + len(failed)} orders placed",
+                "order_ids": [order["unique_customer_id"] for order in orders],
+                "failed_order_ids": [order["unique_customer_id"] for order in failed]
+            }), 207
+        return jsonify({
+            "message": f"✅ {len(orders)} orders placed successfully",
+            "order_ids": [order["unique_customer_id"] for order in orders]
+        }), 201
+
+    except InvalidOrder as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logging.error(f"❌ Failed to place order: {str(e)}")
+        logging.error("❌ Failed to place batch order: %s", e)
         return jsonify({"error": str(e)}), 500
 
+# ✅ Restaurant alert goes through the outbox so SNS latency never reaches the order path
+def _notify_restaurant(order):
+    enqueue(
+        "arn:aws:sns:eu-north-1:075664900901:RestaurantAlert",
+        f"🛒 New order from {order['customer_name']}\nOrder ID: {order['unique_customer_id']}",
+        subject="New Food Order Placed",
+        dedup_key=f"order-placed:{order['order_id']}"
+    )
+
+def _with_delivery_defaults(order):
+    order.setdefault("delivery_partner_name", None)
+    order.setdefault("delivery_partner_id", None)
+    order.setdefault("eta_minutes", None)
+    order.setdefault("delivery_status", order.get("status"))
+    return order
+
 # ✅ View customer's own orders
 @customer_bp.route("/orders", methods=["GET"])
+@rate_cost(5)
 @jwt_required()
 @role_required("customer")
 def get_orders():
     try:
         username = get_jwt_identity()
-        response = orders_table.scan(
-            FilterExpression=Attr("customer").eq(username)
+        return list_response(
+            orders_table.query, envelope="orders", transform=_with_delivery_defaults, reads=("status",),
+            **customer_orders_query(username)
         )
-        orders = response.get("Items", [])
-        for order in orders:
-            order.setdefault("delivery_partner_name", None)
-            order.setdefault("delivery_partner_id", None)
-            order.setdefault("eta_minutes", None)
-            order.setdefault("delivery_status", order.get("status"))
-        return jsonify({"orders": orders}), 200
     except Exception as e:
-        logging.error(f"❌ Error retrieving orders for '{username}': {str(e)}")
+        logging.error("❌ Error retrieving orders for '%s': %s", username, e)
         return jsonify({"error": str(e)}), 500
 
-# ✅ Cancel order before accepted
+# ✅ Cancel order before accepted (one conditional write: still pending and the caller's own order)
 @customer_bp.route("/order/<order_id>/cancel", methods=["PATCH"])
 @jwt_required()
 @role_required("customer")
 def cancel_order(order_id):
     try:
         username = get_jwt_identity()
-        response = orders_table.scan(
-            FilterExpression=Attr("order_id").eq(order_id) & Attr("customer").eq(username)
-        )
-        items = response.get("Items", [])
-        if not items:
-            return jsonify({"error": "Order not found or unauthorized"}), 404
-
-        order = items[0]
-        if order["status"] != "pending":
-            return jsonify({"error": "Order can only be cancelled while pending."}), 400
-
-        orders_table.update_item(
-            Key={"order_id": order_id},
-            UpdateExpression="SET #s = :s",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": "cancelled"}
-        )
+        transition(order_id, "cancelled", "customer", username)
 
-        logging.info(f"❌ Order '{order_id}' cancelled by '{username}'")
+        logging.info("❌ Order '%s' cancelled by '%s'", order_id, username)
         return jsonify({"message": f"Order '{order_id}' cancelled."}), 200
 
+    except OrderNotFound:
+        return jsonify({"error": "Order not found or unauthorized"}), 404
+    except StaleTransition:
+        return jsonify({"error": "Order can only be cancelled while pending."}), 400
     except Exception as e:
-        logging.error(f"❌ Failed to cancel order: {str(e)}")
+        logging.error("❌ Failed to cancel order: %s", e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Test route
@@ -1,14 +1,168 @@
-import boto3
+import logging
+import time
+from boto3.dynamodb.conditions import Key
+from app.services.aws import lazy_client, lazy_resource, table
 
-# ✅ Auto-authentication using EC2 IAM Role (or local AWS CLI config)
-dynamodb = boto3.resource('dynamodb', region_name='eu-north-1')
+# ✅ Auto-authentication using EC2 IAM Role (or local AWS CLI config).
+# Clients are pooled per process and created on first use (see app.services.aws).
+dynamodb = lazy_resource('dynamodb')
 
 # ✅ DynamoDB Table References
-orders_table = dynamodb.Table('Orders')              # Stores all order info
-users_table = dynamodb.Table('Users')                # Stores registered users
-menus_table = dynamodb.Table('Menus')                # Stores food menu items
-restaurants_table = dynamodb.Table('Restaurants')    # Stores restaurant profiles
-delivery_partners_table = dynamodb.Table('DeliveryTable')  # ✅ Delivery partner assignment table
+orders_table = table('Orders')              # Stores all order info
+users_table = table('Users')                # Stores registered users
+menus_table = table('Menus')                # Stores food menu items
+restaurants_table = table('Restaurants')    # Stores restaurant profiles
+delivery_partners_table = table('DeliveryTable')  # ✅ Delivery partner assignment table
+leases_table = table('Leases')              # Background-work ownership leases (app.services.leader)
+stats_table = table('RestaurantStats')      # Per-restaurant order aggregates (app.services.order_stats)
 
 # ✅ SNS Client for real-time notifications (e.g., order alerts to delivery)
-sns = boto3.client('sns', region_name='eu-north-1')
+sns = lazy_client('sns')
+
+# ✅ Global secondary indexes backing the hot read paths: index name -> (partition key, sort key or None).
+# Created / backfilled by `python -m app.services.migrate`.
+ORDERS_BY_CUSTOMER_INDEX = "customer-order_time-index"
+ORDERS_BY_RESTAURANT_INDEX = "restaurant_id-order_time-index"
+ORDERS_BY_PARTNER_INDEX = "delivery_partner_name-status-index"
+MENUS_BY_RESTAURANT_INDEX = "restaurant_id-index"
+PARTNERS_BY_STATUS_INDEX = "status-index"
+
+TABLE_INDEXES = {
+    "Orders": {
+        ORDERS_BY_CUSTOMER_INDEX: ("customer", "order_time"),
+        ORDERS_BY_RESTAURANT_INDEX: ("restaurant_id", "order_time"),
+        ORDERS_BY_PARTNER_INDEX: ("delivery_partner_name", "status"),
+    },
+    "Menus": {
+        MENUS_BY_RESTAURANT_INDEX: ("restaurant_id", None),
+    },
+    "DeliveryTable": {
+        PARTNERS_BY_STATUS_INDEX: ("status", None),
+    },
+}
+
+
+def index_query(table, index_name, partition_value, sort_condition=None, newest_first=True):
+    """
+    Keyword arguments for `table.query` against one of the declared secondary indexes.
+    `sort_condition` is an optional boto3 Key condition on the index sort key.
+    """
+    hash_key, _ = TABLE_INDEXES[table.name][index_name]
+    condition = Key(hash_key).eq(partition_value)
+    if sort_condition is not None:
+        condition = condition & sort_condition
+
+    return {
+        "IndexName": index_name,
+        "KeyConditionExpression": condition,
+        "ScanIndexForward": not newest_first
+    }
+
+
+def query_all(table, **params):
+    """Run a query and follow LastEvaluatedKey until every matching item is read."""
+    items = []
+    while True:
+        response = table.query(**params)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+# ✅ Batch reads / writes with retry of unprocessed keys and items
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+BATCH_MAX_ATTEMPTS = 6
+
+
+def _backoff(attempt):
+    time.sleep(min(0.05 * 2 ** attempt, 2.0))
+
+
+def batch_get(table, keys, **params):
+    """Fetch items by primary key with BatchGetItem; missing keys are simply absent from the result."""
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table.name: {"Keys": keys[start:start + BATCH_GET_SIZE], **params}}
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get("Responses", {}).get(table.name, []))
+            request = response.get("UnprocessedKeys")
+            if not request:
+                break
+            _backoff(attempt)
+        else:
+            raise RuntimeError(f"BatchGetItem on {table.name} left keys unprocessed after {BATCH_MAX_ATTEMPTS} attempts")
+    return items
+
+
+def batch_write(table, items):
+    """
+    Put items with BatchWriteItem, retrying UnprocessedItems with exponential
+    backoff. Returns the items that were not written (empty when all were): once
+    a chunk of 25 fails, its unprocessed items and every later item are returned.
+    """
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        chunk = items[start:start + BATCH_WRITE_SIZE]
+        request = {table.name: [{"PutRequest": {"Item": item}} for item in chunk]}
+        try:
+            for attempt in range(BATCH_MAX_ATTEMPTS):
+                response = dynamodb.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems")
+                if not request:
+                    break
+                _backoff(attempt)
+        except Exception as e:
+            logging.error("❌ BatchWriteItem on %s failed: %s", table.name, e)
+        if request:
+            # Compare by value: the resource hands UnprocessedItems back as fresh dicts
+            unprocessed = [r["PutRequest"]["Item"] for r in request[table.name]]
+            return [item for item in chunk if item in unprocessed] + items[start + len(chunk):]
+    return []
+
+
+def transact_write(actions):
+    """
+    All-or-nothing TransactWriteItems. `actions` are {"Update" | "Put" | "Delete" |
+    "ConditionCheck": {...}} with plain Python values, like the table methods take.
+    A failed condition raises TransactionCanceledException (see CancellationReasons).
+    """
+    # The resource's client (un)marshals attribute values, unlike a bare boto3 client
+    return dynamodb.meta.client.transact_write_items(TransactItems=actions)
+
+
+# ✅ Orders access paths (newest first, ordered by the index sort key)
+def customer_orders_query(customer):
+    return index_query(orders_table, ORDERS_BY_CUSTOMER_INDEX, customer)
+
+
+def restaurant_orders_query(restaurant_id):
+    return index_query(orders_table, ORDERS_BY_RESTAURANT_INDEX, restaurant_id)
+
+
+def partner_orders_query(partner_name, status):
+    return index_query(
+        orders_table, ORDERS_BY_PARTNER_INDEX, partner_name,
+        sort_condition=Key("status").eq(status)
+    )
+
+
+def menus_for_restaurant_query(restaurant_id):
+    return index_query(menus_table, MENUS_BY_RESTAURANT_INDEX, restaurant_id, newest_first=False)
+
+
+def partners_by_status_query(status):
+    return index_query(delivery_partners_table, PARTNERS_BY_STATUS_INDEX, status, newest_first=False)
+
+
+def orders_for_customer(customer):
+    return query_all(orders_table, **customer_orders_query(customer))
+
+
+def orders_for_restaurant(restaurant_id):
+    return query_all(orders_table, **restaurant_orders_query(restaurant_id))
+
+
+def orders_for_partner(partner_name, status):
+    return query_all(orders_table, **partner_orders_query(partner_name, status))
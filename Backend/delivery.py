@@ -1,10 +1,14 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.db import orders_table, delivery_partners_table
-from app.utils.role_utils import role_required
-from boto3.dynamodb.conditions import Attr
-from datetime import datetime
-import threading
+from flask_jwt_extended import get_jwt_identity
+from app.services.db import orders_table, delivery_partners_table, partner_orders_query
+from app.services.reads import get_item
+from app.utils.role_utils import jwt_required, role_required
+from app.utils.rate_limit import rate_cost
+from app.utils.pagination import list_response
+from app.services.delivery_timers import schedule_delivery_completion, cancel_delivery_completion
+from app.services.dispatch import update_partner_location, free_partner
+from app.services.order_state import transition, InvalidTransition, OrderNotFound, StaleTransition
+from datetime import datetime, timedelta
 import logging
 
 delivery_bp = Blueprint('delivery', __name__)
@@ -15,23 +19,23 @@ delivery_bp = Blueprint('delivery', __name__)
 @role_required("delivery")
 def test_delivery():
     username = get_jwt_identity()
-    logging.info(f"✅ Test route accessed by delivery personnel '{username}'")
+    logging.info("✅ Test route accessed by delivery personnel '%s'", username)
     return jsonify({"message": "✅ Delivery route access confirmed!"}), 200
 
 # ✅ Get specific order info (open access)
 @delivery_bp.route("/order/<order_id>", methods=["GET"])
 def get_order(order_id):
     try:
-        res = orders_table.get_item(Key={"order_id": order_id})
-        order = res.get("Item")
+        # Clients poll this: concurrent polls of one order share a single GetItem
+        order = get_item(orders_table, {"order_id": order_id})
         if not order:
             return jsonify({"error": "❌ Order not found"}), 404
         return jsonify(order), 200
     except Exception as e:
-        logging.error(f"❌ Error fetching order '{order_id}': {str(e)}")
+        logging.error("❌ Error fetching order '%s': %s", order_id, e)
         return jsonify({"error": str(e)}), 500
 
-# ✅ Update order delivery status
+# ✅ Update order delivery status (only on orders assigned to the caller; delivering frees the partner right away)
 @delivery_bp.route("/order/<order_id>", methods=["PATCH"])
 @jwt_required()
 @role_required("delivery")
@@ -42,101 +46,92 @@ def update_delivery_status(order_id):
             return jsonify({"error": "Missing 'status'"}), 400
 
         username = get_jwt_identity()
+        old_order = transition(order_id, status, "delivery", username)
 
-        update_expr = "SET #s = :s, updated_by = :u"
-        attr_names = {"#s": "status"}
-        attr_values = {":s": status, ":u": username}
+        partner_id = old_order.get("delivery_partner_id")
+        if status == "delivered" and partner_id and partner_id != "-":
+            cancel_delivery_completion(order_id)
+            free_partner(partner_id, order_id)
 
-        if status == "delivered":
-            now = datetime.utcnow().isoformat()
-            update_expr += ", delivered_at = :t"
-            attr_values[":t"] = now
-
-        orders_table.update_item(
-            Key={"order_id": order_id},
-            UpdateExpression=update_expr,
-            ExpressionAttributeNames=attr_names,
-            ExpressionAttributeValues=attr_values
-        )
-
-        logging.info(f"🚚 Order '{order_id}' updated to '{status}' by '{username}'")
+        logging.info("🚚 Order '%s' updated to '%s' by '%s'", order_id, status, username)
         return jsonify({"message": f"✅ Order status updated to '{status}'"}), 200
+    except InvalidTransition as e:
+        return jsonify({"error": str(e)}), 400
+    except OrderNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except StaleTransition as e:
+        return jsonify({"error": str(e), "status": e.current_status}), 409
     except Exception as e:
-        logging.error(f"❌ Error updating order '{order_id}': {str(e)}")
+        logging.error("❌ Error updating order '%s': %s", order_id, e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Fetch all 'ready' orders assigned to current delivery partner
 @delivery_bp.route("/ready", methods=["GET"])
+@rate_cost(3)
 @jwt_required()
 @role_required("delivery")
 def get_ready_orders():
     try:
         username = get_jwt_identity()
-        res = orders_table.scan(
-            FilterExpression=Attr("status").eq("ready") & Attr("delivery_partner_name").eq(username)
-        )
-        items = res.get("Items", [])
-        logging.info(f"📦 Ready orders for '{username}': {len(items)}")
-        return jsonify(items), 200
+        logging.info("📦 Ready orders requested by '%s'", username)
+        return list_response(orders_table.query, **partner_orders_query(username, "ready"))
     except Exception as e:
-        logging.error(f"❌ Error fetching ready orders: {str(e)}")
+        logging.error("❌ Error fetching ready orders: %s", e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Fetch completed deliveries
 @delivery_bp.route("/completed", methods=["GET"])
+@rate_cost(3)
 @jwt_required()
 @role_required("delivery")
 def get_completed_deliveries():
     try:
         username = get_jwt_identity()
-        res = orders_table.scan(
-            FilterExpression=Attr("status").eq("delivered") & Attr("delivery_partner_name").eq(username)
-        )
-        items = res.get("Items", [])
-        logging.info(f"📦 Completed deliveries for '{username}': {len(items)}")
-        return jsonify(items), 200
+        logging.info("📦 Completed deliveries requested by '%s'", username)
+        return list_response(orders_table.query, **partner_orders_query(username, "delivered"))
     except Exception as e:
-        logging.error(f"❌ Error fetching completed deliveries: {str(e)}")
+        logging.error("❌ Error fetching completed deliveries: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+# ✅ Report the partner's live position (feeds nearest-partner dispatch)
+@delivery_bp.route("/location", methods=["PATCH"])
+@jwt_required()
+@role_required("delivery")
+def update_location():
+    try:
+        data = request.get_json() or {}
+        partner_id = data.get("partner_id")
+        try:
+            lat, lon = float(data["lat"]), float(data["lon"])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Missing or invalid 'lat' / 'lon'"}), 400
+        if not partner_id:
+            return jsonify({"error": "Missing 'partner_id'"}), 400
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({"error": "'lat' / 'lon' out of range"}), 400
+
+        update_partner_location(partner_id, get_jwt_identity(), lat, lon)
+        return jsonify({"message": "📍 Location updated"}), 200
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except Exception as e:
+        logging.error("❌ Error updating location: %s", e)
         return jsonify({"error": str(e)}), 500
 
 # ✅ Fetch all delivery partners
 @delivery_bp.route("/partners", methods=["GET"])
+@rate_cost(5)
 @jwt_required()
 @role_required("delivery")
 def get_all_partners():
     try:
-        res = delivery_partners_table.scan()
-        items = res.get("Items", [])
-        return jsonify(items), 200
+        return list_response(delivery_partners_table.scan)
     except Exception as e:
-        logging.error(f"❌ Error fetching delivery partners: {str(e)}")
+        logging.error("❌ Error fetching delivery partners: %s", e)
         return jsonify({"error": str(e)}), 500
 
-# ✅ Background task to auto-mark delivery as completed
+# ✅ Auto-mark delivery as completed (one shared timer heap, no thread per order)
 def schedule_auto_delivery_completion(order_id, partner_id, eta_minutes):
-    def mark_as_delivered():
-        try:
-            now = datetime.utcnow().isoformat()
-
-            # ✅ Update order as delivered
-            orders_table.update_item(
-                Key={"order_id": order_id},
-                UpdateExpression="SET #s = :s, delivered_at = :t",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":s": "delivered", ":t": now}
-            )
-
-            # ✅ Reset delivery partner to idle
-            delivery_partners_table.update_item(
-                Key={"partner_id": partner_id},
-                UpdateExpression="SET #s = :s REMOVE current_order_id, delivery_end_time",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":s": "idle"}
-            )
-
-            logging.info(f"✅ Order '{order_id}' auto-delivered. Partner '{partner_id}' set to idle.")
-
-        except Exception as e:
-            logging.error(f"❌ Auto-completion failed for '{order_id}': {str(e)}")
-
-    threading.Timer(eta_minutes * 60, mark_as_delivered).start()
\ No newline at end of file
+    schedule_delivery_completion(order_id, partner_id, datetime.utcnow() + timedelta(minutes=eta_minutes))
@@ -0,0 +1,210 @@
+# app/services/delivery_timers.py
+"""
+Single-threaded delivery completion scheduler.
+
+Due times of in-flight deliveries live in one min-heap instead of one
+threading.Timer per order. The scheduler thread sleeps until the earliest due
+time, pops every delivery that is due and completes them as a batch. On start
+(and periodically, as a safety net for deliveries assigned by other
+processes) it rehydrates the heap from the busy partners in DynamoDB.
+
+Every process fires the deliveries it scheduled itself; the sweeps can be
+switched off with `stop_sweeping()` so that only the process elected by
+app.services.scheduler runs them.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.services.db import delivery_partners_table, partners_by_status_query, query_all
+from app.services.metrics import register_collector
+from app.services.order_state import transition, OrderNotFound, StaleTransition, SYSTEM
+
+BATCH_SIZE = int(os.getenv("DELIVERY_TIMER_BATCH_SIZE", 50))
+COMPLETION_WORKERS = int(os.getenv("DELIVERY_TIMER_WORKERS", 4))
+RESYNC_SECONDS = float(os.getenv("DELIVERY_TIMER_RESYNC_SECONDS", 300))
+
+
+def _epoch(utc_naive):
+    """delivery_end_time values are naive UTC ISO strings (datetime.utcnow())."""
+    return (utc_naive - datetime(1970, 1, 1)).total_seconds()
+
+
+def complete_delivery(order_id, partner_id):
+    """Mark the order delivered unless it already moved on, and free the partner if it is still on this order."""
+    try:
+        transition(order_id, "delivered", SYSTEM)
+    except (OrderNotFound, StaleTransition) as e:
+        # Typically delivered by the partner already; the partner may still need freeing
+        logging.info("🕒 Auto-completion of '%s' skipped: %s", order_id, e)
+    from app.services.dispatch import free_partner  # dispatch imports this module
+    free_partner(partner_id, order_id)
+
+
+class DeliveryTimerScheduler:
+    def __init__(self, complete=complete_delivery, batch_size=BATCH_SIZE,
+                 workers=COMPLETION_WORKERS, resync_seconds=RESYNC_SECONDS):
+        self.complete = complete
+        self.batch_size = batch_size
+        self.resync_seconds = resync_seconds
+        self.heap = []
+        self.entries = {}            # order_id -> live heap entry (stale entries are skipped)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="delivery-complete")
+        self.thread = None
+        self.stopping = False
+        self.next_resync = None
+        self.fired = self.failures = 0
+        self.last_lag_ms = self.max_lag_ms = 0.0
+
+    # === Scheduling ===
+    def schedule(self, order_id, partner_id, due_at):
+        """Complete `order_id` at `due_at` (epoch seconds); rescheduling replaces the previous due time."""
+        entry = [due_at, next(self.counter), order_id, partner_id]
+        with self.condition:
+            current = self.entries.get(order_id)
+            if current is not None and current[0] == due_at and current[3] == partner_id:
+                return
+            self.entries[order_id] = entry
+            heapq.heappush(self.heap, entry)
+            if self.heap[0] is entry:
+                self.condition.notify()
+
+    def cancel(self, order_id):
+        with self.condition:
+            self.entries.pop(order_id, None)
+
+    def rehydrate(self):
+        """Schedule every busy partner's delivery from DynamoDB; past-due ones fire on the next tick."""
+        count = 0
+        for partner in query_all(delivery_partners_table, **partners_by_status_query("busy")):
+            order_id = partner.get("current_order_id")
+            delivery_end = partner.get("delivery_end_time")
+            if not order_id or order_id == "-" or not delivery_end or delivery_end == "-":
+                continue
+            self.schedule(order_id, partner["partner_id"], _epoch(datetime.fromisoformat(delivery_end)))
+            count += 1
+        logging.info("🕒 Delivery timers rehydrated: %s in-flight deliveries", count)
+        return count
+
+    # === Firing ===
+    def _pop_due(self, now):
+        batch = []
+        while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+            entry = heapq.heappop(self.heap)
+            if self.entries.get(entry[2]) is entry:
+                del self.entries[entry[2]]
+                batch.append(entry)
+        return batch
+
+    def _fire(self, batch):
+        now = time.time()
+        lag_ms = max((now - due) * 1000 for due, *_ in batch)
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+        futures = {
+            self.executor.submit(self.complete, order_id, partner_id): (order_id, partner_id)
+            for _, _, order_id, partner_id in batch
+        }
+        for future, (order_id, partner_id) in futures.items():
+            try:
+                future.result()
+                self.fired += 1
+                logging.info("✅ Order '%s' auto-delivered. Partner '%s' set to idle.", order_id, partner_id)
+            except Exception as e:
+                self.failures += 1
+                logging.error("❌ Auto-completion failed for '%s': %s", order_id, e)
+                # Retry later rather than leaving the partner busy forever
+                self.schedule(order_id, partner_id, time.time() + 30)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopping:
+                    now = time.time()
+                    if self.heap and self.heap[0][0] <= now:
+                        break
+                    if self.next_resync is not None and now >= self.next_resync:
+                        break
+                    wake_at = [t for t in (self.heap[0][0] if self.heap else None, self.next_resync) if t is not None]
+                    self.condition.wait(min(wake_at) - now if wake_at else None)
+                if self.stopping:
+                    return
+                batch = self._pop_due(time.time())
+
+            next_resync = self.next_resync
+            if batch:
+                self._fire(batch)
+            elif next_resync is not None and time.time() >= next_resync:
+                self.next_resync = time.time() + self.resync_seconds
+                try:
+                    self.rehydrate()
+                except Exception as e:
+                    logging.error("❌ Delivery timer resync failed: %s", e)
+
+    def start(self, sweep=True):
+        if self.thread is not None:
+            return
+        if sweep:
+            self.start_sweeping()
+        self.thread = threading.Thread(target=self._run, name="delivery-timers", daemon=True)
+        self.thread.start()
+
+    def start_sweeping(self):
+        """Rehydrate from DynamoDB now and then every `resync_seconds`."""
+        try:
+            self.rehydrate()
+        except Exception as e:
+            logging.error("❌ Delivery timer rehydration failed: %s", e)
+        with self.condition:
+            if self.resync_seconds:
+                self.next_resync = time.time() + self.resync_seconds
+                self.condition.notify()
+
+    def stop_sweeping(self):
+        with self.condition:
+            self.next_resync = None
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.executor.shutdown(wait=True)
+
+    def stats(self):
+        now = time.time()
+        with self.condition:
+            depth = len(self.entries)
+            overdue = sum(1 for entry in self.entries.values() if entry[0] <= now)
+        return {
+            "queue_depth": depth,
+            "overdue": overdue,
+            "sweeping": self.next_resync is not None,
+            "fired": self.fired,
+            "failures": self.failures,
+            "last_firing_lag_ms": round(self.last_lag_ms, 1),
+            "max_firing_lag_ms": round(self.max_lag_ms, 1)
+        }
+
+
+delivery_timers = DeliveryTimerScheduler()
+register_collector("delivery_timers", delivery_timers.stats)
+
+
+def schedule_delivery_completion(order_id, partner_id, delivery_end_time):
+    """`delivery_end_time` is the naive UTC datetime stored on the partner / order."""
+    delivery_timers.schedule(order_id, partner_id, _epoch(delivery_end_time))
+
+
+def cancel_delivery_completion(order_id):
+    """Drop this process's timer for an order completed some other way."""
+    delivery_timers.cancel(order_id)
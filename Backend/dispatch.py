@@ -0,0 +1,313 @@
+# app/services/dispatch.py
+"""
+Delivery partner dispatch.
+
+Idle partners are kept in an in-process pool, rebuilt from the DeliveryTable
+status index and updated on every claim / release. Candidates are the idle
+partners nearest to the restaurant (see app.services.geo), falling back to any
+idle partner when nobody with a known position is in range. A partner is only
+taken with a conditional update (`status = idle`), so two processes racing for
+the same partner can never both win: the loser drops it from its pool and tries
+the next candidate.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from app.services.db import delivery_partners_table, orders_table, partners_by_status_query, query_all, transact_write
+from app.services.reads import forget_item
+from app.services.delivery_timers import schedule_delivery_completion
+from app.services.cache import cached_restaurants_entry
+from app.services.geo import partner_locations, eta_minutes, haversine_km, parse_position
+from app.services.metrics import register_collector
+from app.services.event_hub import publish_order
+
+POOL_REFRESH_SECONDS = float(os.getenv("DISPATCH_POOL_REFRESH_SECONDS", 30))
+MAX_CLAIM_ATTEMPTS = int(os.getenv("DISPATCH_MAX_CLAIM_ATTEMPTS", 5))
+UNKNOWN_PICKUP_KM = float(os.getenv("DISPATCH_UNKNOWN_PICKUP_KM", 2))
+LOCATION_PERSIST_SECONDS = float(os.getenv("PARTNER_LOCATION_PERSIST_SECONDS", 30))
+
+Assignment = namedtuple("Assignment", ["partner", "eta_minutes", "start", "end"])
+
+
+class IdlePartnerPool:
+    def __init__(self, refresh_seconds=POOL_REFRESH_SECONDS, locations=partner_locations):
+        self.refresh_seconds = refresh_seconds
+        self.locations = locations
+        self.partners = {}
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+        self.claims = self.conflicts = self.orders_taken = self.exhausted = self.rebuilds = 0
+
+    def rebuild(self):
+        partners = query_all(delivery_partners_table, **partners_by_status_query("idle"))
+        for partner in partners:
+            # Live updates from /delivery/location are fresher than the persisted position
+            position = parse_position(partner)
+            if position and self.locations.position(partner["partner_id"]) is None:
+                self.locations.update(partner["partner_id"], *position)
+        with self.lock:
+            self.partners = {p["partner_id"]: p for p in partners}
+            self.refreshed_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _ensure_fresh(self):
+        if time.monotonic() - self.refreshed_at > self.refresh_seconds:
+            self.rebuild()
+
+    def take(self, count=1, near=None):
+        """
+        Remove and return up to `count` candidate partners (still to be claimed),
+        nearest to `near` (lat, lon) first when given.
+        """
+        self._ensure_fresh()
+        with self.lock:
+            picked = []
+            if near is not None:
+                hits = self.locations.nearest(*near, k=count, accept=self.partners.__contains__)
+                picked = [partner_id for _, partner_id in hits]
+            if len(picked) < count:
+                # Random picks keep processes with the same view from all racing for the same partner
+                rest = [partner_id for partner_id in self.partners if partner_id not in picked]
+                picked += random.sample(rest, min(count - len(picked), len(rest)))
+            return [self.partners.pop(partner_id) for partner_id in picked]
+
+    def add(self, partner):
+        with self.lock:
+            self.partners[partner["partner_id"]] = partner
+
+    def discard(self, partner_id):
+        with self.lock:
+            self.partners.pop(partner_id, None)
+
+    def stats(self):
+        return {
+            "idle_partners": len(self.partners),
+            "located_partners": len(self.locations),
+            "claims": self.claims,
+            "claim_conflicts": self.conflicts,
+            "orders_already_assigned": self.orders_taken,
+            "no_partner_available": self.exhausted,
+            "rebuilds": self.rebuilds
+        }
+
+
+idle_pool = IdlePartnerPool()
+register_collector("dispatch", idle_pool.stats)
+
+
+def _try_claim(partner, order_id, eta, start, end):
+    """
+    Claim `partner` for `order_id` and record the delivery on the order in one
+    transaction: the partner must still be idle and the order still ready and
+    unassigned. Returns (partner item, order_taken, partner_taken); on a failed
+    condition the item is None and the flags say which side was lost (both can be).
+    """
+    partner_update = {
+        "TableName": delivery_partners_table.name,
+        "Key": {"partner_id": partner["partner_id"]},
+        "UpdateExpression": "SET #s = :busy, current_order_id = :o, delivery_end_time = :e",
+        "ConditionExpression": "#s = :idle",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": {":busy": "busy", ":idle": "idle", ":o": order_id, ":e": end.isoformat()}
+    }
+    order_update = {
+        "TableName": orders_table.name,
+        "Key": {"order_id": order_id},
+        "UpdateExpression": "SET delivery_partner_id = :pid, delivery_partner_name = :pname, eta_minutes = :eta, delivery_status = :ds, delivery_start_time = :start, delivery_end_time = :end",
+        "ConditionExpression": "#s = :ready AND (attribute_not_exists(delivery_partner_id) OR delivery_partner_id = :none)",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": {
+            ":pid": partner["partner_id"],
+            ":pname": partner["name"],
+            ":eta": eta,
+            ":ds": "assigned",
+            ":start": start.isoformat(),
+            ":end": end.isoformat(),
+            ":ready": "ready",
+            ":none": "-"
+        }
+    }
+    try:
+        transact_write([{"Update": partner_update}, {"Update": order_update}])
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        partner_reason, order_reason = [r.get("Code") for r in e.response.get("CancellationReasons", [{}, {}])]
+        if "ConditionalCheckFailed" not in (partner_reason, order_reason):
+            raise   # e.g. TransactionConflict: let the caller fail and retry later
+        return None, order_reason == "ConditionalCheckFailed", partner_reason == "ConditionalCheckFailed"
+    forget_item(orders_table, {"order_id": order_id})
+    busy = {**partner, "status": "busy", "current_order_id": order_id, "delivery_end_time": end.isoformat()}
+    return busy, False, False
+
+
+def _eta(partner_id, origin, locations):
+    position = locations.position(partner_id)
+    if origin is None or position is None:
+        return eta_minutes(UNKNOWN_PICKUP_KM)
+    return eta_minutes(haversine_km(*origin, *position))
+
+
+def claim_partners(order_ids, origin=None, pool=idle_pool):
+    """
+    Claim one idle partner per order in a single pass over the pool, nearest to
+    `origin` (restaurant lat, lon) first. Returns {order_id: Assignment}; orders
+    left out had no partner available.
+    """
+    claimed = {}
+    pending = list(order_ids)
+    rebuilt = False
+    for _ in range(MAX_CLAIM_ATTEMPTS):
+        if not pending:
+            break
+        candidates = pool.take(len(pending), near=origin)
+        if not candidates and not rebuilt:
+            # Pool may be stale (partners released by another process)
+            pool.rebuild()
+            rebuilt = True
+            candidates = pool.take(len(pending), near=origin)
+        if not candidates:
+            break
+
+        for index, partner in enumerate(candidates):
+            if not pending:
+                # Fewer conflicts than expected: hand back the unused candidates
+                for leftover in candidates[index:]:
+                    pool.add(leftover)
+                break
+            eta = _eta(partner["partner_id"], origin, pool.locations)
+            start = datetime.utcnow()
+            end = start + timedelta(minutes=eta)
+            won, order_taken, partner_taken = _try_claim(partner, pending[0], eta, start, end)
+            if order_taken:
+                # Assigned elsewhere meanwhile (or no longer ready): the partner is still idle,
+                # unless another process claimed it at the same time
+                if partner_taken:
+                    pool.conflicts += 1
+                else:
+                    pool.add(partner)
+                pool.orders_taken += 1
+                pending.pop(0)
+                continue
+            if won is None:
+                pool.conflicts += 1
+                continue
+            pool.claims += 1
+            claimed[pending.pop(0)] = Assignment(won, eta, start, end)
+
+    pool.exhausted += len(pending)
+    return claimed
+
+
+def release_partner(partner):
+    """Put a partner that just became idle back in the pool."""
+    idle_pool.add(partner)
+
+
+def free_partner(partner_id, order_id):
+    """Set a partner idle again if it is still on `order_id`; returns False when it already moved on."""
+    try:
+        response = delivery_partners_table.update_item(
+            Key={"partner_id": partner_id},
+            UpdateExpression="SET #s = :s, current_order_id = :none, delivery_end_time = :none",
+            ConditionExpression="current_order_id = :o",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": "idle", ":none": "-", ":o": order_id},
+            ReturnValues="ALL_NEW"
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False    # already released / reassigned; nothing to undo
+    release_partner(response["Attributes"])
+    return True
+
+
+# etag of the cached restaurant list -> {restaurant_id: (lat, lon) or None}
+_origins = (None, {})
+
+
+def restaurant_position(restaurant_id):
+    global _origins
+    entry = cached_restaurants_entry()
+    if _origins[0] != entry.etag:
+        _origins = (entry.etag, {
+            r["restaurant_id"]: parse_position(r) for r in entry.items if "restaurant_id" in r
+        })
+    return _origins[1].get(restaurant_id)
+
+
+def dispatch_orders(orders):
+    """
+    Assign partners to ready orders (items with order_id / restaurant_id): each
+    claim records the delivery on the order in the same transaction. Schedules
+    completion and returns {order_id: partner}.
+    """
+    by_restaurant = {}
+    for order in orders:
+        by_restaurant.setdefault(order.get("restaurant_id"), []).append(order)
+
+    assigned = {}
+    for restaurant_id, restaurant_orders in by_restaurant.items():
+        claimed = claim_partners([o["order_id"] for o in restaurant_orders], origin=restaurant_position(restaurant_id))
+        for order in restaurant_orders:
+            if order["order_id"] not in claimed:
+                continue
+            order_id = order["order_id"]
+            partner, eta, start, end = claimed[order_id]
+            schedule_delivery_completion(order_id, partner["partner_id"], end)
+            publish_order(order, "assigned", delivery_partner_id=partner["partner_id"],
+                          delivery_partner_name=partner["name"], eta_minutes=eta, delivery_status="assigned",
+                          delivery_start_time=start.isoformat(), delivery_end_time=end.isoformat())
+            logging.info("🛵 Order '%s' assigned to partner '%s' (ETA %s min)", order_id, partner['partner_id'], eta)
+            assigned[order_id] = partner
+    return assigned
+
+
+def dispatch_order(order):
+    return dispatch_orders([order]).get(order["order_id"])
+
+
+# === Partner positions ===
+_owners = {}            # partner_id -> partner name (the delivery user's identity)
+_persisted_at = {}      # partner_id -> monotonic time of the last DynamoDB write
+
+
+def update_partner_location(partner_id, username, lat, lon):
+    """
+    Move a partner in the spatial index. The position is written to DynamoDB at
+    most every LOCATION_PERSIST_SECONDS so pool rebuilds in other processes see it.
+    Raises LookupError for an unknown partner, PermissionError if it is not `username`'s.
+    """
+    owner = _owners.get(partner_id)
+    if owner is None:
+        item = delivery_partners_table.get_item(
+            Key={"partner_id": partner_id},
+            ProjectionExpression="partner_id, #n",
+            ExpressionAttributeNames={"#n": "name"}
+        ).get("Item")
+        if item is None:
+            raise LookupError(f"Delivery partner '{partner_id}' not found")
+        owner = _owners[partner_id] = item.get("name")
+    if owner != username:
+        raise PermissionError(f"Delivery partner '{partner_id}' does not belong to '{username}'")
+
+    partner_locations.update(partner_id, lat, lon)
+
+    now = time.monotonic()
+    if now - _persisted_at.get(partner_id, float("-inf")) >= LOCATION_PERSIST_SECONDS:
+        _persisted_at[partner_id] = now
+        delivery_partners_table.update_item(
+            Key={"partner_id": partner_id},
+            UpdateExpression="SET lat = :lat, lon = :lon, location_updated_at = :t",
+            ExpressionAttributeValues={
+                ":lat": Decimal(str(lat)), ":lon": Decimal(str(lon)),
+                ":t": datetime.utcnow().isoformat()
+            }
+        )
@@ -0,0 +1,345 @@
+# app/services/event_hub.py
+"""
+Pub/sub hub for real-time order updates, fanned out to per-user Server-Sent
+Events streams (see app.routes.events and the async route in app.routes.async_api).
+
+Handlers that place or change an order call `publish_order`; the event goes to
+the channel of everyone involved ("customer:<username>",
+"restaurant:<restaurant_id>", "delivery:<partner name>") and from there to every
+open stream on those channels. Each channel keeps its last HISTORY_SIZE events,
+so a client reconnecting with Last-Event-ID is sent what it missed; when that
+id is no longer in the history, the stream starts with a `resync` event and the
+client refetches its list once.
+
+Brokers carry events between processes:
+- LocalBroker: in-process only (single worker, tests).
+- RedisBroker: Redis pub/sub (EVENTS_REDIS_URL). Every worker receives every
+  event in the same order, so resuming works whichever worker a client
+  reconnects to. Events published while Redis is unreachable are lost; the
+  clients' next resync covers them.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from datetime import datetime
+from decimal import Decimal
+from itertools import count
+from app.services.metrics import register_collector
+
+HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", 50))
+HISTORY_CHANNELS = int(os.getenv("EVENTS_HISTORY_CHANNELS", 10000))
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 100))      # per stream; a client that falls further behind is disconnected
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+STREAM_MAX_SECONDS = float(os.getenv("EVENTS_STREAM_MAX_SECONDS", 300))
+RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 3000))
+REDIS_CHANNEL = os.getenv("EVENTS_REDIS_CHANNEL", "foodie:events")
+
+STREAM_ROLES = ("customer", "restaurant", "delivery")
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+ORDER_FIELDS = (
+    "order_id", "status", "delivery_status", "restaurant_id", "delivery_partner_id",
+    "delivery_partner_name", "eta_minutes", "delivery_end_time", "reason"
+)
+
+Event = namedtuple("Event", ["id", "channels", "kind", "data"])
+
+
+def encode_event(event):
+    return json.dumps(event._asdict(), separators=(",", ":"))
+
+
+def decode_event(raw):
+    return Event(**json.loads(raw))
+
+
+# === SSE wire format ===
+RETRY_FRAME = f"retry: {RETRY_MS}\n\n".encode()
+HEARTBEAT_FRAME = b": ping\n\n"
+# An empty id resets the client's Last-Event-ID, so its next reconnect starts fresh
+RESYNC_FRAME = b"id\nevent: resync\ndata: {}\n\n"
+
+
+def sse_frame(event):
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n".encode()
+
+
+# === Subscriptions ===
+class Subscription:
+    """One open stream on `channel`, consumed by a request thread."""
+
+    def __init__(self, channel, size=QUEUE_SIZE):
+        self.channel = channel
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """One open stream consumed by a coroutine; events are handed over to its event loop."""
+
+    def __init__(self, channel, loop, size=QUEUE_SIZE):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(size)
+        self.overflowed = False
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# === Brokers ===
+class LocalBroker:
+    """Delivers events to this process only."""
+    name = "local"
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, event):
+        self.deliver(event)
+
+
+class RedisBroker:
+    """Cross-worker broker over Redis pub/sub; `client` is a redis.Redis (or compatible stand-in) instance."""
+    name = "redis"
+
+    def __init__(self, client, channel=REDIS_CHANNEL):
+        self.client = client
+        self.channel = channel
+
+    def start(self, deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        threading.Thread(target=self._listen, args=(pubsub, deliver), name="events-redis", daemon=True).start()
+
+    def _listen(self, pubsub, deliver):
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        deliver(decode_event(message["data"]))
+            except Exception as e:
+                logging.error("❌ Event listener lost its Redis subscription: %s", e)
+                time.sleep(1)
+
+    def publish(self, event):
+        self.client.publish(self.channel, encode_event(event))
+
+
+# === Hub ===
+class EventHub:
+    def __init__(self, broker, history_size=HISTORY_SIZE, history_channels=HISTORY_CHANNELS):
+        self.broker = broker
+        self.history_size = history_size
+        self.history_channels = history_channels
+        self.history = OrderedDict()                 # channel -> deque of its latest events
+        self.subscribers = defaultdict(set)          # channel -> {Subscription}
+        self.lock = threading.Lock()
+        self.pid = None
+        self.origin = None
+        self.sequence = count(1)
+        self.published = self.delivered = self.publish_errors = self.resumes = self.resyncs = 0
+
+    def _ensure_started(self):
+        # Per process: a preloading parent's broker thread does not survive the fork
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.origin = uuid.uuid4().hex[:8]
+                self.broker.start(self.deliver)
+                self.pid = os.getpid()
+
+    def publish(self, channels, kind, data):
+        """Publish to `channels`; errors are logged, not raised (the write being announced already happened)."""
+        if not channels:
+            return None
+        self._ensure_started()
+        event = Event(f"{int(time.time() * 1000)}-{self.origin}-{next(self.sequence)}", sorted(set(channels)), kind, data)
+        try:
+            self.broker.publish(event)
+            self.published += 1
+            return event
+        except Exception as e:
+            self.publish_errors += 1
+            logging.error("❌ Failed to publish '%s' event: %s", kind, e)
+            return None
+
+    def deliver(self, event):
+        """Broker callback, once per event in every process: record it and push it to the open streams."""
+        with self.lock:
+            targets = []
+            for channel in event.channels:
+                history = self.history.get(channel)
+                if history is None:
+                    history = self.history[channel] = deque(maxlen=self.history_size)
+                    while len(self.history) > self.history_channels:
+                        self.history.popitem(last=False)
+                else:
+                    self.history.move_to_end(channel)
+                history.append(event)
+                targets.extend(self.subscribers.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.push(event)
+                self.delivered += 1
+            except RuntimeError:
+                pass    # its event loop is already closed
+
+    def subscribe(self, subscription, last_event_id=None):
+        """
+        Register `subscription`. Returns the events it missed after `last_event_id`,
+        or None when they are no longer all in the history (the client must resync).
+        """
+        self._ensure_started()
+        with self.lock:
+            self.subscribers[subscription.channel].add(subscription)
+            if not last_event_id:
+                return []
+            history = list(self.history.get(subscription.channel, ()))
+        for index, event in enumerate(history):
+            if event.id == last_event_id:
+                self.resumes += 1
+                return history[index + 1:]
+        self.resyncs += 1
+        return None
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.channel]
+
+    def stats(self):
+        return {
+            "broker": self.broker.name,
+            "channels": len(self.history),
+            "streams": sum(len(s) for s in self.subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "publish_errors": self.publish_errors,
+            "resumes": self.resumes,
+            "resyncs": self.resyncs
+        }
+
+
+def _broker():
+    redis_url = os.getenv("EVENTS_REDIS_URL")
+    if not redis_url:
+        return LocalBroker()
+    import redis  # optional dependency, only needed for the cross-worker broker
+    return RedisBroker(redis.Redis.from_url(redis_url))
+
+
+hub = EventHub(_broker())
+register_collector("events", hub.stats)
+
+
+# === Streams ===
+def user_channel(role, identity):
+    return f"{role}:{identity}"
+
+
+def stream_deadline(claims):
+    """Streams end when the access token expires (or after STREAM_MAX_SECONDS); the client reconnects with a fresh one."""
+    return min(claims.get("exp", float("inf")), time.time() + STREAM_MAX_SECONDS)
+
+
+def iter_stream(subscription, missed, deadline, hub=hub):
+    """SSE body for a request thread: missed events, then live events and heartbeats until `deadline`."""
+    try:
+        yield RETRY_FRAME
+        if missed is None:
+            yield RESYNC_FRAME
+        for event in missed or ():
+            yield sse_frame(event)
+        while not subscription.overflowed:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            event = subscription.get(min(HEARTBEAT_SECONDS, remaining))
+            yield HEARTBEAT_FRAME if event is None else sse_frame(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def aiter_stream(subscription, missed, deadline, hub=hub):
+    """Same as `iter_stream`, for an AsyncSubscription."""
+    try:
+        yield RETRY_FRAME
+        if missed is None:
+            yield RESYNC_FRAME
+        for event in missed or ():
+            yield sse_frame(event)
+        while not subscription.overflowed:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            event = await subscription.get(min(HEARTBEAT_SECONDS, remaining))
+            yield HEARTBEAT_FRAME if event is None else sse_frame(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+# === Order events ===
+def _plain(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def order_channels(order):
+    channels = []
+    if order.get("customer"):
+        channels.append(user_channel("customer", order["customer"]))
+    if order.get("restaurant_id"):
+        channels.append(user_channel("restaurant", order["restaurant_id"]))
+    # Delivery users sign in as the partner's name (see the delivery_partner_name orders index)
+    if order.get("delivery_partner_name") not in (None, "", "-"):
+        channels.append(user_channel("delivery", order["delivery_partner_name"]))
+    return channels
+
+
+def publish_order(order, kind, **changes):
+    """
+    Announce `order.<kind>` to everyone involved in an order. `order` is the
+    item as it was before the write (ALL_OLD) or as written; `changes` are the
+    attributes the write just set.
+    """
+    current = {**order, **changes}
+    data = {field: _plain(current[field]) for field in ORDER_FIELDS if current.get(field) not in (None, "-")}
+    if "status" in changes and order.get("status") != changes["status"]:
+        data["previous_status"] = order.get("status")
+    data["at"] = datetime.utcnow().isoformat()
+    return hub.publish(order_channels(current), f"order.{kind}", data)
@@ -0,0 +1,28 @@
+from flask import Blueprint, Response, request
+from flask_jwt_extended import get_jwt_identity, get_jwt
+from app.utils.role_utils import jwt_required, role_required
+from app.services.event_hub import (
+    hub, Subscription, STREAM_HEADERS, STREAM_ROLES, iter_stream, stream_deadline, user_channel
+)
+import logging
+
+events_bp = Blueprint("events", __name__)
+
+# ✅ Live order updates for the signed-in user (Server-Sent Events), instead of re-polling the order lists.
+#    Under gunicorn every open stream holds a request thread; the async mode (Frontend/asgi.py) parks them on its event loop.
+@events_bp.route("/stream", methods=["GET"])
+@jwt_required()
+@role_required(list(STREAM_ROLES))
+def stream_events():
+    claims = get_jwt()
+    username = get_jwt_identity()
+    subscription = Subscription(user_channel(claims["role"], username))
+    # Browsers resend the id of the last event they saw when they reconnect
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    missed = hub.subscribe(subscription, last_event_id)
+    logging.info("📡 Event stream opened by '%s' (%s)", username, claims['role'])
+    return Response(
+        iter_stream(subscription, missed, stream_deadline(claims)),
+        mimetype="text/event-stream",
+        headers=STREAM_HEADERS
+    )
@@ -0,0 +1,127 @@
+# app/services/geo.py
+"""
+In-process spatial index of delivery partner positions.
+
+Positions are bucketed into a fixed lat/lon grid (cells of GEO_CELL_DEGREES,
+~1.1 km at the default). A nearest-neighbour lookup searches rings of cells
+around the origin and stops as soon as no unvisited cell can hold anything
+closer than the k-th best hit, so it only touches the neighbourhood of the
+restaurant no matter how many partners are indexed. Moving a partner is an
+O(1) bucket swap; the index is never rebuilt wholesale.
+"""
+import heapq
+import math
+import os
+import threading
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+CELL_DEGREES = float(os.getenv("GEO_CELL_DEGREES", 0.01))
+MAX_SEARCH_KM = float(os.getenv("GEO_MAX_SEARCH_KM", 30))
+SPEED_KMH = float(os.getenv("DELIVERY_SPEED_KMH", 25))
+BASE_MINUTES = float(os.getenv("DELIVERY_BASE_MINUTES", 5))   # hand-off + average drop-off leg
+MIN_ETA_MINUTES = 3
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def eta_minutes(pickup_km):
+    """Minutes from assignment to delivery: ride to the restaurant plus the base drop-off leg."""
+    return max(MIN_ETA_MINUTES, math.ceil(BASE_MINUTES + pickup_km / SPEED_KMH * 60))
+
+
+def parse_position(item):
+    """(lat, lon) from an item with `lat` / `lon` attributes, or None."""
+    try:
+        return float(item["lat"]), float(item["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class GridIndex:
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell = cell_degrees
+        self.buckets = {}
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell)), int(math.floor(lon / self.cell))
+
+    def update(self, key, lat, lon):
+        cell = self._cell(lat, lon)
+        with self.lock:
+            previous = self.positions.get(key)
+            if previous is not None:
+                old_cell = self._cell(*previous)
+                if old_cell != cell:
+                    bucket = self.buckets[old_cell]
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.buckets[old_cell]
+            self.buckets.setdefault(cell, set()).add(key)
+            self.positions[key] = (lat, lon)
+
+    def remove(self, key):
+        with self.lock:
+            previous = self.positions.pop(key, None)
+            if previous is None:
+                return
+            cell = self._cell(*previous)
+            bucket = self.buckets[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[cell]
+
+    def position(self, key):
+        return self.positions.get(key)
+
+    def nearest(self, lat, lon, k=1, accept=None, max_km=MAX_SEARCH_KM):
+        """Return up to k [(distance_km, key)] closest to (lat, lon), nearest first."""
+        row, col = self._cell(lat, lon)
+        # Smallest ground distance one ring of cells can add (longitude cells shrink with latitude)
+        ring_km = self.cell * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + self.cell, 89.9))), 0.01)
+        max_rings = int(max_km / ring_km) + 1
+        best = []   # max-heap of (-distance, key), size <= k
+
+        with self.lock:
+            for ring in range(max_rings + 1):
+                if len(best) == k and (ring - 1) * ring_km > -best[0][0]:
+                    break
+                for cell in self._ring(row, col, ring):
+                    for key in self.buckets.get(cell, ()):
+                        if accept is not None and not accept(key):
+                            continue
+                        distance = haversine_km(lat, lon, *self.positions[key])
+                        if distance > max_km:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, key))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, key))
+
+        return sorted((-d, key) for d, key in best)
+
+    @staticmethod
+    def _ring(row, col, ring):
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    def __len__(self):
+        return len(self.positions)
+
+
+partner_locations = GridIndex()
@@ -0,0 +1,99 @@
+# app/utils/json_provider.py
+"""
+JSON provider for DynamoDB items.
+
+boto3 returns every number as `Decimal` (and sets / Binary for SS, NS, BS
+attributes), which Flask's default provider renders as strings, one item at a
+time in pure Python. `DynamoJSONProvider` serializes with orjson straight to
+bytes, turns Decimals into JSON numbers (int when integral, float otherwise)
+and sets into lists. Without orjson it falls back to the standard library
+with the same conversions.
+
+Output matches jsonify: sorted keys, compact unless the app is in debug mode,
+trailing newline. orjson writes UTF-8 as-is instead of \\u escapes.
+"""
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback below
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        if o != o.to_integral_value():
+            return float(o)
+        value = int(o)
+        # orjson only encodes 64-bit integers; larger ones (DynamoDB allows 38 digits) stay exact as strings
+        return value if -2 ** 63 <= value < 2 ** 64 else str(o)
+    if isinstance(o, (set, frozenset)):
+        try:
+            return sorted(o)
+        except TypeError:
+            return list(o)
+    if isinstance(o, date):
+        return http_date(o)
+    if hasattr(o, "value") and isinstance(o.value, bytes):   # boto3 Binary
+        return base64.b64encode(o.value).decode("ascii")
+    if isinstance(o, bytes):
+        return base64.b64encode(o).decode("ascii")
+    return DefaultJSONProvider.default(o)
+
+
+def project(obj, fields):
+    """
+    Keep only the top-level `fields` of an item, or of every item in a list.
+    The kept values are shared, not copied. `fields=None` returns `obj` as is.
+    """
+    if fields is None:
+        return obj
+    if isinstance(obj, dict):
+        return {k: obj[k] for k in fields if k in obj}
+    return [{k: item[k] for k in fields if k in item} for item in obj]
+
+
+class DynamoJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _options(self, indent=None, sort_keys=None):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumpb(self, obj, indent=None, sort_keys=None, newline=False):
+        """Serialize to UTF-8 bytes (no str round trip with orjson)."""
+        if orjson is None:
+            text = super().dumps(obj, indent=indent, separators=None if indent else (",", ":"),
+                                 **({} if sort_keys is None else {"sort_keys": sort_keys}))
+            return (text + "\n" if newline else text).encode()
+        option = self._options(indent, sort_keys)
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # `separators` / `ensure_ascii` are stdlib knobs; orjson output is always compact UTF-8
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=_default, option=self._options(kwargs.get("indent"), kwargs.get("sort_keys"))
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self.compact is False or (self.compact is None and self._app.debug) else None
+        return self._app.response_class(self.dumpb(obj, indent=indent, newline=True), mimetype=self.mimetype)
@@ -0,0 +1,199 @@
+# app/services/leader.py
+"""
+Single-owner election for background work that must run in exactly one
+process (the delivery scheduler's DynamoDB sweeps), however many server
+workers / instances are up.
+
+Every process runs a `LeaderElection` that keeps trying to take a lease;
+whoever holds it is the owner. Two lease backends:
+
+- FileLease: an exclusive POSIX lock on a local file. The kernel drops it
+  when the owning process dies, so another worker takes over on its next
+  attempt. Covers every worker on one host.
+- DynamoDBLease: a lease item with an expiry, taken and renewed with
+  conditional writes. A dead owner stops renewing and the lease is taken
+  over once it expires. Covers several hosts (clocks must be NTP-synced).
+"""
+import fcntl
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+LEADER_BACKEND = os.getenv("SCHEDULER_LEADER_BACKEND", "file")     # file | dynamodb | none
+LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", "scheduler.lock")
+LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", 30))
+RENEW_SECONDS = float(os.getenv("SCHEDULER_RENEW_SECONDS", LEASE_SECONDS / 3))
+
+
+class FileLease:
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def acquire(self):
+        # lockf locks belong to the process (not inherited by forked children), unlike flock
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        os.ftruncate(self.fd, 0)
+        os.pwrite(self.fd, f"{os.getpid()}\n".encode(), 0)
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)   # closing drops the lock
+            self.fd = None
+
+
+class DynamoDBLease:
+    def __init__(self, table, name, owner, seconds=LEASE_SECONDS):
+        self.table = table
+        self.name = name
+        self.owner = owner
+        self.seconds = seconds
+
+    def acquire(self):
+        """Take the lease if it is free, expired or already ours, and push its expiry forward."""
+        now = time.time()
+        try:
+            self.table.put_item(
+                Item={
+                    "lease_name": self.name,
+                    "owner": self.owner,
+                    "expires_at": Decimal(str(round(now + self.seconds, 3)))
+                },
+                ConditionExpression="attribute_not_exists(lease_name) OR expires_at < :now OR #o = :me",
+                ExpressionAttributeNames={"#o": "owner"},
+                ExpressionAttributeValues={":now": Decimal(str(round(now, 3))), ":me": self.owner}
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def release(self):
+        try:
+            self.table.delete_item(
+                Key={"lease_name": self.name},
+                ConditionExpression="#o = :me",
+                ExpressionAttributeNames={"#o": "owner"},
+                ExpressionAttributeValues={":me": self.owner}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+
+class AlwaysLease:
+    """No election: every process owns the work (single-process deployments)."""
+
+    def acquire(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def lease_for(name, backend=LEADER_BACKEND, lock_path=LOCK_PATH):
+    if backend == "file":
+        return FileLease(lock_path)
+    if backend == "dynamodb":
+        from app.services.db import leases_table
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        return DynamoDBLease(leases_table, name, owner)
+    if backend == "none":
+        return AlwaysLease()
+    raise ValueError(f"Unknown leader election backend '{backend}'")
+
+
+class LeaderElection:
+    """
+    Keep trying to hold `lease`; call `on_elected()` when this process becomes
+    the owner and `on_demoted()` when it stops being one. The lease is created
+    on `start()`, i.e. in the serving process, never in a preloading parent.
+    """
+
+    def __init__(self, name, on_elected, on_demoted, backend=LEADER_BACKEND, lock_path=LOCK_PATH,
+                 renew_seconds=RENEW_SECONDS, lease_seconds=LEASE_SECONDS):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.backend = backend
+        self.lock_path = lock_path
+        self.renew_seconds = renew_seconds
+        self.lease_seconds = lease_seconds
+        self.lease = None
+        self.leader = False
+        self.held_until = 0.0
+        self.stopping = threading.Event()
+        self.thread = None
+        self.elections = self.demotions = self.errors = 0
+
+    def _attempt(self):
+        try:
+            held = self.lease.acquire()
+            if held:
+                self.held_until = time.monotonic() + self.lease_seconds
+        except Exception as e:
+            self.errors += 1
+            logging.error("❌ Leader election '%s' failed to reach its lease: %s", self.name, e)
+            # Keep running until the lease we last renewed could have been taken over
+            held = self.leader and time.monotonic() < self.held_until - self.renew_seconds
+
+        if held and not self.leader:
+            self.leader = True
+            self.elections += 1
+            logging.info("👑 Process %s elected '%s' owner", os.getpid(), self.name)
+            self.on_elected()
+        elif not held and self.leader:
+            self.leader = False
+            self.demotions += 1
+            logging.warning("⚠️ Process %s lost '%s' ownership", os.getpid(), self.name)
+            self.on_demoted()
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                self._attempt()
+            except Exception as e:
+                logging.error("❌ Leader election '%s' callback failed: %s", self.name, e)
+            self.stopping.wait(self.renew_seconds)
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.lease = lease_for(self.name, self.backend, self.lock_path)
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Step down and free the lease so another process takes over right away."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.leader:
+            self.leader = False
+            self.on_demoted()
+        if self.lease is not None:
+            self.lease.release()
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "leader": self.leader,
+            "pid": os.getpid(),
+            "elections": self.elections,
+            "demotions": self.demotions,
+            "errors": self.errors
+        }
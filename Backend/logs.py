@@ -0,0 +1,217 @@
+# app/utils/logs.py
+"""
+Queued, structured logging.
+
+Request threads only build the LogRecord and put it on a bounded queue; a
+QueueListener thread formats it and writes the rotating log file, so file I/O
+and the rotation lock are off the request path. Lines are JSON (LOG_FORMAT=text
+keeps the old layout) and carry the id of the request that logged them: the
+client's X-Request-ID when it sent a sane one, a fresh one otherwise, echoed
+back on the response.
+
+High-volume INFO call sites are sampled: per call site, the first
+LOG_SAMPLE_BURST records of every second are kept, then one in
+LOG_SAMPLE_EVERY (the kept ones carry `sample_rate`). Warnings and errors are
+always kept. When the queue is full (the disk cannot keep up) a request waits
+at most LOG_QUEUE_FULL_WAIT_MS for room, then its record is dropped and
+counted.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import request
+from app.services.metrics import register_collector
+
+LOG_PATH = os.getenv("LOG_PATH", "flask_app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 1_000_000))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 3))
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# How long a request waits for room in a full queue before its record is dropped
+QUEUE_FULL_WAIT = float(os.getenv("LOG_QUEUE_FULL_WAIT_MS", 50)) / 1000
+SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", 100))     # 0 keeps every record
+SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", 10))
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+request_id = ContextVar("request_id", default=None)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+# Attributes every LogRecord has; anything else was passed with extra={...} and is written out
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "_json"}
+
+
+def new_request_id(header=None):
+    """The client's X-Request-ID if it is a plain token of at most 64 characters, else a new id."""
+    return header if header and _REQUEST_ID.match(header) else uuid.uuid4().hex
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        # RotatingFileHandler formats every record twice (once to size it for rollover)
+        cached = record.__dict__.get("_json")
+        if cached is not None:
+            return cached
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry["pid"] = record.process
+        entry["thread"] = record.threadName
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        record._json = json.dumps(entry, ensure_ascii=False, default=str)
+        return record._json
+
+
+class Sampler(logging.Filter):
+    """Keeps the first `burst` INFO/DEBUG records per call site and second, then one in `every`."""
+
+    def __init__(self, burst=SAMPLE_BURST, every=SAMPLE_EVERY):
+        super().__init__()
+        self.burst = burst
+        self.every = max(every, 1)
+        self.lock = threading.Lock()
+        self.second = None
+        self.counts = {}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.burst <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        second = int(record.created)
+        with self.lock:
+            if second != self.second:
+                self.second = second
+                self.counts = {}
+            seen = self.counts[site] = self.counts.get(site, 0) + 1
+            if seen <= self.burst:
+                return True
+            if (seen - self.burst) % self.every == 0:
+                record.sample_rate = self.every
+                return True
+            self.sampled_out += 1
+            return False
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)     # waits for room: the queue may be full when stopping
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread writing to `handlers`. The
+    listener is started per process: a preloading parent's thread does not
+    survive the fork.
+    """
+
+    def __init__(self, *handlers, size=QUEUE_SIZE):
+        super().__init__(queue.Queue(size))
+        self.targets = handlers
+        self.size = size
+        self.pid = None
+        self.listener = None
+        self.start_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.pid != os.getpid():
+                self.queue = queue.Queue(self.size)
+                self.listener = _Listener(self.queue, *self.targets, respect_handler_level=True)
+                self.listener.start()
+                self.pid = os.getpid()
+
+    def prepare(self, record):
+        # Only the message is rendered here (its arguments may change once the call returns);
+        # JSON encoding and tracebacks are left to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record):
+        self._ensure_started()
+        try:
+            self.queue.put(record, timeout=QUEUE_FULL_WAIT)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Write out what is still queued (at exit)."""
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.pid = None
+
+
+def file_handler(path=LOG_PATH, log_format=LOG_FORMAT):
+    handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+_handler = None
+_sampler = Sampler()
+
+
+def configure_logging(path=LOG_PATH, log_format=LOG_FORMAT, level=LOG_LEVEL):
+    """Route the root logger through one QueuedHandler (once per process; later calls return it)."""
+    global _handler
+    if _handler is None:
+        _handler = QueuedHandler(file_handler(path, log_format))
+        _handler.addFilter(_sampler)
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_handler)
+        atexit.register(_handler.stop)
+        register_collector("logging", stats)
+    return _handler
+
+
+def stats():
+    return {
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "sampled_out": _sampler.sampled_out
+    }
+
+
+def init_logging(app):
+    configure_logging()
+
+    @app.before_request
+    def assign_request_id():
+        request_id.set(new_request_id(request.headers.get("X-Request-ID")))
+
+    @app.after_request
+    def echo_request_id(response):
+        if request_id.get():
+            response.headers["X-Request-ID"] = request_id.get()
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc=None):
+        request_id.set(None)
+    return app
@@ -1,8 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
 from app.services.db import menus_table
-from app.utils.role_utils import role_required
-from boto3.dynamodb.conditions import Key
+from app.services.cache import cached_menu, invalidate_menu
+from app.utils.role_utils import jwt_required, role_required
 import uuid
 
 menu_bp = Blueprint("menu", __name__)
@@ -30,6 +30,7 @@ def create_menu_item():
     }
 
     menus_table.put_item(Item=item)
+    invalidate_menu(item["restaurant_id"])
     return jsonify({"message": "Menu item created", "menu_id": item["menu_id"]}), 201
 
 # ✅ Get all menu items for a restaurant
@@ -37,11 +38,7 @@ def create_menu_item():
 @jwt_required()
 @role_required("restaurant")
 def get_menu_items(restaurant_id):
-    res = menus_table.query(
-        IndexName="restaurant_id-index",
-        KeyConditionExpression=Key("restaurant_id").eq(restaurant_id)
-    )
-    return jsonify(res.get("Items", [])), 200
+    return jsonify(cached_menu(restaurant_id)), 200
 
 # ✅ Update a menu item
 @menu_bp.route("/restaurant/menu/<menu_id>", methods=["PUT"])
@@ -61,11 +58,13 @@ def update_menu_item(menu_id):
     if not expression:
         return jsonify({"error": "No valid fields to update"}), 400
 
-    menus_table.update_item(
+    response = menus_table.update_item(
         Key={"menu_id": menu_id},
         UpdateExpression="SET " + ", ".join(expression),
-        ExpressionAttributeValues=values
+        ExpressionAttributeValues=values,
+        ReturnValues="ALL_NEW"
     )
+    invalidate_menu(response.get("Attributes", {}).get("restaurant_id"))
 
     return jsonify({"message": "Menu item updated"}), 200
 
@@ -74,7 +73,8 @@ def update_menu_item(menu_id):
 @jwt_required()
 @role_required("restaurant")
 def delete_menu_item(menu_id):
-    menus_table.delete_item(Key={"menu_id": menu_id})
+    response = menus_table.delete_item(Key={"menu_id": menu_id}, ReturnValues="ALL_OLD")
+    invalidate_menu(response.get("Attributes", {}).get("restaurant_id"))
     return jsonify({"message": "Menu item deleted"}), 200
 
 # ✅ Toggle availability
@@ -86,10 +86,12 @@ def toggle_availability(menu_id):
     if "is_available" not in data:
         return jsonify({"error": "Missing 'is_available' field"}), 400
 
-    menus_table.update_item(
+    response = menus_table.update_item(
         Key={"menu_id": menu_id},
         UpdateExpression="SET is_available = :val",
-        ExpressionAttributeValues={":val": data["is_available"]}
+        ExpressionAttributeValues={":val": data["is_available"]},
+        ReturnValues="ALL_NEW"
     )
+    invalidate_menu(response.get("Attributes", {}).get("restaurant_id"))
 
     return jsonify({"message": "Availability updated"}), 200
@@ -0,0 +1,252 @@
+# app/services/metrics.py
+"""
+Process-wide registry of metric collectors, plus latency histograms and
+counters exposed in the Prometheus text format.
+
+Subsystems register a zero-argument callable returning a dict of counters /
+gauges; `snapshot()` gathers them all for the admin metrics endpoint.
+
+Hot paths record into `histogram()` / `counter()` series (a dict lookup and a
+bisect under a lock per observation); `render_prometheus()` writes them out
+for /metrics, followed by the numeric collector values as gauges. Series live
+in each process. With METRICS_DIR set, every process also saves its series
+there every METRICS_FLUSH_SECONDS and a scrape adds up the files of all
+processes, so one gunicorn worker answers for all of them (the flush thread
+is started with the other background services). Files of exited workers are
+kept so totals never go backwards; clear the directory when the server
+starts (gunicorn.conf.py does). The files are JSON, so a scrape only parses
+numbers and strings from them.
+"""
+import bisect
+import glob
+import logging
+import math
+import json
+import os
+import re
+import threading
+import time
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+PREFIX = "foodie_"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_collectors = {}
+_series = {}
+_lock = threading.Lock()
+
+
+def register_collector(name, collect):
+    with _lock:
+        _collectors[name] = collect
+
+
+def snapshot():
+    with _lock:
+        collectors = dict(_collectors)
+
+    result = {}
+    for name, collect in collectors.items():
+        try:
+            result[name] = collect()
+        except Exception as e:
+            logging.error("❌ Metrics collector '%s' failed: %s", name, e)
+    return result
+
+
+# === Series ===
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}        # label values -> [count per bucket..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(label_values)
+            if counts is None:
+                counts = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def state(self):
+        with self.lock:
+            return {labels: list(counts) for labels, counts in self.values.items()}
+
+    @staticmethod
+    def merge(into, counts):
+        return counts if into is None else [a + b for a, b in zip(into, counts)]
+
+    def lines(self, values):
+        for label_values, counts in sorted(values.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                yield f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}'
+            yield f"{self.name}_sum{_braced(labels)} {counts[-1]}"
+            yield f"{self.name}_count{_braced(labels)} {cumulative}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def state(self):
+        with self.lock:
+            return dict(self.values)
+
+    @staticmethod
+    def merge(into, value):
+        return value if into is None else into + value
+
+    def lines(self, values):
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}_total{_braced(_labels(self.labels, label_values))} {value}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _braced(labels):
+    return f"{{{labels}}}" if labels else ""
+
+
+def _register(series):
+    with _lock:
+        return _series.setdefault(series.name, series)
+
+
+def histogram(name, help_text, labels, buckets=LATENCY_BUCKETS):
+    return _register(Histogram(PREFIX + name, help_text, labels, buckets))
+
+
+def counter(name, help_text, labels):
+    return _register(Counter(PREFIX + name, help_text, labels))
+
+
+# === Cross-process aggregation (METRICS_DIR) ===
+def _states():
+    with _lock:
+        series = dict(_series)
+    return {name: s.state() for name, s in series.items()}
+
+
+def flush():
+    """Save this process's series to METRICS_DIR (atomically, one file per pid)."""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+    # {series name: [[label values, value], ...]}: label tuples are not JSON keys
+    states = {name: [[list(labels), value] for labels, value in values.items()] for name, values in _states().items()}
+    with open(path + ".tmp", "w") as f:
+        json.dump(states, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def clear_metrics_dir():
+    """Drop the files of previous runs (call once when the server starts, before workers fork)."""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*")):
+        os.remove(path)
+
+
+_flusher = None
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            logging.error("❌ Failed to save metrics to %s: %s", METRICS_DIR, e)
+
+
+def start_metrics_flush():
+    """Save this process's series every FLUSH_SECONDS (no-op without METRICS_DIR); call once per serving process."""
+    global _flusher
+    if not METRICS_DIR or (_flusher is not None and _flusher.is_alive()):
+        return
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def _merged_states():
+    states = {name: dict(values) for name, values in _states().items()}
+    if not METRICS_DIR:
+        return states
+    own = f"metrics-{os.getpid()}.json"
+    with _lock:
+        series = dict(_series)
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+        if os.path.basename(path) == own:
+            continue
+        try:
+            with open(path) as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, values in other.items():
+            if name not in series:
+                continue
+            merged = states.setdefault(name, {})
+            for label_values, value in values:
+                label_values = tuple(label_values)
+                merged[label_values] = series[name].merge(merged.get(label_values), value)
+    return states
+
+
+# === Exposition ===
+def _gauge_lines(prefix, value):
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        yield f"{prefix} {value}"
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _gauge_lines(f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}", item)
+
+
+def render_prometheus():
+    """Prometheus text exposition (version 0.0.4) of every series, then this process's collector values."""
+    states = _merged_states()
+    with _lock:
+        series = dict(_series)
+    lines = []
+    for name, s in sorted(series.items()):
+        lines.append(f"# HELP {name} {s.help}")
+        lines.append(f"# TYPE {name} {s.kind}")
+        lines.extend(s.lines(states.get(name, {})))
+    for name, values in snapshot().items():
+        gauges = list(_gauge_lines(PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name), values))
+        for line in gauges:
+            lines.append(f"# TYPE {line.split(' ', 1)[0]} gauge")
+            lines.append(line)
+    return "\n".join(lines) + "\n"
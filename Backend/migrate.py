@@ -0,0 +1,209 @@
+# app/services/migrate.py
+"""
+Creates the secondary indexes declared in app.services.db.TABLE_INDEXES and
+backfills the attributes they are keyed on. Also creates the tables added
+after the original deployment (NEW_TABLES), freezes `total_price` on legacy
+orders and rebuilds the per-restaurant order stats from them.
+
+Usage:
+    python -m app.services.migrate              # create indexes + backfill
+    python -m app.services.migrate --dry-run    # only report what would change
+"""
+import argparse
+import time
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from app.services.db import (
+    dynamodb, menus_table, orders_table, restaurants_table, TABLE_INDEXES, menus_for_restaurant_query, query_all
+)
+from app.services import order_stats
+
+# Orders written before `order_time` was mandatory are invisible to the
+# customer / restaurant indexes; give them a sortable placeholder.
+LEGACY_ORDER_TIME = "1970-01-01T00:00:00"
+
+# Tables that did not exist in the original deployment: table name -> (partition key, sort key or None)
+NEW_TABLES = {
+    "Leases": ("lease_name", None),                 # scheduler election with SCHEDULER_LEADER_BACKEND=dynamodb
+    "RestaurantStats": ("restaurant_id", "bucket"), # app.services.order_stats
+}
+
+
+def _wait_for_index(table, index_name, poll_seconds=10):
+    while True:
+        table.reload()
+        indexes = {i["IndexName"]: i for i in table.global_secondary_indexes or []}
+        if indexes.get(index_name, {}).get("IndexStatus") == "ACTIVE":
+            return
+        print(f"⏳ Waiting for {table.name}.{index_name} to become ACTIVE...")
+        time.sleep(poll_seconds)
+
+
+def ensure_table(table_name, hash_key, range_key=None, dry_run=False):
+    """Create an on-demand table with the given key unless it already exists."""
+    try:
+        dynamodb.Table(table_name).load()
+        return False
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ResourceNotFoundException":
+            raise
+
+    print(f"➕ Creating table {table_name} ({hash_key}, {range_key})")
+    if not dry_run:
+        key_attributes = [hash_key] + ([range_key] if range_key else [])
+        table = dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": name, "KeyType": key_type}
+                for name, key_type in zip(key_attributes, ["HASH", "RANGE"])
+            ],
+            AttributeDefinitions=[{"AttributeName": name, "AttributeType": "S"} for name in key_attributes],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        table.wait_until_exists()
+    return True
+
+
+def ensure_indexes(table_name, dry_run=False):
+    """Create every declared GSI missing on `table_name` (DynamoDB allows one per UpdateTable call)."""
+    table = dynamodb.Table(table_name)
+    table.load()
+    existing = {i["IndexName"] for i in table.global_secondary_indexes or []}
+    created = []
+
+    for index_name, (hash_key, range_key) in TABLE_INDEXES.get(table_name, {}).items():
+        if index_name in existing:
+            continue
+        print(f"➕ Creating index {table_name}.{index_name} ({hash_key}, {range_key})")
+        created.append(index_name)
+        if dry_run:
+            continue
+
+        key_attributes = [hash_key] + ([range_key] if range_key else [])
+        create = {
+            "IndexName": index_name,
+            "KeySchema": [
+                {"AttributeName": name, "KeyType": key_type}
+                for name, key_type in zip(key_attributes, ["HASH", "RANGE"])
+            ],
+            "Projection": {"ProjectionType": "ALL"}
+        }
+        billing = (table.billing_mode_summary or {}).get("BillingMode", "PROVISIONED")
+        if billing == "PROVISIONED":
+            throughput = table.provisioned_throughput
+            create["ProvisionedThroughput"] = {
+                "ReadCapacityUnits": throughput["ReadCapacityUnits"],
+                "WriteCapacityUnits": throughput["WriteCapacityUnits"]
+            }
+
+        table.update(
+            AttributeDefinitions=[{"AttributeName": name, "AttributeType": "S"} for name in key_attributes],
+            GlobalSecondaryIndexUpdates=[{"Create": create}]
+        )
+        _wait_for_index(table, index_name)
+
+    return created
+
+
+def backfill_order_time(dry_run=False):
+    """Set `order_time` on legacy orders so they show up in the order_time-sorted indexes."""
+    params = {
+        "FilterExpression": Attr("order_time").not_exists(),
+        "ProjectionExpression": "order_id, delivery_start_time"
+    }
+    updated = 0
+    while True:
+        response = orders_table.scan(**params)
+        for order in response.get("Items", []):
+            updated += 1
+            if dry_run:
+                continue
+            orders_table.update_item(
+                Key={"order_id": order["order_id"]},
+                UpdateExpression="SET order_time = :t",
+                ConditionExpression="attribute_not_exists(order_time)",
+                ExpressionAttributeValues={":t": order.get("delivery_start_time", LEGACY_ORDER_TIME)}
+            )
+        if "LastEvaluatedKey" not in response:
+            break
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    print(f"🩹 Backfilled order_time on {updated} orders")
+    return updated
+
+
+def backfill_total_price(dry_run=False):
+    """Freeze `total_price` on orders placed before it was stored (items without a copied price use the menu)."""
+    menus = {}
+    params = {
+        "FilterExpression": Attr("total_price").not_exists(),
+        "ProjectionExpression": "order_id, restaurant_id, #i",
+        "ExpressionAttributeNames": {"#i": "items"}
+    }
+    updated = 0
+    while True:
+        response = orders_table.scan(**params)
+        for order in response.get("Items", []):
+            restaurant_id = order.get("restaurant_id")
+            if restaurant_id not in menus:
+                menu = query_all(menus_table, **menus_for_restaurant_query(restaurant_id)) if restaurant_id else []
+                menus[restaurant_id] = {item["name"].lower(): item for item in menu if "name" in item}
+            items = [
+                {**{k: v for k, v in menus[restaurant_id].get(item.get("name", "").lower(), {}).items()
+                    if k.startswith("price_")}, **item}
+                for item in order.get("items", [])
+            ]
+            updated += 1
+            if dry_run:
+                continue
+            orders_table.update_item(
+                Key={"order_id": order["order_id"]},
+                UpdateExpression="SET total_price = :p",
+                ConditionExpression="attribute_not_exists(total_price)",
+                ExpressionAttributeValues={":p": order_stats.order_total(items)}
+            )
+        if "LastEvaluatedKey" not in response:
+            break
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    print(f"🩹 Backfilled total_price on {updated} orders")
+    return updated
+
+
+def rebuild_restaurant_stats(dry_run=False):
+    """Recompute the RestaurantStats aggregates of every restaurant from its orders."""
+    params = {"ProjectionExpression": "restaurant_id"}
+    rebuilt = 0
+    while True:
+        response = restaurants_table.scan(**params)
+        for restaurant in response.get("Items", []):
+            rebuilt += 1
+            if not dry_run:
+                order_stats.rebuild(restaurant["restaurant_id"])
+        if "LastEvaluatedKey" not in response:
+            break
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    print(f"📊 Rebuilt order stats of {rebuilt} restaurants")
+    return rebuilt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create DynamoDB secondary indexes and backfill their keys")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without applying them")
+    parser.add_argument("--skip-backfill", action="store_true", help="only create missing indexes")
+    args = parser.parse_args(argv)
+
+    for table_name, (hash_key, range_key) in NEW_TABLES.items():
+        ensure_table(table_name, hash_key, range_key, dry_run=args.dry_run)
+    for table_name in TABLE_INDEXES:
+        ensure_indexes(table_name, dry_run=args.dry_run)
+    if not args.skip_backfill:
+        backfill_order_time(dry_run=args.dry_run)
+        backfill_total_price(dry_run=args.dry_run)
+        rebuild_restaurant_stats(dry_run=args.dry_run)
+    print("✅ Migration complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.db import orders_table, menus_table
-from app.utils.role_utils import role_required
-from boto3.dynamodb.conditions import Key, Attr
+from flask_jwt_extended import get_jwt_identity
+from app.services.db import orders_table, restaurant_orders_query
+from app.services.order_state import transition, OrderNotFound, StaleTransition
+from app.utils.role_utils import jwt_required, role_required
+from app.utils.pagination import list_response
+from boto3.dynamodb.conditions import Key
 from datetime import datetime
 import uuid
 import logging
@@ -18,12 +20,8 @@ def get_orders_for_restaurant():
     if not restaurant_id:
         return jsonify({"error": "Missing restaurant_id"}), 400
 
-    result = orders_table.scan(
-        FilterExpression=Attr("restaurant_id").eq(restaurant_id)
-    )
-    orders = result.get("Items", [])
-    sorted_orders = sorted(orders, key=lambda x: x.get("order_time", ""), reverse=True)
-    return jsonify({"orders": sorted_orders}), 200
+    # ✅ Index sort key already returns newest orders first
+    return list_response(orders_table.query, envelope="orders", **restaurant_orders_query(restaurant_id))
 
 # ✅ Update order status (Accept, Reject, Ready, Delivered, etc.)
 @order_bp.route("/restaurant/order/<order_id>", methods=["PUT"])
@@ -37,15 +35,14 @@ def update_order_status(order_id):
         return jsonify({"error": "Invalid status"}), 400
 
     try:
-        orders_table.update_item(
-            Key={"order_id": order_id},
-            UpdateExpression="SET #s = :status",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":status": new_status}
-        )
+        transition(order_id, new_status, "restaurant", get_jwt_identity())
         return jsonify({"message": f"Order {order_id} status updated to {new_status}"}), 200
+    except OrderNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except StaleTransition as e:
+        return jsonify({"error": str(e), "status": e.current_status}), 409
     except Exception as e:
-        logging.error(f"❗ Error updating order status: {str(e)}")
+        logging.error("❗ Error updating order status: %s", e)
         return jsonify({"error": "Failed to update order status"}), 500
 
 # ✅ (Optional) You can also add PATCH endpoint for partial updates or future extensions
@@ -0,0 +1,114 @@
+# app/services/order_intake.py
+"""
+Order intake: validates requested items against the menu and persists orders.
+
+Item names are resolved through the cached per-restaurant name -> menu_id index,
+then only the referenced menu items are read (BatchGetItem) so prices come from
+the table rather than a possibly stale cache entry. Those prices are copied
+onto the order items and their sum is frozen as the order's `total_price`.
+"""
+import uuid
+from datetime import datetime
+from app.services.db import menus_table, orders_table, batch_get, batch_write
+from app.services.cache import cached_menu_names
+from app.services.order_stats import order_total, record_placed
+from app.services.event_hub import publish_order
+
+REQUIRED_FIELDS = {"restaurant_id", "items", "customer_name", "customer_email", "customer_contact", "unique_customer_id"}
+VALID_SIZES = ["small", "medium", "large"]
+MAX_BATCH_ORDERS = 100
+
+
+class InvalidOrder(ValueError):
+    pass
+
+
+def _requested_items(data):
+    """Validate one order payload; returns [(item request, size, quantity, menu_id)]."""
+    if not REQUIRED_FIELDS.issubset(data):
+        raise InvalidOrder("Missing required fields")
+
+    names = cached_menu_names(data["restaurant_id"])
+    requested = []
+    for i in data["items"]:
+        name = i.get("name", "").lower()
+        size = i.get("size", "").lower()
+        if name not in names or size not in VALID_SIZES:
+            raise InvalidOrder(f"Invalid item: {i}")
+        requested.append((i, size, int(i.get("quantity", 1)), names[name]))
+    return requested
+
+
+def _build_order(customer_id, data, requested, menu_items):
+    order_items = []
+    for i, size, quantity, menu_id in requested:
+        menu_item = menu_items.get(menu_id)
+        if menu_item is None or menu_item.get("restaurant_id") != data["restaurant_id"]:
+            # Deleted / moved since the name index was built
+            raise InvalidOrder(f"Invalid item: {i}")
+        order_items.append({
+            "name": menu_item["name"],
+            "menu_id": menu_id,
+            "size": size,
+            "quantity": quantity,
+            "price_small": menu_item.get("price_small", "0"),
+            "price_medium": menu_item.get("price_medium", "0"),
+            "price_large": menu_item.get("price_large", "0"),
+            "prep_time": menu_item.get("prep_time", "1")
+        })
+
+    return {
+        "order_id": str(uuid.uuid4()),
+        "unique_customer_id": data["unique_customer_id"],
+        "customer": customer_id,
+        "restaurant_id": data["restaurant_id"],
+        "items": order_items,
+        "total_price": order_total(order_items),
+        "status": "pending",
+        "order_time": datetime.utcnow().isoformat(),
+        "customer_name": data["customer_name"],
+        "customer_email": data["customer_email"],
+        "customer_contact": data["customer_contact"]
+    }
+
+
+def prepare_orders(customer_id, payloads):
+    """Validate every payload and build the order items, reading all referenced menu items in one batch."""
+    requested = [_requested_items(data) for data in payloads]
+    menu_ids = sorted({menu_id for items in requested for *_, menu_id in items})
+    menu_items = {
+        item["menu_id"]: item
+        for item in batch_get(menus_table, [{"menu_id": menu_id} for menu_id in menu_ids])
+    }
+    return [
+        _build_order(customer_id, data, items, menu_items)
+        for data, items in zip(payloads, requested)
+    ]
+
+
+def place_order(customer_id, data):
+    order = prepare_orders(customer_id, [data])[0]
+    orders_table.put_item(Item=order)
+    record_placed(order)
+    publish_order(order, "placed")
+    return order
+
+
+def place_orders(customer_id, payloads):
+    """
+    Validate and write a batch of orders; returns (placed, failed). Orders in
+    `failed` were not stored and can be resubmitted; only `placed` ones are
+    counted and published. Raises when nothing could be written.
+    """
+    if len(payloads) > MAX_BATCH_ORDERS:
+        raise InvalidOrder(f"At most {MAX_BATCH_ORDERS} orders per batch")
+    orders = prepare_orders(customer_id, payloads)
+    unwritten = {order["order_id"] for order in batch_write(orders_table, orders)}
+    if len(unwritten) == len(orders):
+        raise RuntimeError("No order of the batch could be written")
+    placed = [order for order in orders if order["order_id"] not in unwritten]
+    failed = [order for order in orders if order["order_id"] in unwritten]
+    for order in placed:
+        record_placed(order)
+        publish_order(order, "placed")
+    return placed, failed
@@ -0,0 +1,122 @@
+# app/services/order_state.py
+"""
+Order state machine: every order status change goes through `transition`.
+
+A transition is checked against TRANSITIONS (which statuses it may follow and
+which roles may make it) and written as one conditional UpdateItem that sets
+the status together with everything that changes with it (delivery_status,
+delivered_at, reason, updated_by). The condition pins the allowed previous
+statuses and the caller's ownership of the order, so a stale or concurrent
+transition fails inside DynamoDB instead of overwriting a newer status. On
+failure DynamoDB hands back the current item (ReturnValuesOnConditionCheckFailure),
+which tells "no such order" from "already moved on" without another read. On
+success the previous item (ALL_OLD) feeds the order stats and the event hub.
+
+Assigning a partner changes the order and the partner together; that is one
+TransactWriteItems (see app.services.dispatch).
+"""
+from datetime import datetime
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from app.services.db import orders_table
+from app.services.order_stats import record_transition
+from app.services.reads import forget_item
+from app.services.event_hub import publish_order
+
+SYSTEM = "system"   # background jobs (delivery timers): no ownership condition
+
+TRANSITIONS = {
+    # new status: (statuses it may follow, roles that may set it)
+    "accepted": ({"pending"}, {"restaurant"}),
+    "rejected": ({"pending", "accepted", "in_process"}, {"restaurant"}),
+    "cancelled": ({"pending"}, {"customer"}),
+    "in_process": ({"accepted"}, {"restaurant"}),
+    "ready": ({"accepted", "in_process"}, {"restaurant"}),
+    "delivered": ({"ready"}, {"delivery", "restaurant", SYSTEM}),
+}
+
+# Attribute of the order naming the user it belongs to, per role
+OWNER_ATTRIBUTES = {"customer": "customer", "restaurant": "restaurant_id", "delivery": "delivery_partner_name"}
+
+_deserializer = TypeDeserializer()
+
+
+class InvalidTransition(ValueError):
+    """The status is unknown, or not one the caller's role may set."""
+
+
+class OrderNotFound(LookupError):
+    pass
+
+
+class StaleTransition(Exception):
+    """The order's current status does not allow the transition (it already moved on)."""
+
+    def __init__(self, order_id, current_status, new_status):
+        self.current_status = current_status
+        super().__init__(f"Order '{order_id}' is '{current_status}' and cannot move to '{new_status}'")
+
+
+def allowed_statuses(role):
+    return sorted(status for status, (_, roles) in TRANSITIONS.items() if role in roles)
+
+
+def transition(order_id, new_status, role, identity=None, changes=None):
+    """
+    Move an order to `new_status` on behalf of `role` / `identity`, setting
+    `changes` (attribute -> value) in the same write. Returns the order as it
+    was before (ALL_OLD). Raises InvalidTransition, OrderNotFound (also when
+    the order is not the caller's) or StaleTransition.
+    """
+    if new_status not in TRANSITIONS or role not in TRANSITIONS[new_status][1]:
+        raise InvalidTransition(f"Invalid status '{new_status}'. Allowed: {allowed_statuses(role)}")
+    follows = sorted(TRANSITIONS[new_status][0])
+    changes = dict(changes or {})
+    if new_status == "delivered":
+        changes["delivery_status"] = "delivered"
+
+    names = {"#s": "status"}
+    values = {":s": new_status}
+    assignments = ["#s = :s"]
+    if new_status == "delivered":
+        assignments.append("delivered_at = if_not_exists(delivered_at, :t)")
+        values[":t"] = datetime.utcnow().isoformat()
+    if identity is not None:
+        assignments.append("updated_by = :u")
+        values[":u"] = identity
+    for n, (attr, value) in enumerate(changes.items()):
+        names[f"#c{n}"] = attr
+        values[f":c{n}"] = value
+        assignments.append(f"#c{n} = :c{n}")
+
+    values.update({f":f{n}": status for n, status in enumerate(follows)})
+    condition = f"#s IN ({', '.join(f':f{n}' for n in range(len(follows)))})"
+    owner = OWNER_ATTRIBUTES.get(role) if identity is not None else None
+    if owner is not None:
+        names["#o"] = owner
+        values[":owner"] = identity
+        condition += " AND #o = :owner"
+
+    try:
+        response = orders_table.update_item(
+            Key={"order_id": order_id},
+            UpdateExpression="SET " + ", ".join(assignments),
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_OLD",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        current = {k: _deserializer.deserialize(v) for k, v in (e.response.get("Item") or {}).items()}
+        if not current or (owner is not None and current.get(owner) != identity):
+            raise OrderNotFound(f"Order '{order_id}' not found")
+        raise StaleTransition(order_id, current.get("status"), new_status)
+
+    forget_item(orders_table, {"order_id": order_id})
+    old_order = response.get("Attributes", {})
+    record_transition(old_order, new_status)
+    publish_order(old_order, "status", status=new_status, **changes)
+    return old_order
@@ -0,0 +1,146 @@
+# app/services/order_stats.py
+"""
+Per-restaurant order aggregates, maintained incrementally.
+
+Orders carry a `total_price` frozen when they are placed. Placing an order and
+every later status change apply one atomic ADD update to two RestaurantStats
+items: the restaurant's running totals (bucket "total") and the bucket of the
+day the order was placed ("day#YYYY-MM-DD"). Each item counts orders, orders
+per status and the earnings of orders in an earning status, so the dashboard
+reads one item instead of repricing every order against the menu.
+
+Status updates return the previous item (ReturnValues="ALL_OLD") and pass it
+to `record_transition`, which keeps the deltas exact under concurrent writers.
+A failed aggregate write is logged, not raised (the order write already
+happened); `rebuild` recomputes a restaurant's items from its orders.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from app.services.db import stats_table, orders_for_restaurant, query_all
+from app.services.reads import get_item, forget_item
+
+EARNING_STATUSES = frozenset({"accepted", "ready", "delivered"})
+TOTAL_BUCKET = "total"
+DAY_PREFIX = "day#"
+MAX_DAYS = 90
+
+
+def order_total(items):
+    """Sum of price_<size> x quantity over the order items (prices are copied onto the items at placement)."""
+    total = Decimal(0)
+    for item in items:
+        size = item.get("size", "").lower()
+        total += Decimal(str(item.get(f"price_{size}", 0))) * int(item.get("quantity", 0))
+    return total
+
+
+def frozen_total(order):
+    total = order.get("total_price")
+    return Decimal(str(total)) if total is not None else order_total(order.get("items", []))
+
+
+def _buckets(order):
+    buckets = [TOTAL_BUCKET]
+    if order.get("order_time"):
+        buckets.append(DAY_PREFIX + order["order_time"][:10])
+    return buckets
+
+
+def _apply(order, deltas):
+    deltas = {attr: delta for attr, delta in deltas.items() if delta}
+    if not deltas or not order.get("restaurant_id"):
+        return
+    names = {f"#a{n}": attr for n, attr in enumerate(deltas)}
+    values = {f":d{n}": delta for n, delta in enumerate(deltas.values())}
+    expression = "ADD " + ", ".join(f"#a{n} :d{n}" for n in range(len(deltas)))
+    try:
+        for bucket in _buckets(order):
+            stats_table.update_item(
+                Key={"restaurant_id": order["restaurant_id"], "bucket": bucket},
+                UpdateExpression=expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            forget_item(stats_table, {"restaurant_id": order["restaurant_id"], "bucket": bucket})
+    except Exception as e:
+        logging.error("❌ Failed to update stats of restaurant '%s': %s", order['restaurant_id'], e)
+
+
+def record_placed(order):
+    status = order.get("status", "pending")
+    _apply(order, {
+        "orders": 1,
+        f"status_{status}": 1,
+        "earnings": frozen_total(order) if status in EARNING_STATUSES else 0
+    })
+
+
+def record_transition(old_order, new_status):
+    """Move one order from its previous status (`old_order` is the ALL_OLD item) to `new_status`."""
+    old_status = old_order.get("status")
+    if not old_status or old_status == new_status:
+        return
+    earning = (new_status in EARNING_STATUSES) - (old_status in EARNING_STATUSES)
+    _apply(old_order, {
+        f"status_{old_status}": -1,
+        f"status_{new_status}": 1,
+        "earnings": frozen_total(old_order) * earning
+    })
+
+
+def _summary(item):
+    return {
+        "orders": int(item.get("orders", 0)),
+        "total_earnings": float(item.get("earnings", 0)),
+        "orders_by_status": {
+            attr[len("status_"):]: int(count)
+            for attr, count in item.items() if attr.startswith("status_") and count
+        }
+    }
+
+
+def restaurant_stats(restaurant_id, days=0):
+    """Running totals of a restaurant, plus its `days` most recent daily buckets (newest first)."""
+    item = get_item(stats_table, {"restaurant_id": restaurant_id, "bucket": TOTAL_BUCKET}) or {}
+    stats = _summary(item)
+    if days:
+        response = stats_table.query(
+            KeyConditionExpression=Key("restaurant_id").eq(restaurant_id) & Key("bucket").begins_with(DAY_PREFIX),
+            ScanIndexForward=False,
+            Limit=min(days, MAX_DAYS)
+        )
+        stats["days"] = [
+            {"day": day["bucket"][len(DAY_PREFIX):], **_summary(day)}
+            for day in response.get("Items", [])
+        ]
+    return stats
+
+
+def rebuild(restaurant_id):
+    """Recompute a restaurant's stats items from its orders; returns the number of orders counted."""
+    buckets = defaultdict(lambda: defaultdict(Decimal))
+    orders = orders_for_restaurant(restaurant_id)
+    for order in orders:
+        status = order.get("status", "pending")
+        for bucket in _buckets(order):
+            counters = buckets[bucket]
+            counters["orders"] += 1
+            counters[f"status_{status}"] += 1
+            if status in EARNING_STATUSES:
+                counters["earnings"] += frozen_total(order)
+
+    existing = query_all(
+        stats_table,
+        KeyConditionExpression=Key("restaurant_id").eq(restaurant_id),
+        ProjectionExpression="#b",
+        ExpressionAttributeNames={"#b": "bucket"}
+    )
+    with stats_table.batch_writer() as batch:
+        for item in existing:
+            if item["bucket"] not in buckets:
+                batch.delete_item(Key={"restaurant_id": restaurant_id, "bucket": item["bucket"]})
+        for bucket, counters in buckets.items():
+            batch.put_item(Item={"restaurant_id": restaurant_id, "bucket": bucket, "earnings": 0, **counters})
+    return len(orders)
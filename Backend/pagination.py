@@ -0,0 +1,246 @@
+# app/utils/pagination.py
+"""
+Cursor pagination and streaming responses for DynamoDB-backed list endpoints.
+
+Every list endpoint accepts the same query parameters:
+    ?limit=N            return at most N items plus an opaque `next_token`
+    ?next_token=...     continue from the cursor returned by the previous page
+    ?stream=ndjson      stream every item as one JSON document per line
+    ?stream=json        stream the usual JSON body in chunks as pages arrive
+    ?fields=a,b,c       read (ProjectionExpression) and return only these attributes
+Without any of them the endpoint transparently follows LastEvaluatedKey and
+returns the full result in its usual shape.
+
+A stream that fails after the headers went out ends early: an ndjson stream
+then ends with an {"error": ...} line, and a json stream ends before its
+closing bracket, which makes the body invalid JSON.
+"""
+import base64
+import json
+import logging
+import re
+from functools import partial
+from decimal import Decimal
+from flask import Response, current_app, jsonify, request, stream_with_context
+from app.utils.json_provider import project
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_FIELDS = 40
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    raise TypeError(f"Unsupported key type: {type(value).__name__}")
+
+
+def _decode_value(obj):
+    if "__decimal__" in obj:
+        return Decimal(obj["__decimal__"])
+    return obj
+
+
+def encode_token(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        key = json.loads(raw, object_hook=_decode_value)
+    except ValueError:
+        raise InvalidPageRequest("Invalid next_token")
+    if not isinstance(key, dict):
+        raise InvalidPageRequest("Invalid next_token")
+    return key
+
+
+def iter_pages(operation, exclusive_start_key=None, **params):
+    """Yield (items, last_evaluated_key) for every page of a scan/query call."""
+    if exclusive_start_key:
+        params["ExclusiveStartKey"] = exclusive_start_key
+    while True:
+        response = operation(**params)
+        last_key = response.get("LastEvaluatedKey")
+        yield response.get("Items", []), last_key
+        if not last_key:
+            return
+        params["ExclusiveStartKey"] = last_key
+
+
+def iter_items(operation, **params):
+    """Yield every item of a scan/query, one page in memory at a time."""
+    for items, _ in iter_pages(operation, **params):
+        yield from items
+
+
+def fetch_page(operation, limit, next_token=None, **params):
+    """
+    Read up to `limit` items starting at `next_token`.
+    Returns (items, next_token); next_token is None once the result is exhausted.
+    """
+    items = []
+    start_key = decode_token(next_token)
+    while True:
+        params["Limit"] = limit - len(items)
+        page, start_key = next(iter_pages(operation, exclusive_start_key=start_key, **params))
+        items.extend(page)
+        if not start_key or len(items) >= limit:
+            return items, encode_token(start_key)
+
+
+def is_page_request(args=None):
+    """True if the client asked for a page or a stream rather than the full result."""
+    args = request.args if args is None else args
+    return any(arg in args for arg in ("limit", "next_token", "stream"))
+
+
+def page_args(args=None):
+    """(limit, next_token, stream) from the query string (or `args`); raises InvalidPageRequest."""
+    args = request.args if args is None else args
+    stream = args.get("stream")
+    if stream not in (None, "json", "ndjson"):
+        raise InvalidPageRequest("stream must be 'json' or 'ndjson'")
+
+    limit = args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidPageRequest("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise InvalidPageRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    elif args.get("next_token"):
+        limit = DEFAULT_PAGE_SIZE
+
+    return limit, args.get("next_token"), stream
+
+
+def fields_arg(args=None):
+    """Top-level attribute names from ?fields=a,b,c, or None to return whole items; raises InvalidPageRequest."""
+    args = request.args if args is None else args
+    raw = args.get("fields")
+    if raw is None:
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    if not fields or len(fields) > MAX_FIELDS:
+        raise InvalidPageRequest(f"fields must list between 1 and {MAX_FIELDS} attribute names")
+    for field in fields:
+        if not _FIELD_NAME.match(field):
+            raise InvalidPageRequest(f"Invalid field name '{field}'")
+    return fields
+
+
+def projection_params(fields, reads=(), names=None):
+    """
+    ProjectionExpression / ExpressionAttributeNames reading only `fields`, plus
+    `reads` (attributes a transform needs). `names` are existing placeholders to keep.
+    """
+    placeholders = {f"#p{n}": field for n, field in enumerate(dict.fromkeys([*fields, *reads]))}
+    return {
+        "ProjectionExpression": ", ".join(placeholders),
+        "ExpressionAttributeNames": {**(names or {}), **placeholders}
+    }
+
+
+def _apply(items, transform):
+    if transform is None:
+        return items
+    return [t for t in map(transform, items) if t is not None]
+
+
+def _stream(items, envelope, transform, stream):
+    provider = current_app.json
+    dumpb = getattr(provider, "dumpb", None) or (lambda item, newline=False: (
+        provider.dumps(item) + ("\n" if newline else "")).encode())
+
+    def generate():
+        if stream == "json":
+            yield b'{"%s":[' % envelope.encode() if envelope else b"["
+        first = True
+        try:
+            for item in items:
+                if transform is not None:
+                    item = transform(item)
+                    if item is None:
+                        continue
+                if stream == "ndjson":
+                    yield dumpb(item, newline=True)
+                else:
+                    yield dumpb(item) if first else b"," + dumpb(item)
+                first = False
+        except Exception as e:
+            # Headers are already sent: an ndjson client gets a final error line, a json one an unclosed body
+            logging.error("❌ Streaming response aborted: %s", e)
+            if stream == "ndjson":
+                yield dumpb({"error": f"Stream aborted: {e}"}, newline=True)
+            return
+        if stream == "json":
+            yield b"]}" if envelope else b"]"
+
+    mimetype = "application/x-ndjson" if stream == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def _projected(transform, fields):
+    if transform is None:
+        return lambda item: project(item, fields)
+    return lambda item: project(t, fields) if (t := transform(item)) is not None else None
+
+
+def list_response(operation, envelope=None, transform=None, all_items=None, fields=None, reads=(), **params):
+    """
+    Build the response for a list endpoint backed by `operation` (table.scan / table.query).
+
+    envelope:  key to wrap the items in (e.g. "restaurants"); None returns a bare JSON list
+    transform: optional per-item callable; returning None drops the item
+    all_items: optional callable yielding every item (e.g. a parallel scan), used instead of
+               paging through `operation` when no cursor is involved; called with the
+               projection params when fields are selected
+    fields:    optional top-level attribute names to keep in each item; ?fields= overrides it
+    reads:     attributes `transform` needs, read from DynamoDB even when not among `fields`
+    """
+    try:
+        fields = fields_arg() or fields
+        if fields is not None:
+            params.update(projection_params(fields, reads, params.get("ExpressionAttributeNames")))
+            transform = _projected(transform, fields)
+            if all_items is not None:
+                all_items = partial(all_items, **projection_params(fields, reads))
+
+        limit, next_token, stream = page_args()
+        if stream:
+            if all_items is not None and not next_token:
+                items = all_items()
+            else:
+                items = iter_items(operation, exclusive_start_key=decode_token(next_token), **params)
+            return _stream(items, envelope, transform, stream)
+
+        if limit is None:
+            items = all_items() if all_items is not None else iter_items(operation, **params)
+            items = _apply(list(items), transform)
+            token = None
+        else:
+            items, token = fetch_page(operation, limit, next_token, **params)
+            items = _apply(items, transform)
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    body = {envelope: items} if envelope else items
+    if envelope and limit is not None:
+        body["next_token"] = token
+    response = jsonify(body)
+    if token:
+        response.headers["X-Next-Token"] = token
+    return response, 200
@@ -0,0 +1,109 @@
+# app/services/parallel_scan.py
+"""
+Parallel segmented scan (Segment / TotalSegments) over a bounded thread pool.
+
+Items are yielded as soon as any segment returns a page, and the page queue is
+bounded so a slow consumer throttles the readers instead of buffering the table.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SEGMENTS = int(os.getenv("SCAN_SEGMENTS", 4))
+DEFAULT_MAX_RCU = float(os.getenv("SCAN_MAX_RCU_PER_SECOND", 0)) or None
+
+_DONE = object()
+
+
+class CapacityLimiter:
+    """Token bucket over consumed read capacity units, shared by all segments."""
+
+    def __init__(self, units_per_second):
+        self.rate = units_per_second
+        self.balance = units_per_second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self, stop):
+        # Block until the bucket is out of debt (or the scan is cancelled)
+        while not stop.is_set():
+            with self.lock:
+                now = time.monotonic()
+                self.balance = min(self.rate, self.balance + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.balance > 0:
+                    return
+                delay = -self.balance / self.rate
+            stop.wait(delay)
+
+    def consume(self, units):
+        with self.lock:
+            self.balance -= units
+
+
+def parallel_scan(table, total_segments=None, max_workers=None, max_rcu_per_second=None,
+                  queue_pages=None, **params):
+    """
+    Yield every item of `table` using a segmented scan.
+
+    total_segments:     number of scan segments (default SCAN_SEGMENTS)
+    max_workers:        threads reading segments concurrently (default: one per segment)
+    max_rcu_per_second: optional cap on consumed read capacity across all segments
+    params:             extra scan arguments, e.g. FilterExpression / ProjectionExpression
+    """
+    total_segments = total_segments or DEFAULT_SEGMENTS
+    max_workers = min(max_workers or total_segments, total_segments)
+    max_rcu_per_second = max_rcu_per_second or DEFAULT_MAX_RCU
+    limiter = CapacityLimiter(max_rcu_per_second) if max_rcu_per_second else None
+
+    pages = queue.Queue(maxsize=queue_pages or max_workers * 2)
+    stop = threading.Event()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment):
+        request = dict(params, Segment=segment, TotalSegments=total_segments)
+        if limiter:
+            request["ReturnConsumedCapacity"] = "TOTAL"
+        try:
+            while not stop.is_set():
+                if limiter:
+                    limiter.wait(stop)
+                response = table.scan(**request)
+                if limiter:
+                    limiter.consume(response.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+                put(response.get("Items", []))
+                if "LastEvaluatedKey" not in response:
+                    break
+                request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"scan-{table.name}")
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        # Also reached when the consumer stops early (e.g. client disconnects)
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,160 @@
+# app/services/passwords.py
+"""
+bcrypt hashing / verification off the request threads.
+
+Password work runs in a small process pool at lowered CPU priority, so a
+login storm cannot starve the request threads (health checks, order APIs)
+of CPU. Admission is bounded: when PASSWORD_QUEUE_LIMIT jobs are already
+queued or running, callers get PasswordPoolSaturated straight away and the
+route answers 503 + Retry-After instead of piling up blocked threads. A job
+holds its slot until the pool has actually finished it, so callers that gave up
+after PASSWORD_TIMEOUT_SECONDS (also answered 503) still count against the limit.
+
+The cost factor is BCRYPT_ROUNDS; a successful login with a hash of any
+other cost returns a fresh hash so the caller can store it.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from passlib.hash import bcrypt
+from app.services.metrics import register_collector
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+WORKERS = int(os.getenv("PASSWORD_WORKERS", os.cpu_count() or 1))   # 0 = hash on the request thread
+QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", max(WORKERS, 1) * 8))
+TIMEOUT_SECONDS = float(os.getenv("PASSWORD_TIMEOUT_SECONDS", 10))
+WORKER_NICE = int(os.getenv("PASSWORD_WORKER_NICE", 5))
+# "fork" by default: spawn / forkserver children re-run the __main__ script (run.py) on start
+START_METHOD = os.getenv("PASSWORD_POOL_START_METHOD", "fork")
+RETRY_AFTER_SECONDS = 1
+
+
+class PasswordPoolSaturated(Exception):
+    def __init__(self, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__("Too many password operations in progress, retry shortly")
+        self.retry_after = retry_after
+
+
+# === Worker side (runs in the pool processes) ===
+def _lower_priority(niceness):
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def _hash(password, rounds):
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify(password, hashed, rounds):
+    """(matches, new_hash); new_hash is set when a matching hash used a different cost."""
+    if not bcrypt.verify(password, hashed):
+        return False, None
+    if bcrypt.using(rounds=rounds).needs_update(hashed):
+        return True, _hash(password, rounds)
+    return True, None
+
+
+# === Caller side ===
+class PasswordPool:
+    def __init__(self, workers=WORKERS, queue_limit=QUEUE_LIMIT, rounds=BCRYPT_ROUNDS,
+                 timeout=TIMEOUT_SECONDS, niceness=WORKER_NICE, start_method=START_METHOD):
+        self.workers = workers
+        self.start_method = start_method
+        self.rounds = rounds
+        self.timeout = timeout
+        self.niceness = niceness
+        self.queue_limit = queue_limit
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+        self.in_flight = 0
+        self.completed = self.rejected = self.timed_out = self.rehashed = 0
+
+    def _executor(self):
+        # Created on first use in each process; a forked server worker must not share its parent's pool
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                # Workers only run bcrypt, never app code, so forking a threaded server is safe here
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_lower_priority, initargs=(self.niceness,)
+                )
+                self.pid = os.getpid()
+            return self.executor
+
+    def _done(self, future=None):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self.slots.release()
+
+    def _run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordPoolSaturated()
+        with self.lock:
+            self.in_flight += 1
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._done()
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._done()
+            raise
+        # The slot is freed when the job finishes (or is cancelled), not when the caller stops waiting
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()     # only takes effect while the job is still queued
+            with self.lock:
+                self.timed_out += 1
+            raise PasswordPoolSaturated()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, hashed):
+        matches, new_hash = self._run(_verify, password, hashed, self.rounds)
+        if new_hash:
+            with self.lock:
+                self.rehashed += 1
+        return matches, new_hash
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None and self.pid == os.getpid():
+                self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "rehashed": self.rehashed
+            }
+
+
+password_pool = PasswordPool()
+register_collector("passwords", lambda: password_pool.stats())
+
+
+def hash_password(password):
+    return password_pool.hash(password)
+
+
+def verify_password(password, hashed):
+    """(matches, new_hash_or_None); raises PasswordPoolSaturated under overload or on timeout."""
+    return password_pool.verify(password, hashed)
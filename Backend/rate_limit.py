@@ -0,0 +1,362 @@
+# app/utils/rate_limit.py
+"""
+Rate limiting and admission control.
+
+Every request spends tokens from a bucket keyed by who sent it: the JWT
+identity and role ("customer:alice"), or the client address for requests
+without a valid token (behind a load balancer set RATE_LIMIT_FORWARDED_HOPS,
+or every anonymous client shares the balancer's bucket). Buckets refill at a per-role rate up to a per-role
+burst (RATE_LIMIT_<ROLE>="rate/burst", e.g. RATE_LIMIT_CUSTOMER=10/60). An
+endpoint costs 1 token unless its view says otherwise with `@rate_cost(n)`:
+full order lists, scans and password hashing cost more than a cached menu.
+RATE_LIMIT_COSTS="restaurant.view_orders=20,..." overrides costs by endpoint.
+An empty bucket answers 429 with Retry-After.
+
+Buckets live in process memory, so every worker enforces the limit on its own;
+set RATE_LIMIT_REDIS_URL to share them between workers (Redis >= 5, one Lua
+script per request). When Redis is unreachable requests are let through.
+
+Admission control caps the requests in flight per process. A request waits up
+to ADMISSION_QUEUE_MS for a slot and is otherwise answered 503 with
+Retry-After, so a burst is shed at the door instead of piling up on the
+DynamoDB connection pool. The cap (ADMISSION_MAX_IN_FLIGHT) shrinks when
+DynamoDB throttles a call and grows back by one slot per full round of
+requests once throttling has stopped.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from app.services import aws
+from app.services.metrics import counter, register_collector
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))      # buckets kept by the in-process backend
+# Proxies in front of the app that append to X-Forwarded-For (0: use the peer address)
+FORWARDED_HOPS = int(os.getenv("RATE_LIMIT_FORWARDED_HOPS", 0))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 64))
+ADMISSION_MIN_IN_FLIGHT = int(os.getenv("ADMISSION_MIN_IN_FLIGHT", 4))
+ADMISSION_QUEUE = float(os.getenv("ADMISSION_QUEUE_MS", 100)) / 1000
+
+# role -> (tokens per second, burst); "anonymous" is keyed by client address
+DEFAULT_LIMITS = {
+    "customer": (10, 60),
+    "restaurant": (20, 120),
+    "delivery": (10, 60),
+    "admin": (20, 120),
+    "anonymous": (10, 100),
+}
+# Health checks and scrapes are never limited
+EXEMPT_ENDPOINTS = {"health", "home", "metrics", "static"}
+
+Decision = namedtuple("Decision", ["allowed", "retry_after", "remaining"])
+
+rate_limited_requests = counter("rate_limited_requests", "Requests refused with 429, by role and endpoint", ("role", "endpoint"))
+shed_requests = counter("admission_shed_requests", "Requests refused with 503 by admission control", ("endpoint",))
+
+
+def _limits():
+    limits = dict(DEFAULT_LIMITS)
+    for role in limits:
+        value = os.getenv(f"RATE_LIMIT_{role.upper()}")
+        if value:
+            rate, _, burst = value.partition("/")
+            limits[role] = (float(rate), float(burst or rate))
+    return limits
+
+
+def _costs():
+    costs = {}
+    for entry in filter(None, os.getenv("RATE_LIMIT_COSTS", "").split(",")):
+        endpoint, _, cost = entry.partition("=")
+        costs[endpoint.strip()] = float(cost)
+    return costs
+
+
+LIMITS = _limits()
+COSTS = _costs()
+
+
+def rate_cost(cost):
+    """Mark a view as costing `cost` tokens (stack directly under the route decorator)."""
+    def wrapper(fn):
+        fn.rate_cost = cost
+        return fn
+    return wrapper
+
+
+def endpoint_cost(endpoint, view):
+    if endpoint in EXEMPT_ENDPOINTS:
+        return 0
+    if endpoint in COSTS:
+        return COSTS[endpoint]
+    return getattr(view, "rate_cost", 1)
+
+
+def client_key(claims, peer, forwarded_for=None):
+    """(bucket key, role): the token's identity and role, else the client address."""
+    if claims and claims.get("sub"):
+        role = claims.get("role") if claims.get("role") in LIMITS else "anonymous"
+        return f"{role}:{claims['sub']}", role
+    address = peer
+    if FORWARDED_HOPS and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",")]
+        address = hops[-FORWARDED_HOPS] if len(hops) >= FORWARDED_HOPS else hops[0]
+    return f"ip:{address}", "anonymous"
+
+
+def _refill(tokens, elapsed, rate, burst, cost):
+    """Token bucket step: (allowed, tokens left, seconds until `cost` tokens are there)."""
+    tokens = min(burst, tokens + max(elapsed, 0) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+# === Backends ===
+class LocalBackend:
+    """Buckets in process memory, least recently used dropped beyond `maxsize` (a dropped bucket is full)."""
+    name = "local"
+
+    def __init__(self, maxsize=RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self.buckets = OrderedDict()     # key -> [tokens, monotonic time of the last take]
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [burst, now]
+            else:
+                self.buckets.move_to_end(key)
+            allowed, bucket[0], retry_after = _refill(bucket[0], now - bucket[1], rate, burst, cost)
+            bucket[1] = now
+            remaining = bucket[0]
+            while len(self.buckets) > self.maxsize:
+                self.buckets.popitem(last=False)
+        return Decision(allowed, retry_after, remaining)
+
+    def size(self):
+        return len(self.buckets)
+
+
+# Same step as `_refill`, run atomically in Redis on the server's clock (so workers need not agree on time)
+TOKEN_BUCKET_SCRIPT = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local elapsed = math.max(now - (tonumber(state[2]) or now), 0)
+tokens = math.min(burst, tokens + elapsed * rate)
+local allowed, retry_after = 0, 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after), tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Shared backend; `client` is a redis.Redis (or compatible stand-in) instance."""
+    name = "redis"
+
+    def __init__(self, client, prefix="ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key, rate, burst, cost):
+        allowed, retry_after, remaining = self.script(keys=[self.prefix + key], args=[rate, burst, cost])
+        return Decision(bool(int(allowed)), float(retry_after), float(remaining))
+
+    def size(self):
+        return None
+
+
+class RateLimiter:
+    def __init__(self, backend, limits=LIMITS):
+        self.backend = backend
+        self.limits = limits
+        self.allowed = self.limited = self.backend_errors = 0
+
+    def take(self, key, role, cost):
+        rate, burst = self.limits.get(role, self.limits["anonymous"])
+        try:
+            # A cost above the burst could never be paid: charge a full bucket instead
+            decision = self.backend.take(key, rate, burst, min(cost, burst))
+        except Exception as e:
+            self.backend_errors += 1
+            logging.warning("⚠️ Rate limit backend failed, letting the request through: %s", e)
+            return Decision(True, 0.0, None)
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return decision
+
+    def stats(self):
+        return {
+            "backend": self.backend.name,
+            "buckets": self.backend.size(),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "backend_errors": self.backend_errors
+        }
+
+
+def _backend():
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if not redis_url:
+        return LocalBackend()
+    import redis  # optional dependency, only needed for the shared backend
+    return RedisBackend(redis.Redis.from_url(redis_url))
+
+
+# === Admission control ===
+class AdmissionControl:
+    """
+    At most `limit` requests in flight. Throttling reported by DynamoDB cuts the
+    limit by `backoff` (once per `cooldown` seconds); after that, every `limit`
+    requests completed without throttling add one slot, up to `max_in_flight`.
+    """
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, min_in_flight=ADMISSION_MIN_IN_FLIGHT,
+                 backoff=0.75, cooldown=1.0):
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min(min_in_flight, max_in_flight)
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.limit = max_in_flight
+        self.in_flight = self.peak_in_flight = 0
+        self.completed = 0                  # since the limit last changed
+        self.last_cut = float("-inf")
+        self.condition = threading.Condition()
+        self.admitted = self.shed = self.throttle_events = 0
+
+    def enter(self, timeout=ADMISSION_QUEUE):
+        """Take a slot, waiting at most `timeout` seconds; False when the request should be shed."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.in_flight >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.shed += 1
+                    return False
+                self.condition.wait(remaining)
+            self.in_flight += 1
+            self.admitted += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def leave(self):
+        with self.condition:
+            self.in_flight -= 1
+            if self.limit < self.max_in_flight and time.monotonic() - self.last_cut >= self.cooldown:
+                self.completed += 1
+                if self.completed >= self.limit:
+                    self.limit += 1
+                    self.completed = 0
+            self.condition.notify()
+
+    def throttled(self):
+        with self.condition:
+            self.throttle_events += 1
+            now = time.monotonic()
+            if now - self.last_cut >= self.cooldown:
+                self.limit = max(self.min_in_flight, int(self.limit * self.backoff))
+                self.last_cut = now
+                self.completed = 0
+
+    def stats(self):
+        with self.condition:
+            return {
+                "limit": self.limit,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "throttle_events": self.throttle_events
+            }
+
+
+limiter = RateLimiter(_backend())
+admission = AdmissionControl()
+aws.throttle_listeners.append(admission.throttled)
+register_collector("rate_limit", lambda: {**limiter.stats(), "admission": admission.stats()})
+
+# Set on requests the ASGI app already charged before handing them to Flask
+CHARGED_ENVIRON_KEY = "foodie.rate_limit_charged"
+
+
+def retry_after_header(seconds):
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def too_many_requests(decision):
+    """Body and headers of a 429."""
+    return {"error": "Too many requests, slow down", "retry_after": round(decision.retry_after, 2)}, \
+        retry_after_header(decision.retry_after)
+
+
+def server_busy():
+    """Body and headers of a 503 from admission control."""
+    return {"error": "Server busy, try again shortly"}, retry_after_header(1)
+
+
+def _claims():
+    # Invalid or expired tokens count as anonymous here; the route itself rejects them.
+    # A valid token is verified only here: role_utils.jwt_required reuses these claims.
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt()
+    except Exception:
+        return None
+
+
+def init_rate_limit(app):
+    """Register after JWTManager and init_logging (a refused request skips the later before_request hooks)."""
+    if not RATE_LIMIT_ENABLED:
+        return app
+
+    @app.before_request
+    def limit_request():
+        if request.method == "OPTIONS":
+            return None
+        endpoint = request.endpoint or "<unmatched>"
+        cost = endpoint_cost(endpoint, app.view_functions.get(request.endpoint))
+        if not cost:
+            return None
+
+        if not request.environ.get(CHARGED_ENVIRON_KEY):
+            key, role = client_key(_claims(), request.remote_addr, request.headers.get("X-Forwarded-For"))
+            decision = limiter.take(key, role, cost)
+            if not decision.allowed:
+                rate_limited_requests.inc(1, role, endpoint)
+                body, headers = too_many_requests(decision)
+                return jsonify(body), 429, headers
+
+        if not admission.enter():
+            shed_requests.inc(1, endpoint)
+            body, headers = server_busy()
+            return jsonify(body), 503, headers
+        g.admitted = True
+        return None
+
+    @app.teardown_request
+    def release_slot(exc=None):
+        if g.pop("admitted", False):
+            admission.leave()
+    return app
@@ -0,0 +1,149 @@
+# app/services/reads.py
+"""
+Coalesced reads: request-scoped memoization plus single-flight across threads.
+
+`read(key, load)` returns what `load()` returns, but
+- within one request the first result is remembered, so reading the same key
+  again costs nothing (the memo lives from before_request to teardown, see
+  `init_read_memo`; outside a request, and in the async routes, there is none);
+- across threads, identical reads that overlap share one call: the first
+  caller loads, the others wait for its result (or its exception).
+
+Writers call `forget(key)` after changing an item; readers arriving after
+that start a fresh load instead of joining one that began before the write.
+A joined read is at most one round trip older than a read of its own, which
+is within what DynamoDB's eventually consistent reads already allow.
+Results are shared between callers: treat them as read-only.
+"""
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from app.services.metrics import register_collector
+
+_memo = ContextVar("read_memo", default=None)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadCoalescer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.counts = defaultdict(lambda: [0, 0, 0])    # kind -> [calls, memo hits, joined flights]
+
+    def read(self, key, load, memoize=True):
+        memo = _memo.get() if memoize else None
+        if memo is not None and key in memo:
+            with self.lock:
+                counts = self.counts[key[0]]
+                counts[0] += 1
+                counts[1] += 1
+            return memo[key]
+
+        with self.lock:
+            counts = self.counts[key[0]]
+            counts[0] += 1
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+            else:
+                counts[2] += 1
+
+        if leader:
+            try:
+                flight.value = load()
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with self.lock:
+                    if self.flights.get(key) is flight:
+                        del self.flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+
+        if memo is not None:
+            memo[key] = flight.value
+        return flight.value
+
+    def forget(self, key):
+        with self.lock:
+            self.flights.pop(key, None)
+        memo = _memo.get()
+        if memo is not None:
+            memo.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            counts = {kind: list(c) for kind, c in self.counts.items()}
+        calls = sum(c[0] for c in counts.values())
+        saved = sum(c[1] + c[2] for c in counts.values())
+        return {
+            "calls": calls,
+            "loads": calls - saved,
+            "memo_hits": sum(c[1] for c in counts.values()),
+            "coalesced": sum(c[2] for c in counts.values()),
+            "coalescing_ratio": round(saved / calls, 4) if calls else 0.0,
+            "by_kind": {
+                kind: {"calls": c[0], "memo_hits": c[1], "coalesced": c[2]}
+                for kind, c in counts.items()
+            }
+        }
+
+
+coalescer = ReadCoalescer()
+register_collector("reads", coalescer.stats)
+
+
+def read(key, load, memoize=True):
+    """`load()` through the request memo and single-flight; `key` is a hashable tuple starting with a kind."""
+    return coalescer.read(key, load, memoize)
+
+
+def forget(key):
+    coalescer.forget(key)
+
+
+def _frozen(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _frozen(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+def item_key(table, key):
+    return (table.name, _frozen(key))
+
+
+def get_item(table, key):
+    """GetItem through `read`; returns the item or None."""
+    return read(item_key(table, key), lambda: table.get_item(Key=key).get("Item"))
+
+
+def forget_item(table, key):
+    """Call after writing an item that is read through `get_item`."""
+    forget(item_key(table, key))
+
+
+def init_read_memo(app):
+    """Give every request its own read memo."""
+    @app.before_request
+    def open_read_memo():
+        _memo.set({})
+
+    @app.teardown_request
+    def close_read_memo(exc=None):
+        _memo.set(None)
+    return app
@@ -0,0 +1,48 @@
+# app/utils/request_metrics.py
+"""
+Per-route latency histograms and the Prometheus /metrics endpoint.
+
+Requests are timed from before_request to the last after_request hook (so
+compression is included) and recorded by route template, not by raw path,
+which keeps the label set small: `/customer/order/<order_id>`, never the
+order ids. Streamed responses (the event stream) are timed to their first
+byte. The async routes of the ASGI mode record into the same histogram (see
+app.utils.asgi). /metrics answers without a token unless METRICS_TOKEN is set.
+"""
+import hmac
+import os
+import time
+from flask import Response, g, request
+from app.services.metrics import histogram, render_prometheus
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+UNMATCHED = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+request_seconds = histogram(
+    "http_request_duration_seconds", "Time to the response headers, by route template", ("route", "method", "status")
+)
+
+
+def metrics_response():
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return Response("Unauthorized\n", 401, content_type="text/plain")
+    return Response(render_prometheus(), content_type=CONTENT_TYPE)
+
+
+def init_request_metrics(app):
+    """Time every request; call before the other after_request hooks are registered (they run in reverse)."""
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+            request_seconds.observe(time.perf_counter() - started, route, request.method, response.status_code)
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_response)
+    return app
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify, send_from_directory
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.db import menus_table, orders_table, restaurants_table, delivery_partners_table
-from app.utils.role_utils import role_required
-from boto3.dynamodb.conditions import Attr
+from flask_jwt_extended import get_jwt_identity
+from app.services.db import menus_table, orders_table, restaurants_table, batch_get, query_all, restaurant_orders_query
+from app.services.dispatch import dispatch_order, dispatch_orders
+from app.services.cache import cached_menu_entry, cached_restaurants_entry, invalidate_menu, invalidate_restaurants
+from app.services.order_stats import frozen_total, restaurant_stats, MAX_DAYS
+from app.services.order_state import transition, InvalidTransition, OrderNotFound, StaleTransition
+from app.utils.role_utils import jwt_required, role_required
+from app.utils.rate_limit import rate_cost
+from app.utils.pagination import InvalidPageRequest, list_response, is_page_request, fields_arg, projection_params
+from app.utils.json_provider import project
+from app.utils.conditional import conditional_json
+from decimal import Decimal
 import uuid
 import os
 import logging
-import random
-from datetime import datetime, timedelta
 import threading
 
 restaurant_bp = Blueprint('restaurant', __name__)
@@ -15,6 +21,8 @@ restaurant_bp = Blueprint('restaurant', __name__)
 STATIC_FOLDER = os.path.join("app", "static", "uploads")
 os.makedirs(STATIC_FOLDER, exist_ok=True)
 
+REJECTION_REASON = "We're sorry, but your order was politely declined by the restaurant due to availability or operational constraints."
+
 # ✅ PATCH: Restaurant profile update
 @restaurant_bp.route("/profile", methods=["PATCH"])
 @jwt_required()
@@ -28,7 +36,8 @@ def update_restaurant_profile():
             logging.error("❌ No data received in PATCH /profile")
             return jsonify({"error": "No input data provided"}), 400
 
-        logging.info(f"📦 Incoming profile update for {restaurant_id}: {data}")
+        # Field names only: the values (contact details, addresses) stay out of the logs
+        logging.info("📦 Incoming profile update for %s: %s", restaurant_id, sorted(data))
 
         update_expr = []
         attr_names = {}
@@ -38,7 +47,8 @@ def update_restaurant_profile():
             actual_key = "logo_url" if key == "logo" else key
             update_expr.append(f"#attr_{actual_key} = :val_{key}")
             attr_names[f"#attr_{actual_key}"] = actual_key
-            attr_vals[f":val_{key}"] = value
+            # lat / lon arrive as JSON floats, which DynamoDB only accepts as Decimal
+            attr_vals[f":val_{key}"] = Decimal(str(value)) if isinstance(value, float) else value
 
         restaurants_table.update_item(
             Key={"restaurant_id": restaurant_id},
@@ -47,23 +57,27 @@ def update_restaurant_profile():
             ExpressionAttributeValues=attr_vals
         )
 
-        logging.info(f"✅ Profile updated for {restaurant_id}")
+        invalidate_restaurants()
+        logging.info("✅ Profile updated for %s", restaurant_id)
         return jsonify({"message": "✅ Profile updated"}), 200
 
     except Exception as e:
         logging.exception("❌ Exception during profile update")
         return jsonify({"error": str(e)}), 500
 
+def _valid_restaurant(restaurant):
+    return restaurant if "restaurant_id" in restaurant and "name" in restaurant else None
+
 # ✅ Fetch all restaurants
 @restaurant_bp.route("/restaurants", methods=["GET"])
 @jwt_required()
 @role_required(["restaurant", "customer"])
 def get_all_restaurants():
     try:
-        response = restaurants_table.scan()
-        items = response.get("Items", [])
-        valid_restaurants = [r for r in items if "restaurant_id" in r and "name" in r]
-        return jsonify(valid_restaurants), 200
+        if is_page_request():
+            return list_response(restaurants_table.scan, transform=_valid_restaurant, reads=("restaurant_id", "name"))
+        entry = cached_restaurants_entry()
+        return conditional_json(lambda: [r for r in entry.items if _valid_restaurant(r)], entry)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -83,6 +97,7 @@ def add_menu_item():
         data["is_available"] = True
 
         menus_table.put_item(Item=data)
+        invalidate_menu(data["restaurant_id"])
         return jsonify({"message": "✅ Menu item added", "menu_id": data["menu_id"]}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -91,8 +106,8 @@ def add_menu_item():
 @restaurant_bp.route("/menu/<restaurant_id>", methods=["GET"])
 def get_menu(restaurant_id):
     try:
-        response = menus_table.scan(FilterExpression=Attr("restaurant_id").eq(restaurant_id))
-        return jsonify(response.get("Items", [])), 200
+        entry = cached_menu_entry(restaurant_id)
+        return conditional_json(entry.items, entry)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -114,12 +129,14 @@ def update_menu_item(menu_id):
             expr_names[f"#attr_{key}"] = key
             expr_values[f":val_{key}"] = value
 
-        menus_table.update_item(
+        response = menus_table.update_item(
             Key={'menu_id': menu_id},
             UpdateExpression="SET " + ", ".join(expr),
             ExpressionAttributeNames=expr_names,
-            ExpressionAttributeValues=expr_values
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_OLD"
         )
+        invalidate_menu(response.get("Attributes", {}).get("restaurant_id"), data.get("restaurant_id"))
         return jsonify({"message": f"✅ Menu item '{menu_id}' updated"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -130,7 +147,8 @@ def update_menu_item(menu_id):
 @role_required("restaurant")
 def delete_menu_item(menu_id):
     try:
-        menus_table.delete_item(Key={"menu_id": menu_id})
+        response = menus_table.delete_item(Key={"menu_id": menu_id}, ReturnValues="ALL_OLD")
+        invalidate_menu(response.get("Attributes", {}).get("restaurant_id"))
         return jsonify({"message": f"🗑️ Menu item '{menu_id}' deleted"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -145,17 +163,20 @@ def toggle_menu_item_availability(menu_id):
         if "is_available" not in data:
             return jsonify({"error": "Missing 'is_available' field"}), 400
 
-        menus_table.update_item(
+        response = menus_table.update_item(
             Key={"menu_id": menu_id},
             UpdateExpression="SET is_available = :val",
-            ExpressionAttributeValues={":val": data["is_available"]}
+            ExpressionAttributeValues={":val": data["is_available"]},
+            ReturnValues="ALL_NEW"
         )
+        invalidate_menu(response.get("Attributes", {}).get("restaurant_id"))
         return jsonify({"message": "Availability updated"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # ✅ View orders for restaurant
 @restaurant_bp.route("/orders", methods=["GET"])
+@rate_cost(10)
 @jwt_required()
 @role_required("restaurant")
 def view_orders():
@@ -164,32 +185,48 @@ def view_orders():
         if not restaurant_id:
             return jsonify({"error": "Missing restaurant_id in query parameters"}), 400
 
-        response = orders_table.scan(FilterExpression=Attr("restaurant_id").eq(restaurant_id))
-        orders = response.get("Items", [])
+        params = restaurant_orders_query(restaurant_id)
+        fields = fields_arg()
+        if fields:
+            params.update(projection_params(fields, reads=("total_price",)))
 
-        menu_res = menus_table.scan(FilterExpression=Attr("restaurant_id").eq(restaurant_id))
-        menu_lookup = {item["name"].lower(): item for item in menu_res.get("Items", [])}
-
-        total_earnings = 0
-        for order in orders:
-            total_price = 0
-            for item in order.get("items", []):
-                name = item.get("name", "").lower()
-                size = item.get("size", "").lower()
-                qty = int(item.get("quantity", 0))
-                price = float(menu_lookup.get(name, {}).get(f"price_{size}", 0))
-                total_price += price * qty
+        orders = project(price_orders(query_all(orders_table, **params)), fields)
+        total_earnings = restaurant_stats(restaurant_id)["total_earnings"]
+        return jsonify({"orders": orders, "total_earnings": total_earnings}), 200
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-            order["total_price"] = total_price
-            if order.get("status") in ["accepted", "ready", "delivered"]:
-                total_earnings += total_price
+def price_orders(orders):
+    """Expose each order's frozen total_price as a JSON number (as the dashboard expects)."""
+    for order in orders:
+        order["total_price"] = float(frozen_total(order))
+    return orders
 
-        return jsonify({"orders": orders, "total_earnings": total_earnings}), 200
+# ✅ Earnings / order counts dashboard (precomputed aggregates, one read)
+@restaurant_bp.route("/stats", methods=["GET"])
+@jwt_required()
+@role_required("restaurant")
+def view_stats():
+    try:
+        restaurant_id = request.args.get("restaurant_id")
+        if not restaurant_id:
+            return jsonify({"error": "Missing restaurant_id in query parameters"}), 400
+        try:
+            days = int(request.args.get("days", 0))
+        except ValueError:
+            return jsonify({"error": "'days' must be an integer"}), 400
+        if not 0 <= days <= MAX_DAYS:
+            return jsonify({"error": f"'days' must be between 0 and {MAX_DAYS}"}), 400
+
+        return jsonify(restaurant_stats(restaurant_id, days)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # ✅ Update order status (now with auto-assign delivery)
 @restaurant_bp.route("/order/<order_id>", methods=["PUT"])
+@rate_cost(2)
 @jwt_required()
 @role_required("restaurant")
 def update_order(order_id):
@@ -200,52 +237,46 @@ def update_order(order_id):
             return jsonify({"error": "Status not provided"}), 400
 
         restaurant_id = get_jwt_identity()
-        update_expr = "SET #s = :s, updated_by = :u"
-        attr_names = {"#s": "status"}
-        attr_vals = {":s": new_status, ":u": restaurant_id}
-
-        if new_status == "rejected":
-            update_expr += ", reason = :r"
-            attr_vals[":r"] = "We're sorry, but your order was politely declined by the restaurant due to availability or operational constraints."
-
-        orders_table.update_item(
-            Key={"order_id": order_id},
-            UpdateExpression=update_expr,
-            ExpressionAttributeNames=attr_names,
-            ExpressionAttributeValues=attr_vals
-        )
+        changes = {"reason": REJECTION_REASON} if new_status == "rejected" else None
+        old_order = transition(order_id, new_status, "restaurant", restaurant_id, changes)
 
         if new_status == "ready":
-            response = delivery_partners_table.scan(FilterExpression=Attr("status").eq("idle"))
-            idle_partners = response.get("Items", [])
-
-            if idle_partners:
-                partner = idle_partners[0]
-                eta = random.randint(3, 10)
-                delivery_start_time = datetime.utcnow()
-                delivery_end_time = delivery_start_time + timedelta(minutes=eta)
-
-                delivery_partners_table.update_item(
-                    Key={"partner_id": partner["partner_id"]},
-                    UpdateExpression="SET #s = :s, current_order_id = :o, delivery_end_time = :e",
-                    ExpressionAttributeNames={"#s": "status"},
-                    ExpressionAttributeValues={":s": "busy", ":o": order_id, ":e": delivery_end_time.isoformat()}
-                )
-
-                orders_table.update_item(
-                    Key={"order_id": order_id},
-                    UpdateExpression="SET delivery_partner_id = :pid, delivery_partner_name = :pname, eta_minutes = :eta, delivery_status = :ds, delivery_start_time = :start, delivery_end_time = :end",
-                    ExpressionAttributeValues={
-                        ":pid": partner["partner_id"],
-                        ":pname": partner["name"],
-                        ":eta": eta,
-                        ":ds": "assigned",
-                        ":start": delivery_start_time.isoformat(),
-                        ":end": delivery_end_time.isoformat()
-                    }
-                )
+            dispatch_order({**old_order, "status": new_status, "updated_by": restaurant_id})
 
         return jsonify({"message": f"✅ Order '{order_id}' updated to '{new_status}'"}), 200
+    except InvalidTransition as e:
+        return jsonify({"error": str(e)}), 400
+    except OrderNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except StaleTransition as e:
+        return jsonify({"error": str(e), "status": e.current_status}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ✅ Retry dispatch for ready orders that found no idle partner (one pass for all of them)
+@restaurant_bp.route("/orders/dispatch", methods=["POST"])
+@rate_cost(5)
+@jwt_required()
+@role_required("restaurant")
+def dispatch_ready_orders():
+    try:
+        data = request.get_json()
+        order_ids = (data or {}).get("order_ids")
+        if not order_ids or not isinstance(order_ids, list):
+            return jsonify({"error": "Missing 'order_ids' list"}), 400
+
+        # Only ready orders that are still waiting for a partner
+        orders = batch_get(orders_table, [{"order_id": order_id} for order_id in set(order_ids)])
+        waiting = [
+            o for o in orders
+            if o.get("status") == "ready" and not o.get("delivery_partner_id")
+        ]
+
+        assigned = dispatch_orders(waiting)
+        return jsonify({
+            "assigned": {order_id: partner["partner_id"] for order_id, partner in assigned.items()},
+            "unassigned": [order_id for order_id in order_ids if order_id not in assigned]
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,36 +1,139 @@
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
+import flask_jwt_extended
 from functools import wraps
-from flask import jsonify
+from collections import OrderedDict
+from flask import current_app, jsonify
+import logging
+import threading
+import time
+from app.services.metrics import register_collector
+
+
+def verified_claims():
+    """Claims of the token already verified in this request, or None if none was."""
+    try:
+        return get_jwt() or None
+    except RuntimeError:
+        return None
+
+
+def jwt_required():
+    """
+    Drop-in for flask_jwt_extended's @jwt_required() that verifies the token
+    only if nothing earlier in this request (the rate limiter) already did.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if verified_claims() is None:
+                verify_jwt_in_request()
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+
+        return decorator
+    return wrapper
+
 
 def role_required(allowed_roles):
     """
     Custom decorator to enforce role-based access control.
     Accepts a single role string or a list of allowed roles.
 
+    Stacked under @jwt_required() the token is already verified for this
+    request, so the claims decoded there are reused instead of verifying again.
+
     Examples:
         @role_required("customer")
         @role_required(["customer", "restaurant"])
     """
     if isinstance(allowed_roles, str):
         allowed_roles = [allowed_roles]  # convert to list if passed as string
+    allowed_roles = frozenset(allowed_roles)
 
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
             try:
-                verify_jwt_in_request()
-                claims = get_jwt()
+                claims = verified_claims()
+                if claims is None:
+                    verify_jwt_in_request()
+                    claims = get_jwt()
                 user_role = claims.get("role")
-
-                if user_role not in allowed_roles:
-                    return jsonify({
-                        "error": f"❌ Access denied. Role '{user_role}' not permitted."
-                    }), 403
-
-                return fn(*args, **kwargs)
-
             except Exception as e:
                 return jsonify({"error": f"Role verification failed: {str(e)}"}), 403
 
+            if user_role not in allowed_roles:
+                return jsonify({
+                    "error": f"❌ Access denied. Role '{user_role}' not permitted."
+                }), 403
+
+            return fn(*args, **kwargs)
+
         return decorator
     return wrapper
+
+
+class ClaimsCache:
+    """
+    LRU of encoded access token -> verified claims, each entry kept only until
+    the token's `exp`. Lets repeat requests with the same token skip the
+    signature check; blocklist / token-type checks still run on every request.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, token):
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self.entries[token]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, token, claims):
+        if "exp" not in claims:
+            return
+        with self.lock:
+            self.entries[token] = (claims["exp"], dict(claims))
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+def install_claims_cache(jwt_manager, maxsize):
+    """
+    Wrap the manager's token decoding with a ClaimsCache of `maxsize` entries.
+
+    flask_jwt_extended has no public hook for this, so it wraps the manager's
+    `_decode_jwt_from_config` (present throughout 4.x). On any other version,
+    or if that method is gone, the cache is not installed and None is returned.
+    """
+    decode = getattr(jwt_manager, "_decode_jwt_from_config", None)
+    if not callable(decode) or not flask_jwt_extended.__version__.startswith("4."):
+        logging.warning("⚠️ JWT claims cache not installed: unsupported flask_jwt_extended %s",
+                        flask_jwt_extended.__version__)
+        return None
+    cache = ClaimsCache(maxsize)
+
+    def cached_decode(encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return decode(encoded_token, csrf_value, allow_expired)
+        claims = cache.get(encoded_token)
+        if claims is None:
+            claims = decode(encoded_token, csrf_value, allow_expired)
+            cache.set(encoded_token, claims)
+        return claims
+
+    jwt_manager._decode_jwt_from_config = cached_decode
+    register_collector("jwt_claims_cache", cache.stats)
+    return cache
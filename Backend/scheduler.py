@@ -1,54 +1,32 @@
 # app/services/scheduler.py
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
-from app.services.db import delivery_partners_table, orders_table
-from boto3.dynamodb.conditions import Attr
+from app.services.delivery_timers import delivery_timers
+from app.services.leader import LeaderElection
+from app.services.metrics import register_collector
 
-def reset_delivery_partners():
-    try:
-        response = delivery_partners_table.scan(
-            FilterExpression=Attr("status").eq("busy")
-        )
-        busy_partners = response.get("Items", [])
-
-        for partner in busy_partners:
-            partner_id = partner["partner_id"]
-            delivery_end = partner.get("delivery_end_time")
-            if not delivery_end or delivery_end == "-":
-                continue
-
-            # Convert ISO string to datetime
-            end_time = datetime.fromisoformat(delivery_end)
-            now = datetime.utcnow()
-
-            if now >= end_time:
-                print(f"🕒 Resetting delivery partner: {partner_id}")
+# ✅ Only the elected process sweeps DynamoDB for in-flight deliveries (see app.services.leader)
+scheduler_election = LeaderElection(
+    "scheduler",
+    on_elected=delivery_timers.start_sweeping,
+    on_demoted=delivery_timers.stop_sweeping
+)
+register_collector("scheduler_leader", scheduler_election.stats)
 
-                # Update delivery partner to idle
-                delivery_partners_table.update_item(
-                    Key={"partner_id": partner_id},
-                    UpdateExpression="SET #s = :s, current_order_id = :o, delivery_end_time = :e",
-                    ExpressionAttributeNames={"#s": "status"},
-                    ExpressionAttributeValues={
-                        ":s": "idle",
-                        ":o": "-",
-                        ":e": "-"
-                    }
-                )
-
-                # Also update the order status to 'delivered'
-                order_id = partner.get("current_order_id")
-                if order_id and order_id != "-":
-                    orders_table.update_item(
-                        Key={"order_id": order_id},
-                        UpdateExpression="SET delivery_status = :ds",
-                        ExpressionAttributeValues={":ds": "delivered"}
-                    )
-    except Exception as e:
-        print(f"❌ Error during delivery partner reset: {e}")
+def reset_delivery_partners():
+    """
+    Re-read busy delivery partners and (re)schedule their completions.
+    Deliveries already past their end time are completed on the next tick.
+    """
+    return delivery_timers.rehydrate()
 
 def start_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(reset_delivery_partners, "interval", minutes=1)
-    scheduler.start()
-    print("✅ Delivery partner reset scheduler started")
+    """
+    Start this process's delivery timer thread and join the scheduler election.
+    Safe in every server worker: the rehydrate / resync sweeps run in one of them.
+    """
+    delivery_timers.start(sweep=False)
+    scheduler_election.start()
+    print("✅ Delivery completion scheduler started")
+
+def stop_scheduler():
+    """Hand the scheduler over to another process (worker shutdown)."""
+    scheduler_election.stop()
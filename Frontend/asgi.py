@@ -0,0 +1,13 @@
+from app import create_app
+from app.routes.async_api import create_asgi_app
+from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.outbox import start_outbox
+from app.services.metrics import start_metrics_flush, flush as flush_metrics
+
+# ✅ Async (ASGI) entry point: same API as run.py, hot endpoints served as coroutines.
+#    Run with:  uvicorn asgi:app --host 0.0.0.0 --port 5050 [--workers N]
+#    Each worker runs the lifespan hooks; the scheduler election picks one owner.
+print("🚀 asgi.py started")
+
+app = create_asgi_app(create_app(), on_startup=[start_scheduler, start_outbox, start_metrics_flush],
+                      on_shutdown=[stop_scheduler, flush_metrics])
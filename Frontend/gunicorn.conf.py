@@ -0,0 +1,46 @@
+# Frontend/gunicorn.conf.py
+"""
+Production launcher (from Frontend/):
+
+    gunicorn -c gunicorn.conf.py run:app
+
+Pre-forked workers, each with a few request threads. The app is imported
+once in the master (preload_app) so workers fork with everything loaded;
+boto3 clients, the SQLite outbox handle and the password pool are all
+created per process on first use, so nothing is shared across the fork.
+Background threads do not survive a fork, so each worker starts its own in
+post_fork; the scheduler election then lets exactly one of them sweep.
+With METRICS_DIR set, workers share their latency histograms through files
+there (see app.services.metrics); the master clears it on startup.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5050")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 20))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then to bound memory growth; jitter avoids restarting them all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+
+def on_starting(server):
+    from app.services.metrics import clear_metrics_dir
+    clear_metrics_dir()
+
+
+def post_fork(server, worker):
+    from run import start_background_services
+    start_background_services()
+
+
+def worker_exit(server, worker):
+    # Free the scheduler lease so another worker takes over without waiting for it to expire
+    from run import stop_background_services
+    stop_background_services()
@@ -1,6 +1,9 @@
+import os
 from app import create_app
 from flask_cors import CORS
-from app.services.scheduler import start_scheduler  # ✅ Added this line
+from app.services.scheduler import start_scheduler, stop_scheduler  # ✅ Added this line
+from app.services.outbox import start_outbox, outbox
+from app.services.metrics import start_metrics_flush, flush as flush_metrics
 
 print("🚀 run.py started")  # Debug log
 
@@ -9,12 +12,33 @@ app = create_app()
 # ✅ Enable CORS for all origins (frontend access from localhost:5173)
 CORS(app, supports_credentials=True)
 
-# ✅ Start background scheduler
-start_scheduler()
+
+def start_background_services():
+    """
+    Start the delivery scheduler (with its single-owner election), the
+    notification outbox workers and the metrics flush (with METRICS_DIR). Called once per serving process: below for
+    the dev server, from gunicorn.conf.py's post_fork for production workers.
+    """
+    start_scheduler()
+    start_outbox()
+    start_metrics_flush()
+
+
+def stop_background_services():
+    stop_scheduler()
+    outbox.stop()
+    flush_metrics()
+
 
 if __name__ == "__main__":
+    debug = os.getenv("FLASK_DEBUG", "true").lower() == "true"
+    # With the reloader on, only the child process that actually serves requests runs them
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+
+    # Development server only; production: gunicorn -c gunicorn.conf.py run:app
     app.run(
         host="0.0.0.0",     # Required for public EC2 access
         port=5050,          # Make sure port 5050 is open in AWS security group
-        debug=True          # Enable auto-reload and logging
+        debug=debug         # Enable auto-reload and logging
     )
@@ -0,0 +1,197 @@
+# benchmarks/bench_asgi.py
+"""
+WSGI vs. ASGI serving mode under an I/O-bound request mix.
+
+Both modes serve the same app (DynamoDB in moto) with a simulated network
+round trip added to every DynamoDB call. WSGI runs on a fixed pool of request
+threads, like a threaded gunicorn worker; ASGI runs on one uvicorn event loop
+(app.routes.async_api). Keep-alive clients replay a mix of menu reads,
+customer / restaurant order lists and order placement; throughput and
+latency percentiles are reported per mode.
+
+The async endpoints run on the thread-pool path of app.services.aio_db
+(AIO_DB_NATIVE=false): moto's in-process mock cannot serve aioboto3, and only
+the boto3 client carries the simulated round trip. The run exits non-zero if
+any request failed.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_asgi --clients 64 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from benchmarks.local_aws import local_aws
+
+
+class _PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    """wsgiref server handing connections to a fixed thread pool (gunicorn --threads N)."""
+    daemon_threads = True
+    threads = 8
+
+    def process_request(self, request, client_address):
+        if not hasattr(self, "pool"):
+            self.pool = ThreadPoolExecutor(max_workers=self.threads)
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve_wsgi(app, threads):
+    _PooledWSGIServer.threads = threads
+    server = make_server("127.0.0.1", 0, app, server_class=_PooledWSGIServer, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port, server.shutdown
+
+
+def _serve_asgi(app):
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return port, stop
+
+
+def _seed(db, client, prefix, count):
+    restaurants = [f"{prefix}-restaurant-{n}" for n in range(count)]
+    for restaurant_id in restaurants:
+        db.restaurants_table.put_item(Item={"restaurant_id": restaurant_id, "name": restaurant_id})
+        db.menus_table.put_item(Item={
+            "menu_id": f"{restaurant_id}-m1", "restaurant_id": restaurant_id, "name": "Margherita",
+            "price_small": "8", "price_medium": "10", "price_large": "12", "prep_time": "10", "is_available": True
+        })
+    tokens = {}
+    for role in ("customer", "restaurant"):
+        username = f"{prefix}-{role}"
+        client.post("/auth/register", json={"username": username, "password": "pw", "role": role})
+        token = client.post("/auth/login", json={"username": username, "password": "pw"}).json["token"]
+        tokens[role] = {"Authorization": f"Bearer {token}"}
+    return tokens, restaurants
+
+
+def _workload(tokens):
+    order = {
+        "items": [{"name": "margherita", "size": "medium", "quantity": 1}],
+        "customer_name": "Bench", "customer_email": "bench@example.com",
+        "customer_contact": "0", "unique_customer_id": "bench"
+    }
+    customer, restaurant = tokens["customer"], tokens["restaurant"]
+    return [
+        (40, lambda r: ("GET", f"/customer/menu/{r}", customer, None)),
+        (25, lambda r: ("GET", "/customer/orders", customer, None)),
+        (20, lambda r: ("GET", f"/restaurant/orders?restaurant_id={r}", restaurant, None)),
+        (15, lambda r: ("POST", "/customer/order", customer, {**order, "restaurant_id": r})),
+    ]
+
+
+def _load(port, workload, restaurants, clients, seconds):
+    weights = [w for w, _ in workload]
+    builders = [b for _, b in workload]
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local = []
+        while time.monotonic() < stop_at:
+            method, path, headers, body = rng.choices(builders, weights)[0](rng.choice(restaurants))
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=json.dumps(body) if body else None,
+                             headers={**headers, "Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            local.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                with lock:
+                    errors += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--wsgi-threads", type=int, default=8)
+    parser.add_argument("--rtt-ms", type=float, default=15, help="simulated DynamoDB round trip")
+    parser.add_argument("--restaurants", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    # Same pooled boto3 client (and RTT hook) in both modes; read when app.services.aio_db is imported
+    os.environ["AIO_DB_NATIVE"] = "false"
+    failed = False
+    with local_aws() as db:
+        from app import create_app
+        from app.routes.async_api import create_asgi_app
+
+        flask_app = create_app()
+        # Each mode gets its own users and restaurants, so order lists grow the same way in both runs
+        datasets = {mode: _seed(db, flask_app.test_client(), mode, args.restaurants) for mode in ("wsgi", "asgi")}
+
+        # Every DynamoDB request now costs a network round trip
+        rtt = args.rtt_ms / 1000
+        db.dynamodb.meta.client.meta.events.register("before-send.dynamodb", lambda **kwargs: time.sleep(rtt))
+
+        modes = {
+            "wsgi": (f"wsgi ({args.wsgi_threads} threads)", lambda: _serve_wsgi(flask_app, args.wsgi_threads)),
+            "asgi": ("asgi (1 event loop)", lambda: _serve_asgi(create_asgi_app(flask_app))),
+        }
+        for mode, (name, serve) in modes.items():
+            tokens, restaurants = datasets[mode]
+            workload = _workload(tokens)
+            port, stop = serve()
+            latencies, errors = _load(port, workload, restaurants, args.clients, args.seconds)
+            stop()
+            pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+            if errors:
+                print(f"{name:22} {errors} of {len(latencies)} requests failed")
+                failed = True
+                continue
+            print(f"{name:22} {len(latencies) / args.seconds:7.1f} req/s  p50={pct(50):7.1f} ms  "
+                  f"p95={pct(95):7.1f} ms  p99={pct(99):7.1f} ms")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
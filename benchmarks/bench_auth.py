@@ -0,0 +1,91 @@
+# benchmarks/bench_auth.py
+"""
+Per-request auth overhead of `@jwt_required()` + `@role_required(...)`:
+the previous decorator (verifies the token a second time) vs. the current one
+(reuses the claims from @jwt_required), with and without the claims cache.
+
+Each call runs in a fresh request context, as a real request would; the cost
+of an undecorated view in the same setup is subtracted.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_auth --requests 20000
+"""
+import argparse
+import time
+from functools import wraps
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, jwt_required, verify_jwt_in_request
+from app.utils.role_utils import install_claims_cache, role_required
+
+
+def legacy_role_required(allowed_roles):
+    """role_required as it was: a second verify_jwt_in_request() and a list lookup."""
+    if isinstance(allowed_roles, str):
+        allowed_roles = [allowed_roles]
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            try:
+                verify_jwt_in_request()
+                user_role = get_jwt().get("role")
+                if user_role not in allowed_roles:
+                    return jsonify({"error": "denied"}), 403
+                return fn(*args, **kwargs)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 403
+        return decorator
+    return wrapper
+
+
+def _view():
+    return "ok"
+
+
+def _app():
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "bench-secret-key-0123456789abcdef"
+    app.config["JWT_TOKEN_LOCATION"] = ["headers"]
+    return app, JWTManager(app)
+
+
+def _per_request_us(app, view, token, requests):
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        with app.test_request_context("/", headers=headers):
+            view()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    roles = ["restaurant", "admin"]
+    views = {
+        "legacy role_required": jwt_required()(legacy_role_required(roles)(_view)),
+        "role_required": jwt_required()(role_required(roles)(_view)),
+    }
+
+    app, jwt = _app()
+    with app.app_context():
+        token = create_access_token(identity="restaurant1", additional_claims={"role": "restaurant"})
+    baseline = _per_request_us(app, _view, token, args.requests)
+    results = {name: _per_request_us(app, view, token, args.requests) for name, view in views.items()}
+
+    cached_app, cached_jwt = _app()
+    cache = install_claims_cache(cached_jwt, 1024)
+    if cache is not None:
+        results["role_required + claims cache"] = _per_request_us(cached_app, views["role_required"], token, args.requests)
+
+    print(f"request context baseline: {baseline:7.1f} us")
+    for name, us in results.items():
+        print(f"{name:30} {us - baseline:7.1f} us auth overhead per request")
+    if cache is not None:
+        print(f"claims cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
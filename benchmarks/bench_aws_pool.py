@@ -0,0 +1,109 @@
+# benchmarks/bench_aws_pool.py
+"""
+GetItem throughput vs. worker threads: botocore defaults vs. the tuned client
+config in app.services.aws.
+
+Runs against a local stub endpoint that answers every DynamoDB request after a
+fixed latency, so the numbers reflect the client-side connection pool rather
+than the stand-in. Alongside throughput it reports the TCP connections the
+stub accepted and how often urllib3 had to discard a connection because the
+pool was full (threads outnumbering pooled sockets).
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_aws_pool --threads 1 4 16 32 64
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import boto3
+from botocore.config import Config
+from app.services.aws import CallStats, client_config, pool_full
+
+ITEM = json.dumps({"Item": {"order_id": {"S": "o1"}, "status": {"S": "ready"}}}).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(ITEM)))
+        self.end_headers()
+        self.wfile.write(ITEM)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub(latency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _run(client, threads, requests):
+    def worker(count):
+        for _ in range(count):
+            client.get_item(TableName="Orders", Key={"order_id": {"S": "o1"}})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker, requests // threads) for _ in range(threads)]:
+            future.result()
+    return (requests // threads * threads) / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=25)
+    args = parser.parse_args(argv)
+
+    urllib3_log = logging.getLogger("urllib3.connectionpool")   # discards are counted, not printed
+    urllib3_log.addHandler(logging.NullHandler())
+    urllib3_log.propagate = False
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    server = _start_stub(args.latency_ms / 1000)
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    configs = {
+        "default": Config(region_name="eu-north-1"),
+        "tuned": client_config(max_pool_connections=max(args.threads)),
+    }
+    for name, config in configs.items():
+        for threads in args.threads:
+            client = boto3.client("dynamodb", endpoint_url=endpoint, config=config)
+            stats = CallStats(config.max_pool_connections)
+            stats.attach(client)
+            server.connections = 0
+            discards = pool_full.discards
+            throughput = _run(client, threads, args.requests)
+            snapshot = stats.stats()
+            print(f"{name:8} threads={threads:3}  {throughput:8.0f} req/s  "
+                  f"connections_opened={server.connections:5}  pool_full_discards={pool_full.discards - discards:5}  "
+                  f"peak_in_flight={snapshot['peak_in_flight']:3}  retries={snapshot['retries']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_dispatch.py
+"""
+Concurrency benchmark for delivery partner dispatch.
+
+Several workers (each with its own idle pool, as separate gunicorn processes
+would have) race to assign partners to ready orders. The legacy
+scan-and-take-first path is run the same way for comparison. A partner that
+ends up recorded against more than one order is a double assignment.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_dispatch --partners 200 --orders 200 --workers 8
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Attr
+from benchmarks.local_aws import local_aws
+
+
+def _seed_partners(db, count):
+    with db.delivery_partners_table.batch_writer() as batch:
+        for i in range(count):
+            batch.put_item(Item={"partner_id": f"p{i}", "name": f"partner-{i}", "status": "idle"})
+
+
+def _seed_ready_orders(db, order_ids):
+    # Claims also record the delivery on the order, in the same transaction, so it must exist and be ready
+    with db.orders_table.batch_writer() as batch:
+        for order_id in order_ids:
+            batch.put_item(Item={"order_id": order_id, "status": "ready", "restaurant_id": "r0"})
+
+
+def _legacy_claim(db, order_id, end_time):
+    # Pre-dispatch-engine behaviour: scan for idle partners, take the first, unconditional update
+    idle = db.delivery_partners_table.scan(FilterExpression=Attr("status").eq("idle")).get("Items", [])
+    if not idle:
+        return None
+    partner = idle[0]
+    db.delivery_partners_table.update_item(
+        Key={"partner_id": partner["partner_id"]},
+        UpdateExpression="SET #s = :s, current_order_id = :o, delivery_end_time = :e",
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues={":s": "busy", ":o": order_id, ":e": end_time.isoformat()}
+    )
+    return partner
+
+
+def _run(label, workers, order_ids, assign):
+    slices = [order_ids[w::workers] for w in range(workers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(assign, range(workers), slices))
+    elapsed = time.perf_counter() - started
+
+    assignments = [(order_id, partner_id) for result in results for order_id, partner_id in result]
+    per_partner = Counter(partner_id for _, partner_id in assignments)
+    doubles = sum(1 for n in per_partner.values() if n > 1)
+    print(f"{label:<10} assigned={len(assignments):>5}  partners_used={len(per_partner):>5}  "
+          f"double_assigned={doubles:>4}  {len(order_ids) / elapsed:>8.0f} orders/s")
+    return doubles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partners", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=10, help="orders per claim_partners call")
+    args = parser.parse_args(argv)
+    order_ids = [f"order-{i}" for i in range(args.orders)]
+    end_time = datetime.utcnow() + timedelta(minutes=10)
+
+    with local_aws() as db:
+        from app.services.dispatch import IdlePartnerPool, claim_partners
+
+        _seed_partners(db, args.partners)
+
+        def legacy(worker, orders):
+            return [(o, p["partner_id"]) for o in orders if (p := _legacy_claim(db, o, end_time))]
+        _run("legacy", args.workers, order_ids, legacy)
+
+        _seed_partners(db, args.partners)
+        _seed_ready_orders(db, order_ids)
+        pools = [IdlePartnerPool() for _ in range(args.workers)]
+        for pool in pools:
+            pool.rebuild()  # every worker starts with the same (soon stale) view
+
+        def engine(worker, orders):
+            assigned = []
+            for start in range(0, len(orders), args.batch):
+                claimed = claim_partners(orders[start:start + args.batch], pool=pools[worker])
+                assigned.extend((o, a.partner["partner_id"]) for o, a in claimed.items())
+            return assigned
+        doubles = _run("dispatch", args.workers, order_ids, engine)
+        conflicts = sum(pool.conflicts for pool in pools)
+        print(f"dispatch claim conflicts resolved by retry: {conflicts}")
+        assert doubles == 0, "dispatch engine double-assigned a partner"
+
+
+if __name__ == "__main__":
+    main()
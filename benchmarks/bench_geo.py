@@ -0,0 +1,77 @@
+# benchmarks/bench_geo.py
+"""
+Nearest-partner lookups and position updates on the in-process grid index.
+
+Scatters simulated partners over a city-sized box, then measures k-nearest
+latency from random restaurant origins (vs. a brute-force scan of every
+partner) and the sustained position update rate.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_geo --partners 100000
+"""
+import argparse
+import random
+import statistics
+import time
+from app.services.geo import GridIndex, haversine_km
+
+# Roughly Stockholm: ~40 x 30 km
+LAT_RANGE = (59.15, 59.50)
+LON_RANGE = (17.80, 18.35)
+
+
+def _point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partners", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=200000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    index = GridIndex()
+    positions = {}
+    started = time.perf_counter()
+    for n in range(args.partners):
+        positions[f"p{n}"] = _point(rng)
+        index.update(f"p{n}", *positions[f"p{n}"])
+    print(f"indexed {args.partners} partners in {time.perf_counter() - started:.2f}s")
+
+    origins = [_point(rng) for _ in range(args.lookups)]
+    latencies = []
+    for lat, lon in origins:
+        started = time.perf_counter()
+        index.nearest(lat, lon, k=args.k)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"nearest(k={args.k}): p50 {statistics.median(latencies):.3f} ms, "
+          f"p99 {_percentile(latencies, 99):.3f} ms")
+
+    # Brute force on a sample of origins only: it is slow enough to dominate the run
+    lat, lon = origins[0]
+    started = time.perf_counter()
+    brute = sorted((haversine_km(lat, lon, *p), key) for key, p in positions.items())[:args.k]
+    brute_ms = (time.perf_counter() - started) * 1000
+    assert [key for _, key in brute] == [key for _, key in index.nearest(lat, lon, k=args.k)]
+    print(f"brute-force scan: {brute_ms:.1f} ms per lookup (results match)")
+
+    keys = list(positions)
+    moves = [(rng.choice(keys), *_point(rng)) for _ in range(args.updates)]
+    started = time.perf_counter()
+    for key, lat, lon in moves:
+        index.update(key, lat, lon)
+    elapsed = time.perf_counter() - started
+    print(f"position updates: {args.updates / elapsed:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
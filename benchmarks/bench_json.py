@@ -0,0 +1,96 @@
+# benchmarks/bench_json.py
+"""
+Serializing a large order list the way the list endpoints do (jsonify).
+
+Builds orders shaped like the ones order intake writes, with numbers as the
+`Decimal`s DynamoDB hands back, and times one response of all of them with
+Flask's default provider, with app.utils.json_provider on orjson, with its
+stdlib fallback, and with a projected field list.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_json --orders 10000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.utils import json_provider
+from app.utils.json_provider import DynamoJSONProvider, project
+
+LIST_FIELDS = ["order_id", "restaurant_id", "status", "order_time", "total_price"]
+
+
+def _orders(count, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    orders = []
+    for i in range(count):
+        items = [{
+            "name": f"Dish {rng.randrange(40)}",
+            "menu_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "size": rng.choice(["small", "medium", "large"]),
+            "quantity": Decimal(rng.randint(1, 3)),
+            "price_small": Decimal("8.5"),
+            "price_medium": Decimal("10"),
+            "price_large": Decimal("12.75"),
+            "prep_time": Decimal(rng.randint(5, 25))
+        } for _ in range(rng.randint(1, 4))]
+        orders.append({
+            "order_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "unique_customer_id": f"u{i}",
+            "customer": f"customer-{rng.randrange(100)}",
+            "restaurant_id": f"restaurant-{rng.randrange(20)}",
+            "items": items,
+            "total_price": Decimal("31.25"),
+            "status": rng.choice(["pending", "accepted", "ready", "delivered"]),
+            "order_time": (start + timedelta(seconds=i)).isoformat(),
+            "customer_name": "Bench", "customer_email": "bench@example.com", "customer_contact": "0"
+        })
+    return orders
+
+
+def _time(app, body, repeat):
+    samples, size = [], 0
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = len(app.json.response({"orders": body() if callable(body) else body}).get_data())
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+    orders = _orders(args.orders)
+
+    default_app = Flask(__name__)
+    default_app.json = DefaultJSONProvider(default_app)
+    fast_app = Flask(__name__)
+    fast_app.json = DynamoJSONProvider(fast_app)
+
+    orjson = json_provider.orjson
+    cases = [
+        ("flask default provider", default_app, orders, orjson),
+        ("DynamoJSONProvider (orjson)", fast_app, orders, orjson),
+        ("DynamoJSONProvider (stdlib)", fast_app, orders, None),
+        ("  + projected list fields", fast_app, lambda: project(orders, LIST_FIELDS), orjson),
+    ]
+    for name, app, body, encoder in cases:
+        if encoder is None and name.endswith("(orjson)"):
+            continue
+        json_provider.orjson = encoder
+        median_ms, size = _time(app, body, args.repeat)
+        print(f"{name:30} {median_ms:8.1f} ms  {size / 1e6:6.2f} MB")
+    json_provider.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_logging.py
+"""
+Request throughput with the old synchronous file logging vs. app.utils.logs.
+
+A handler shaped like the order endpoints logs three INFO lines per request.
+Threads drive the Flask test client concurrently (like gunicorn's request
+threads) with, in turn:
+- the old setup: RotatingFileHandler on the root logger, text lines, f-strings
+- QueuedHandler: the same file written by a listener thread, JSON lines
+- QueuedHandler with call-site sampling
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_logging --requests 20000 --threads 8 [--write-delay-ms 0.2]
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, jsonify
+from app.utils import logs
+
+
+class _SlowDisk(logging.Handler):
+    """Wraps a file handler; every write also waits `delay` seconds (a busy or network-backed disk)."""
+
+    def __init__(self, target, delay):
+        super().__init__()
+        self.target = target
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.target.handle(record)
+
+
+def _app(lazy):
+    app = Flask(__name__)
+
+    @app.route("/customer/order/<order_id>", methods=["POST"])
+    def place(order_id):
+        body = {"restaurant_id": "restaurant-1", "items": [{"name": "Dish", "size": "large", "quantity": 2}]}
+        if lazy:
+            logging.info("📨 Creating order for restaurant_id=%s by '%s'", body["restaurant_id"], "customer-1")
+            logging.info("🧾 Order %s items: %s", order_id, body["items"])
+            logging.info("🛒 Order placed by '%s' → Order ID: %s", "customer-1", order_id)
+        else:
+            logging.info(f"📨 Creating order for restaurant_id={body['restaurant_id']} by 'customer-1'")
+            logging.info(f"🧾 Order {order_id} items: {body['items']}")
+            logging.info(f"🛒 Order placed by 'customer-1' → Order ID: {order_id}")
+        return jsonify({"order_id": order_id}), 201
+    return app
+
+
+def _run(app, requests, threads):
+    """(requests/s, median ms, p99 ms)"""
+    client = app.test_client()
+
+    def timed(n):
+        started = time.perf_counter()
+        client.post(f"/customer/order/{n}")
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = sorted(pool.map(timed, range(requests)))
+    rate = requests / (time.perf_counter() - started)
+    return rate, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--write-delay-ms", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.log")
+        delay = args.write_delay_ms / 1000
+        old = logging.handlers.RotatingFileHandler(path, maxBytes=1_000_000, backupCount=3)
+        old.setFormatter(logging.Formatter(logs.TEXT_FORMAT))
+        if delay:
+            old = _SlowDisk(old, delay)
+        queued = logs.QueuedHandler(_SlowDisk(logs.file_handler(path, "json"), delay))
+        sampled = logs.QueuedHandler(_SlowDisk(logs.file_handler(path, "json"), delay))
+        sampler = logs.Sampler(burst=100, every=10)
+        sampled.addFilter(sampler)
+        cases = [
+            ("RotatingFileHandler (old)", old, False),
+            ("QueuedHandler, JSON", queued, True),
+            ("QueuedHandler, JSON, sampled", sampled, True),
+        ]
+        for name, handler, lazy in cases:
+            root.addHandler(handler)
+            try:
+                rate, median_ms, p99_ms = _run(_app(lazy), args.requests, args.threads)
+            finally:
+                root.removeHandler(handler)
+                if isinstance(handler, logs.QueuedHandler):
+                    handler.stop()
+            dropped = getattr(handler, "dropped", 0)
+            print(f"{name:<32}{rate:>7.0f} req/s  p50 {median_ms:5.2f} ms  p99 {p99_ms:6.2f} ms  dropped={dropped}")
+        print(f"sampled out: {sampler.sampled_out} of {args.requests * 3} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_metrics.py
+"""
+Cost of the always-on instrumentation (app.services.metrics, the request
+hooks of app.utils.request_metrics and the botocore hooks of app.services.aws).
+
+Times a bare histogram observation, a Flask request with and without the
+request hooks, a DynamoDB GetItem against the local stand-in with and without
+the call hooks, and rendering /metrics with a realistic number of series.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_metrics --requests 2000
+"""
+import argparse
+import time
+import boto3
+from flask import Flask, jsonify
+from app.services import aws
+from app.services.metrics import histogram, render_prometheus
+from app.utils.request_metrics import init_request_metrics
+from benchmarks.local_aws import local_aws
+
+
+def _per_call_us(fn, count):
+    fn()
+    started = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def _compare(cases, count, rounds=5):
+    """Best per-call time of each case, alternating between them so drift hits both alike."""
+    best = {name: float("inf") for name, _ in cases}
+    for _ in range(rounds):
+        for name, fn in cases:
+            best[name] = min(best[name], _per_call_us(fn, count))
+    for name, _ in cases:
+        print(f"{name:<34}{best[name]:>9.1f} us")
+
+
+def _app(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        init_request_metrics(app)
+
+    @app.route("/customer/order/<order_id>")
+    def get_order(order_id):
+        return jsonify({"order_id": order_id, "status": "pending"})
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    bench = histogram("bench_seconds", "benchmark series", ("route", "method", "status"))
+    print(f"{'histogram observe':<34}{_per_call_us(lambda: bench.observe(0.004, '/r', 'GET', 200), 100000):>9.2f} us")
+
+    plain_app, timed_app = _app(False).test_client(), _app(True).test_client()
+    _compare([
+        ("flask request", lambda: plain_app.get("/customer/order/42")),
+        ("flask request + hooks", lambda: timed_app.get("/customer/order/42")),
+    ], args.requests)
+
+    with local_aws() as db:
+        db.orders_table.put_item(Item={"order_id": "42", "status": "pending"})
+        plain = boto3.client("dynamodb", region_name=aws.REGION)
+        timed = aws.call_timer.attach(boto3.client("dynamodb", region_name=aws.REGION))
+        key = {"order_id": {"S": "42"}}
+        _compare([
+            ("dynamodb get_item", lambda: plain.get_item(TableName=db.orders_table.name, Key=key)),
+            ("dynamodb get_item + hooks", lambda: timed.get_item(TableName=db.orders_table.name, Key=key)),
+        ], args.calls)
+
+    # ~40 routes x 3 statuses, ~30 DynamoDB operation / table pairs
+    for n in range(40):
+        for status in (200, 400, 500):
+            bench.observe(0.01, f"/route/{n}", "GET", status)
+    for n in range(30):
+        aws.call_seconds.observe(0.003, "dynamodb", f"Op{n}", "Orders")
+    size = len(render_prometheus())
+    print(f"{'render /metrics':<34}{_per_call_us(render_prometheus, 50):>9.1f} us  ({size / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_order_queries.py
+"""
+Items read per request for the order list endpoints: legacy filtered scans vs.
+the GSI-backed access paths in app.services.db.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_order_queries --orders 20000
+"""
+import argparse
+import time
+from boto3.dynamodb.conditions import Attr
+from benchmarks.local_aws import local_aws, seed_orders
+
+
+def _scan_read_count(table, condition):
+    """Items DynamoDB reads (and bills) for a filtered scan, following every page."""
+    params = {"FilterExpression": condition}
+    scanned = returned = 0
+    while True:
+        response = table.scan(**params)
+        scanned += response["ScannedCount"]
+        returned += response["Count"]
+        if "LastEvaluatedKey" not in response:
+            return scanned, returned
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with local_aws() as db:
+        seed_orders(db, args.orders)
+        cases = [
+            ("customer.get_orders", Attr("customer").eq("customer-1"),
+             lambda: db.orders_for_customer("customer-1")),
+            ("restaurant.view_orders", Attr("restaurant_id").eq("restaurant-1"),
+             lambda: db.orders_for_restaurant("restaurant-1")),
+            ("delivery.get_ready_orders", Attr("status").eq("ready") & Attr("delivery_partner_name").eq("partner-1"),
+             lambda: db.orders_for_partner("partner-1", "ready")),
+        ]
+
+        print(f"{'endpoint':<28}{'scan read':>12}{'query read':>12}{'scan ms':>10}{'query ms':>10}")
+        for name, condition, query in cases:
+            (scanned, returned), scan_ms = _timed(lambda: _scan_read_count(db.orders_table, condition))
+            items, query_ms = _timed(query)
+            assert len(items) == returned, f"{name}: query returned {len(items)}, scan {returned}"
+            # A query only reads the items it returns
+            print(f"{name:<28}{scanned:>12}{len(items):>12}{scan_ms:>10.1f}{query_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_passwords.py
+"""
+Login storm vs. health checks: bcrypt on the request threads (the previous
+behaviour) vs. the bounded, low-priority password worker pool.
+
+Serves the real app on a local threaded werkzeug server (DynamoDB in moto),
+fires concurrent logins for a fixed time while probing GET /health, and
+reports successful logins/s, fast 503 rejections and health-check latency.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_passwords --clients 32 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from werkzeug.serving import make_server
+from benchmarks.local_aws import local_aws
+
+
+def _request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _storm(port, clients, seconds):
+    stop_at = time.monotonic() + seconds
+    statuses = {}
+    health = []
+    lock = threading.Lock()
+
+    def login():
+        while time.monotonic() < stop_at:
+            status = _request(port, "POST", "/auth/login", {"username": "storm", "password": "pw"})
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+            if status == 503:
+                time.sleep(1)   # honour Retry-After like a well-behaved client
+
+    def probe():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            _request(port, "GET", "/health")
+            health.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=login) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, health
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with local_aws():
+        from app import create_app
+        from app.services import passwords
+
+        app = create_app()
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+
+        modes = {
+            "request thread": passwords.PasswordPool(workers=0, queue_limit=10_000, rounds=args.rounds),
+            "worker pool": passwords.PasswordPool(rounds=args.rounds),
+        }
+        passwords.password_pool = modes["request thread"]
+        _request(port, "POST", "/auth/register", {"username": "storm", "password": "pw", "role": "customer"})
+
+        for name, pool in modes.items():
+            passwords.password_pool = pool
+            statuses, health = _storm(port, args.clients, args.seconds)
+            ordered = sorted(health)
+            print(f"{name:15} logins/s={statuses.get(200, 0) / args.seconds:6.1f}  "
+                  f"rejected_503={statuses.get(503, 0):5}  "
+                  f"health p50={statistics.median(ordered):7.1f} ms  "
+                  f"p99={ordered[int(len(ordered) * 0.99)]:7.1f} ms  max={ordered[-1]:7.1f} ms")
+            pool.shutdown()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_payload.py
+"""
+Bytes read from DynamoDB and bytes sent to the client by the order-list endpoints.
+
+Seeds orders shaped like the ones order intake writes, then requests each list
+endpoint whole and with a typical mobile `?fields=` list, with and without
+br / gzip. DynamoDB bytes are the response bodies botocore receives;
+response time includes the compression CPU.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_payload --orders 2000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from benchmarks.local_aws import local_aws
+
+MOBILE_FIELDS = "order_id,status,order_time,total_price,restaurant_id"
+
+
+def _seed(db, count, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    with db.orders_table.batch_writer() as batch:
+        for i in range(count):
+            items = [{
+                "name": f"Dish {rng.randrange(40)}", "menu_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "size": "medium", "quantity": rng.randint(1, 3),
+                "price_small": "8.5", "price_medium": "10", "price_large": "12.75", "prep_time": "15"
+            } for _ in range(rng.randint(1, 4))]
+            batch.put_item(Item={
+                "order_id": str(uuid.UUID(int=rng.getrandbits(128))), "unique_customer_id": f"u{i}",
+                "customer": "bench-customer", "restaurant_id": "bench-restaurant",
+                "items": items, "total_price": Decimal("31.25"), "status": "ready",
+                "order_time": (start + timedelta(seconds=i)).isoformat(),
+                "customer_name": "Bench Customer", "customer_email": "bench@example.com",
+                "customer_contact": "+46 70 000 00 00", "delivery_partner_name": "bench-delivery",
+                "delivery_partner_id": "p1", "eta_minutes": 25
+            })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with local_aws() as db:
+        from app import create_app
+        from app.utils import compression
+        app = create_app()
+        client = app.test_client()
+        tokens = {}
+        for role in ("customer", "restaurant", "delivery", "admin"):
+            username = f"bench-{role}"
+            client.post("/auth/register", json={"username": username, "password": "pw", "role": role})
+            token = client.post("/auth/login", json={"username": username, "password": "pw"}).json["token"]
+            tokens[role] = {"Authorization": f"Bearer {token}"}
+        _seed(db, args.orders)
+
+        read_bytes = []
+        db.dynamodb.meta.client.meta.events.register(
+            "after-call.dynamodb", lambda http_response, **kwargs: read_bytes.append(len(http_response.content))
+        )
+        endpoints = [
+            ("customer", "/customer/orders"),
+            ("restaurant", "/restaurant/orders?restaurant_id=bench-restaurant"),
+            ("delivery", "/delivery/ready"),
+            ("admin", "/admin/orders"),
+        ]
+        variants = [("whole", "", None), ("whole", "", "gzip"), ("whole", "", "br"),
+                    ("fields", MOBILE_FIELDS, None), ("fields", MOBILE_FIELDS, "br")]
+        if compression.brotli is None:
+            # brotli is optional: without it the app never answers br
+            variants = [v for v in variants if v[2] != "br"]
+        print(f"{'endpoint':52} {'variant':14} {'DynamoDB KB':>11} {'sent KB':>9} {'p50 ms':>8}")
+        for role, path in endpoints:
+            for name, fields, encoding in variants:
+                url = path + ("&" if "?" in path else "?") + f"fields={fields}" if fields else path
+                headers = {**tokens[role], **({"Accept-Encoding": encoding} if encoding else {})}
+                latencies = []
+                for _ in range(args.repeat):
+                    read_bytes.clear()
+                    started = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, (url, response.status_code, response.data[:200])
+                assert response.headers.get("Content-Encoding") == encoding, response.headers
+                print(f"{path:52} {name + '/' + (encoding or 'identity'):14} {sum(read_bytes) / 1024:11.1f} "
+                      f"{len(response.data) / 1024:9.1f} {statistics.median(latencies):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# benchmarks/bench_rate_limit.py
+"""
+What app.utils.rate_limit buys under a noisy neighbour, and what the shared
+backend changes with several workers.
+
+- noisy neighbour: `--abusers` threads of one restaurant account loop on
+  GET /restaurant/orders (every call a full query of `--history` orders) and
+  ignore Retry-After, while `--customers` customers open menus and poll an
+  order at a human pace (`--think-ms` between requests). The same run with
+  the limiter off, then on: the customers' throughput and latency, the
+  abuser's 200s and 429s, and the DynamoDB calls and items read by the run.
+- shared buckets: one customer spreads requests over two workers' limiters.
+  With in-process buckets each worker grants the full rate; with the shared
+  backend (benchmarks.local_redis standing in for Redis) they grant it once.
+
+Against the in-process DynamoDB stand-in every query is CPU work in this
+process, so the abuser slows the customers down through the GIL rather than
+through consumed capacity; the items-read column is what DynamoDB would bill.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_rate_limit --seconds 10 --abusers 4 --customers 8
+"""
+import argparse
+import http.client
+import os
+import threading
+import time
+from benchmarks.bench_asgi import _serve_wsgi
+from benchmarks.local_aws import local_aws, seed_catalog, seed_orders
+
+
+class _ReadCounter:
+    """DynamoDB calls and items read (ScannedCount, or 1 per GetItem hit) seen by the app's client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = self.items = 0
+
+    def __call__(self, parsed, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.items += parsed.get("ScannedCount", 1 if "Item" in parsed else 0)
+
+    def take(self):
+        with self.lock:
+            counts, self.calls, self.items = (self.calls, self.items), 0, 0
+        return counts
+
+
+def _loop(port, stop_at, requests, results, think=0):
+    """Send `requests` (method, path, headers) round-robin until `stop_at`, `think` seconds apart; appends (ms, status)."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    n = 0
+    while time.monotonic() < stop_at:
+        method, path, headers = requests[n % len(requests)]
+        n += 1
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            status = 0
+        results.append(((time.perf_counter() - started) * 1000, status))
+        if think:
+            time.sleep(think)
+
+
+def _noisy_neighbour(app, args, customer_requests, abuser_requests, reads):
+    port, stop = _serve_wsgi(app, args.wsgi_threads)
+    customers = [[] for _ in range(args.customers)]
+    abusers = [[] for _ in range(args.abusers)]
+    stop_at = time.monotonic() + args.seconds
+    reads.take()
+    think = args.think_ms / 1000
+    threads = [threading.Thread(target=_loop, args=(port, stop_at, customer_requests[n], customers[n], think))
+               for n in range(args.customers)]
+    threads += [threading.Thread(target=_loop, args=(port, stop_at, abuser_requests, results)) for results in abusers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop()
+
+    served = sorted(ms for results in customers for ms, status in results if status == 200)
+    failed = sum(1 for results in customers for _, status in results if status != 200)
+    abuser_statuses = [status for results in abusers for _, status in results]
+    pct = lambda p: served[min(len(served) - 1, int(len(served) * p / 100))] if served else float("nan")
+    calls, items = reads.take()
+    return (len(served) / args.seconds, pct(50), pct(99), failed, abuser_statuses.count(200),
+            abuser_statuses.count(429), calls, items)
+
+
+def _spread(backends, seconds):
+    """Requests per second one customer gets granted, alternating between the workers' limiters."""
+    from app.utils.rate_limit import RateLimiter
+    limiters = [RateLimiter(backend) for backend in backends]
+    granted = n = 0
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        granted += limiters[n % len(limiters)].take("customer:spread", "customer", 1).allowed
+        n += 1
+        time.sleep(0.001)
+    return granted / seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--customers", type=int, default=8)
+    parser.add_argument("--abusers", type=int, default=4, help="threads of the one abusive restaurant account")
+    parser.add_argument("--history", type=int, default=300, help="orders of the abused restaurant")
+    parser.add_argument("--think-ms", type=float, default=100, help="customers' pause between requests")
+    parser.add_argument("--wsgi-threads", type=int, default=8)
+    parser.add_argument("--rtt-ms", type=float, default=2, help="simulated DynamoDB round trip")
+    args = parser.parse_args(argv)
+
+    os.environ["RATE_LIMIT_ENABLED"] = "true"
+    with local_aws() as db:
+        from flask_jwt_extended import create_access_token
+        from app import create_app
+        from app.utils import rate_limit
+        from benchmarks.local_redis import LocalRedis
+
+        restaurants = seed_catalog(db, 5)
+        seed_orders(db, args.history, customers=args.customers, restaurants=1)
+        order_ids = [item["order_id"] for item in db.orders_table.scan(Limit=args.customers)["Items"]]
+
+        rate_limit.RATE_LIMIT_ENABLED = False
+        apps = {"limiter off": create_app()}
+        rate_limit.RATE_LIMIT_ENABLED = True
+        apps["limiter on"] = create_app()
+
+        with apps["limiter on"].app_context():
+            def bearer(username, role):
+                token = create_access_token(identity=username, additional_claims={"role": role})
+                return {"Authorization": f"Bearer {token}"}
+            abuser = bearer("restaurant-0", "restaurant")
+            customer_requests = []
+            for n in range(args.customers):
+                headers = bearer(f"customer-{n}", "customer")
+                customer_requests.append([
+                    ("GET", f"/customer/menu/{restaurants[n % len(restaurants)]}", headers),
+                    ("GET", f"/delivery/order/{order_ids[n % len(order_ids)]}", headers),
+                ])
+        abuser_requests = [("GET", "/restaurant/orders?restaurant_id=restaurant-0", abuser)]
+
+        reads = _ReadCounter()
+        db.dynamodb.meta.client.meta.events.register("after-call.dynamodb", reads)
+        rtt = args.rtt_ms / 1000
+        db.dynamodb.meta.client.meta.events.register("before-send.dynamodb", lambda **kwargs: time.sleep(rtt))
+
+        print(f"{'':<14}{'customer req/s':>15}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}"
+              f"{'abuser 200':>12}{'429':>8}{'ddb calls':>11}{'items read':>12}")
+        for name, app in apps.items():
+            rate, p50, p99, failed, ok, limited, calls, items = _noisy_neighbour(
+                app, args, customer_requests, abuser_requests, reads
+            )
+            print(f"{name:<14}{rate:>15.1f}{p50:>9.1f}{p99:>9.1f}{failed:>8}{ok:>12}{limited:>8}{calls:>11}{items:>12}")
+        print("admission:", rate_limit.admission.stats())
+
+        customer_rate, customer_burst = rate_limit.LIMITS["customer"]
+        print(f"\none customer over two workers (limit {customer_rate:g}/s, burst {customer_burst:g}), granted/s over 3 s:")
+        print(f"  in-process buckets  {_spread([rate_limit.LocalBackend(), rate_limit.LocalBackend()], 3):6.1f}")
+        shared = LocalRedis()
+        print(f"  shared buckets      {_spread([rate_limit.RedisBackend(shared), rate_limit.RedisBackend(shared)], 3):6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_reads.py
+"""
+DynamoDB calls saved by app.services.reads under concurrent identical reads.
+
+- polling: `--threads` clients each poll GET /delivery/order/<order_id> for
+  the same few orders, read with a plain GetItem vs. the coalesced `get_item`;
+- menu stampede: the same threads all miss the menu cache of one restaurant at
+  once (as after an invalidation), before and after the loader single-flight.
+
+Counts are the GetItem / Query calls the resource client actually made.
+Against the in-process stand-in every call is CPU-bound, so fewer calls
+overlap than against DynamoDB, where each one waits a network round trip.
+
+Usage (from the directory containing the `app` package):
+    python -m benchmarks.bench_reads --threads 16 --polls 200
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.local_aws import local_aws
+
+
+def _calls():
+    from app.services import aws
+    return aws.stats().get("dynamodb.resource", {}).get("calls", 0)
+
+
+def _burst(threads, fn, count):
+    """Run fn(i) for i in range(count) on `threads` threads released together; returns (seconds, calls made)."""
+    start = threading.Barrier(threads)
+    before = _calls()
+    began = time.perf_counter()
+
+    def worker(offset):
+        start.wait()
+        for i in range(offset, count, threads):
+            fn(i)
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return time.perf_counter() - began, _calls() - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--polls", type=int, default=200, help="polls per thread")
+    parser.add_argument("--orders", type=int, default=4, help="distinct orders being polled")
+    args = parser.parse_args(argv)
+
+    with local_aws() as db:
+        from app.services import cache, reads
+        order_ids = [f"order-{n}" for n in range(args.orders)]
+        for order_id in order_ids:
+            db.orders_table.put_item(Item={"order_id": order_id, "status": "ready"})
+        for n in range(30):
+            db.menus_table.put_item(Item={"menu_id": f"m{n}", "restaurant_id": "r1", "name": f"Dish {n}"})
+
+        total = args.threads * args.polls
+        cases = [
+            ("poll: plain GetItem", lambda i: db.orders_table.get_item(Key={"order_id": order_ids[i % args.orders]})),
+            ("poll: reads.get_item", lambda i: reads.get_item(db.orders_table, {"order_id": order_ids[i % args.orders]})),
+        ]
+        print(f"{'case':<28}{'reads':>8}{'calls':>8}{'saved':>8}{'reads/s':>10}")
+        for name, fn in cases:
+            seconds, calls = _burst(args.threads, fn, total)
+            print(f"{name:<28}{total:>8}{calls:>8}{1 - calls / total:>8.0%}{total / seconds:>10.0f}")
+
+        for name, coalesced in (("menu miss: no single-flight", False), ("menu miss: single-flight", True)):
+            original = cache.read
+            if not coalesced:
+                cache.read = lambda key, load, memoize=True: load()
+            try:
+                calls_made = 0
+                for _ in range(20):
+                    # Every burst starts cold, all threads missing together
+                    barrier = threading.Barrier(args.threads, action=lambda: cache.menu_cache.invalidate("r1"))
+                    _, calls = _burst(args.threads, lambda i: (barrier.wait(), cache.cached_menu("r1")), args.threads)
+                    calls_made += calls
+            finally:
+                cache.read = original
+            print(f"{name:<28}{20 * args.threads:>8}{calls_made:>8}{1 - calls_made / (20 * args.threads):>8.0%}")
+        print(reads.coalescer.stats())
+
+
+if __name__ == "__main__":
+    main()
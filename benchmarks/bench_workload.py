@@ -0,0 +1,379 @@
+# benchmarks/bench_workload.py
+"""
+End-to-end workload against the local DynamoDB/SNS stand-in, with JSON results.
+
+Seeds restaurants with menus, delivery partners, users for every role and an
+order history (all scales are options, all data derives from --seed), serves
+the app on a pool of request threads and runs closed-loop virtual users:
+- customers list the restaurants, open a menu, place an order, look it up in
+  their order list and poll it (GET /delivery/order/<order_id>);
+- restaurants list their orders and move them pending → accepted → ready
+  (ready dispatches a partner), now and then opening their stats;
+- couriers list the orders assigned to them, deliver them and report their
+  position.
+
+Reported per endpoint (route template): requests, errors, throughput,
+p50/p95/p99 latency and DynamoDB operations per request. Operations are
+counted on the server by request id (every client request sends its own
+X-Request-ID); calls made outside a request (outbox relay, delivery timers,
+partner pool rebuilds) are reported as background. Results are written as
+JSON; --compare prints the change against an earlier result file.
+
+Virtual users are seeded, but thread scheduling still varies between runs:
+compare rates, percentiles and ops/request rather than exact counts. Use
+BCRYPT_ROUNDS=4 unless the logins themselves are being measured.
+
+Usage (from the directory containing the `app` package):
+    BCRYPT_ROUNDS=4 python -m benchmarks.bench_workload --seconds 20 --output baseline.json
+    BCRYPT_ROUNDS=4 python -m benchmarks.bench_workload --seconds 20 --compare baseline.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from benchmarks.bench_asgi import _serve_wsgi
+from benchmarks.local_aws import local_aws, seed_catalog, seed_orders, seed_partners, seed_users
+
+PASSWORD = "bench-password"
+IDLE_SECONDS = 0.02         # a restaurant / courier with nothing to do waits this long before looking again
+
+
+class OperationCounter:
+    """DynamoDB / SNS calls made by the server, by the request id that made them."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_request = defaultdict(Counter)
+        self.background = Counter()
+
+    def attach(self, client, service):
+        client.meta.events.register(f"before-call.{service}", self._count)
+
+    def _count(self, model, **kwargs):
+        from app.utils.logs import request_id
+        service = model.service_model.service_name
+        operation = model.name if service == "dynamodb" else f"{service}:{model.name}"
+        current = request_id.get()
+        with self.lock:
+            (self.by_request[current] if current else self.background)[operation] += 1
+
+    def take(self, current):
+        with self.lock:
+            return self.by_request.pop(current, Counter())
+
+
+class VirtualUser:
+    """One keep-alive connection; every request is recorded under its endpoint name."""
+
+    def __init__(self, name, port, operations):
+        self.name = name
+        self.port = port
+        self.operations = operations
+        self.records = defaultdict(list)     # endpoint -> [(ms, status, operations)]
+        self.journeys = Counter()
+        self.headers = {}
+        self.sequence = itertools.count()
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def call(self, endpoint, method, path, body=None, headers=None):
+        """(status, parsed JSON body or None); status 0 is a connection error."""
+        current = f"{self.name}-{next(self.sequence)}"
+        headers = {**(headers or self.headers), "X-Request-ID": current, "Content-Type": "application/json"}
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = self.conn.getresponse()
+            payload = response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            status, payload = 0, b""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.records[endpoint].append((elapsed_ms, status, self.operations.take(current)))
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _customer(user, rng, restaurants, stop_at, polls):
+    while time.monotonic() < stop_at:
+        user.call("GET /customer/restaurants", "GET", "/customer/restaurants")
+        restaurant_id = rng.choice(restaurants)
+        _, body = user.call("GET /customer/menu/<restaurant_id>", "GET", f"/customer/menu/{restaurant_id}")
+        menu = (body or {}).get("menu") or []
+        if not menu:
+            continue
+        reference = f"{user.name}-{next(user.sequence)}"
+        items = [{"name": dish["name"].lower(), "size": rng.choice(["small", "medium", "large"]),
+                  "quantity": rng.randint(1, 3)} for dish in rng.sample(menu, min(len(menu), rng.randint(1, 3)))]
+        status, _ = user.call("POST /customer/order", "POST", "/customer/order", {
+            "restaurant_id": restaurant_id, "items": items, "customer_name": user.name,
+            "customer_email": f"{user.name}@example.com", "customer_contact": "0", "unique_customer_id": reference
+        })
+        if status != 201:
+            continue
+        user.journeys["placed"] += 1
+
+        _, body = user.call("GET /customer/orders", "GET", "/customer/orders?limit=5")
+        order_id = next((o["order_id"] for o in (body or {}).get("orders", [])
+                         if o.get("unique_customer_id") == reference), None)
+        if order_id is None:
+            user.journeys["not_found"] += 1
+            continue
+        for _ in range(polls):
+            user.call("GET /delivery/order/<order_id>", "GET", f"/delivery/order/{order_id}")
+
+
+def _restaurant(user, rng, tokens, stop_at, batch):
+    next_status = {"pending": "accepted", "accepted": "ready"}
+    for restaurant_id in itertools.cycle(tokens):
+        if time.monotonic() >= stop_at:
+            return
+        headers = _bearer(tokens[restaurant_id])
+        _, body = user.call("GET /restaurant/orders", "GET",
+                            f"/restaurant/orders?restaurant_id={restaurant_id}&fields=order_id,status", headers=headers)
+        waiting = [o for o in (body or {}).get("orders", []) if o.get("status") in next_status][:batch]
+        for order in waiting:
+            status = next_status[order["status"]]
+            code, _ = user.call("PUT /restaurant/order/<order_id>", "PUT", f"/restaurant/order/{order['order_id']}",
+                                {"status": status}, headers=headers)
+            if code == 200:
+                user.journeys[status] += 1
+        if rng.random() < 0.1:
+            user.call("GET /restaurant/stats", "GET", f"/restaurant/stats?restaurant_id={restaurant_id}",
+                      headers=headers)
+        if not waiting:
+            time.sleep(IDLE_SECONDS)
+
+
+def _courier(user, rng, partners, stop_at):
+    for partner_id, (_, token) in itertools.cycle(partners.items()):
+        if time.monotonic() >= stop_at:
+            return
+        headers = _bearer(token)
+        _, body = user.call("GET /delivery/ready", "GET", "/delivery/ready", headers=headers)
+        ready = body if isinstance(body, list) else []
+        for order in ready:
+            code, _ = user.call("PATCH /delivery/order/<order_id>", "PATCH", f"/delivery/order/{order['order_id']}",
+                                {"status": "delivered"}, headers=headers)
+            if code == 200:
+                user.journeys["delivered"] += 1
+        if rng.random() < 0.2:
+            user.call("PATCH /delivery/location", "PATCH", "/delivery/location", {
+                "partner_id": partner_id, "lat": round(52.35 + rng.random() * 0.1, 5),
+                "lon": round(4.85 + rng.random() * 0.1, 5)
+            }, headers=headers)
+        if not ready:
+            time.sleep(IDLE_SECONDS)
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def _summarize(records, seconds):
+    endpoints = {}
+    for endpoint, samples in sorted(records.items()):
+        latencies = sorted(ms for ms, _, _ in samples)
+        operations = sum((ops for _, _, ops in samples), Counter())
+        dynamodb_ops = sum(count for op, count in operations.items() if ":" not in op)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, status, _ in samples if not 200 <= status < 400),
+            "status_codes": dict(sorted(Counter(str(status) for _, status, _ in samples).items())),
+            "requests_per_s": round(len(samples) / seconds, 1),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "dynamodb_ops_per_request": round(dynamodb_ops / len(samples), 2),
+            "operations": dict(sorted(operations.items())),
+        }
+    return endpoints
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.realpath(__file__)),
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _print_results(results):
+    print(f"{'endpoint':<36}{'reqs':>7}{'err':>5}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'ddb/req':>9}")
+    for endpoint, row in results["endpoints"].items():
+        print(f"{endpoint:<36}{row['requests']:>7}{row['errors']:>5}{row['requests_per_s']:>8.1f}"
+              f"{row['p50_ms']:>8.1f}{row['p95_ms']:>8.1f}{row['p99_ms']:>8.1f}{row['dynamodb_ops_per_request']:>9.2f}")
+    totals = results["totals"]
+    print(f"{'total':<36}{totals['requests']:>7}{totals['errors']:>5}{totals['requests_per_s']:>8.1f}"
+          f"{'':>24}{totals['dynamodb_ops_per_request']:>9.2f}")
+    print("journeys:", results["journeys"])
+    print("background operations:", results["background_operations"])
+
+
+def _change(old, new):
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+
+def _print_comparison(old, new):
+    print(f"\nvs. {old.get('git_commit') or '?'} ({old.get('started_at', '?')})")
+    print(f"{'endpoint':<36}{'req/s':>16}{'p50':>16}{'p99':>16}{'ddb/req':>14}")
+    for endpoint, row in new["endpoints"].items():
+        before = old.get("endpoints", {}).get(endpoint)
+        if before is None:
+            print(f"{endpoint:<36}  (new)")
+            continue
+        print(f"{endpoint:<36}"
+              f"{row['requests_per_s']:>9.1f} {_change(before['requests_per_s'], row['requests_per_s']):>6}"
+              f"{row['p50_ms']:>9.1f} {_change(before['p50_ms'], row['p50_ms']):>6}"
+              f"{row['p99_ms']:>9.1f} {_change(before['p99_ms'], row['p99_ms']):>6}"
+              f"{before['dynamodb_ops_per_request']:>6.2f} → {row['dynamodb_ops_per_request']:<5.2f}")
+    for endpoint in old.get("endpoints", {}).keys() - new["endpoints"].keys():
+        print(f"{endpoint:<36}  (not in this run)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--customers", type=int, default=32, help="customer virtual users")
+    parser.add_argument("--restaurant-users", type=int, default=4, help="restaurant virtual users (share the restaurants)")
+    parser.add_argument("--couriers", type=int, default=4, help="courier virtual users (share the partners)")
+    parser.add_argument("--restaurants", type=int, default=20)
+    parser.add_argument("--menu-items", type=int, default=12)
+    parser.add_argument("--partners", type=int, default=40)
+    parser.add_argument("--history", type=int, default=2000, help="orders seeded before the run")
+    parser.add_argument("--polls", type=int, default=3, help="polls of each placed order")
+    parser.add_argument("--batch", type=int, default=5, help="orders a restaurant advances per look")
+    parser.add_argument("--wsgi-threads", type=int, default=16)
+    parser.add_argument("--rtt-ms", type=float, default=0, help="simulated DynamoDB round trip")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="results file (default: workload-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    started_at = datetime.now(timezone.utc)
+    with local_aws() as db:
+        from app import create_app
+        from app.services.metrics import snapshot
+        from app.services.outbox import outbox, start_outbox
+        from app.services.scheduler import start_scheduler, stop_scheduler
+        from app.services.passwords import hash_password
+
+        restaurants = seed_catalog(db, args.restaurants, args.menu_items, seed=args.seed)
+        partner_names = seed_partners(db, args.partners, seed=args.seed)
+        customers = [f"customer-{n}" for n in range(args.customers)]
+        password_hash = hash_password(PASSWORD)
+        seed_users(db, "customer", customers, password_hash)
+        seed_users(db, "restaurant", restaurants, password_hash)
+        seed_users(db, "delivery", partner_names, password_hash)
+        seed_orders(db, args.history, customers=args.customers, restaurants=args.restaurants,
+                    partners=args.partners, seed=args.seed)
+
+        app = create_app()
+        client = app.test_client()
+
+        def login(username):
+            return client.post("/auth/login", json={"username": username, "password": PASSWORD}).json["token"]
+
+        with ThreadPoolExecutor(8) as pool:
+            tokens = dict(zip(customers + restaurants + partner_names,
+                              pool.map(login, customers + restaurants + partner_names)))
+
+        operations = OperationCounter()
+        operations.attach(db.dynamodb.meta.client, "dynamodb")
+        operations.attach(db.sns, "sns")
+        if args.rtt_ms:
+            rtt = args.rtt_ms / 1000
+            db.dynamodb.meta.client.meta.events.register("before-send.dynamodb", lambda **kwargs: time.sleep(rtt))
+
+        # The background work of a serving process (see run.py): delivery timers, notification outbox
+        start_scheduler()
+        start_outbox()
+        port, stop = _serve_wsgi(app, args.wsgi_threads)
+        stop_at = time.monotonic() + args.seconds
+
+        users, workers = [], []
+
+        def user(name):
+            users.append(VirtualUser(name, port, operations))
+            return users[-1]
+
+        for n, username in enumerate(customers):
+            customer = user(username)
+            customer.headers = _bearer(tokens[username])
+            workers.append((_customer, (customer, random.Random(args.seed + n), restaurants, stop_at, args.polls)))
+        for n in range(args.restaurant_users):
+            owned = {r: tokens[r] for r in restaurants[n::args.restaurant_users]}
+            workers.append((_restaurant, (user(f"restaurant-user-{n}"), random.Random(args.seed + 1000 + n), owned,
+                                          stop_at, args.batch)))
+        for n in range(args.couriers):
+            owned = {f"p{i}": (partner_names[i], tokens[partner_names[i]])
+                     for i in range(n, args.partners, args.couriers)}
+            workers.append((_courier, (user(f"courier-{n}"), random.Random(args.seed + 2000 + n), owned, stop_at)))
+
+        began = time.perf_counter()
+        threads = [threading.Thread(target=target, args=target_args) for target, target_args in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        stop()
+        stop_scheduler()
+        outbox.stop()
+
+        records = defaultdict(list)
+        for virtual_user in users:
+            for endpoint, samples in virtual_user.records.items():
+                records[endpoint].extend(samples)
+        journeys = sum((virtual_user.journeys for virtual_user in users), Counter())
+        endpoints = _summarize(records, elapsed)
+        requests = sum(row["requests"] for row in endpoints.values())
+        dynamodb_ops = sum(row["dynamodb_ops_per_request"] * row["requests"] for row in endpoints.values())
+        results = {
+            "benchmark": "workload",
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "config": vars(args),
+            "seconds": round(elapsed, 2),
+            "totals": {
+                "requests": requests,
+                "errors": sum(row["errors"] for row in endpoints.values()),
+                "requests_per_s": round(requests / elapsed, 1),
+                "dynamodb_ops_per_request": round(dynamodb_ops / requests, 2) if requests else 0.0,
+            },
+            "journeys": dict(sorted(journeys.items())),
+            "endpoints": endpoints,
+            "background_operations": dict(sorted(operations.background.items())),
+            "server": snapshot(),
+        }
+
+    output = args.output or f"workload-{started_at:%Y%m%d-%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True, default=str)
+    _print_results(results)
+    print(f"results: {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            _print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
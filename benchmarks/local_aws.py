@@ -0,0 +1,167 @@
+# benchmarks/local_aws.py
+"""
+Local DynamoDB/SNS stand-in for the benchmarks (moto, in-process).
+
+The app's boto3 clients are created on first use (app.services.aws), so the
+first DynamoDB / SNS call must happen *inside* `local_aws()` to hit the stand-in.
+"""
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+REGION = "eu-north-1"
+# Account baked into the SNS topic ARNs used by the handlers
+ACCOUNT_ID = "075664900901"
+TOPICS = ["RestaurantAlert"]
+
+# Primary keys of the tables the app uses (see app/services/db.py): partition key or (partition, sort)
+TABLE_KEYS = {
+    "Orders": "order_id",
+    "Users": "username",
+    "Menus": "menu_id",
+    "Restaurants": "restaurant_id",
+    "DeliveryTable": "partner_id",
+    "Leases": "lease_name",
+    "RestaurantStats": ("restaurant_id", "bucket"),
+}
+
+
+def create_tables(dynamodb, table_indexes):
+    for name, key in TABLE_KEYS.items():
+        keys = key if isinstance(key, tuple) else (key,)
+        indexes = table_indexes.get(name, {})
+        attributes = set(keys)
+        gsis = []
+        for index_name, (hash_key, range_key) in indexes.items():
+            key_schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+            attributes.add(hash_key)
+            if range_key:
+                key_schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+                attributes.add(range_key)
+            gsis.append({"IndexName": index_name, "KeySchema": key_schema,
+                         "Projection": {"ProjectionType": "ALL"}})
+
+        params = {
+            "TableName": name,
+            "KeySchema": [{"AttributeName": k, "KeyType": t} for k, t in zip(keys, ["HASH", "RANGE"])],
+            "AttributeDefinitions": [{"AttributeName": a, "AttributeType": "S"} for a in sorted(attributes)],
+            "BillingMode": "PAY_PER_REQUEST",
+        }
+        if gsis:
+            params["GlobalSecondaryIndexes"] = gsis
+        dynamodb.create_table(**params)
+
+
+def _serialize_dynamodb_writes():
+    """
+    moto runs TransactWriteItems by snapshotting the tables and restoring the
+    snapshot when a condition fails, which drops writes other threads made in
+    between. DynamoDB isolates transactions itself; here every write takes one lock.
+    """
+    from moto.dynamodb.models import DynamoDBBackend
+    if getattr(DynamoDBBackend, "_writes_serialized", False):
+        return
+    lock = threading.RLock()
+
+    def locked(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return wrapper
+
+    for name in ("put_item", "update_item", "delete_item", "transact_write_items"):
+        setattr(DynamoDBBackend, name, locked(getattr(DynamoDBBackend, name)))
+    DynamoDBBackend._writes_serialized = True
+
+
+@contextmanager
+def local_aws():
+    """Start the moto stand-in, create the app tables and yield app.services.db."""
+    from moto import mock_aws
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", REGION)
+    os.environ.setdefault("MOTO_ACCOUNT_ID", ACCOUNT_ID)
+    # The benchmarks measure capacity; bench_rate_limit turns the limiter back on
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    _serialize_dynamodb_writes()
+    with mock_aws():
+        from app.services import db
+        create_tables(db.dynamodb, db.TABLE_INDEXES)
+        for topic in TOPICS:
+            db.sns.create_topic(Name=topic)
+        yield db
+
+
+def seed_orders(db, count, customers=100, restaurants=20, partners=50, seed=7):
+    """Write `count` orders spread over the given number of customers/restaurants/partners."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    statuses = ["pending", "accepted", "ready", "delivered", "rejected"]
+    with db.orders_table.batch_writer() as batch:
+        for i in range(count):
+            status = rng.choice(statuses)
+            order = {
+                "order_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "customer": f"customer-{rng.randrange(customers)}",
+                "restaurant_id": f"restaurant-{rng.randrange(restaurants)}",
+                "status": status,
+                "order_time": (start + timedelta(seconds=i)).isoformat(),
+                "items": [{"name": "Margherita", "size": "medium", "quantity": 1}],
+            }
+            if status in ("ready", "delivered"):
+                order["delivery_partner_name"] = f"partner-{rng.randrange(partners)}"
+            batch.put_item(Item=order)
+
+
+def _coordinate(rng, base):
+    # Positions around one city, as the Decimals the app writes
+    return Decimal(str(round(base + rng.random() * 0.1, 5)))
+
+
+def seed_catalog(db, restaurants, menu_items=10, seed=7):
+    """Restaurants "restaurant-<n>" (with a position) and `menu_items` menu items each; returns the restaurant ids."""
+    rng = random.Random(seed)
+    restaurant_ids = [f"restaurant-{n}" for n in range(restaurants)]
+    with db.restaurants_table.batch_writer() as batch:
+        for restaurant_id in restaurant_ids:
+            batch.put_item(Item={
+                "restaurant_id": restaurant_id, "name": restaurant_id.replace("-", " ").title(),
+                "lat": _coordinate(rng, 52.35), "lon": _coordinate(rng, 4.85)
+            })
+    with db.menus_table.batch_writer() as batch:
+        for restaurant_id in restaurant_ids:
+            for n in range(menu_items):
+                batch.put_item(Item={
+                    "menu_id": f"{restaurant_id}-m{n}", "restaurant_id": restaurant_id, "name": f"Dish {n}",
+                    "price_small": "8", "price_medium": "10", "price_large": "12.5",
+                    "prep_time": str(rng.randint(5, 25)), "is_available": True
+                })
+    return restaurant_ids
+
+
+def seed_users(db, role, usernames, password_hash):
+    """Users items for `usernames`, all with the same (precomputed) password hash."""
+    with db.users_table.batch_writer() as batch:
+        for username in usernames:
+            batch.put_item(Item={"username": username, "password": password_hash, "role": role})
+
+
+def seed_partners(db, count, seed=7):
+    """Idle delivery partners "p<n>" named "partner-<n>" (the delivery users' names), with a position."""
+    rng = random.Random(seed)
+    with db.delivery_partners_table.batch_writer() as batch:
+        for n in range(count):
+            batch.put_item(Item={
+                "partner_id": f"p{n}", "name": f"partner-{n}", "status": "idle",
+                "lat": _coordinate(rng, 52.35), "lon": _coordinate(rng, 4.85)
+            })
+    return [f"partner-{n}" for n in range(count)]
@@ -0,0 +1,100 @@
+# benchmarks/local_redis.py
+"""
+In-process stand-in for the Redis features the app uses, for the benchmarks.
+
+Covers what the shared backends call: GET / SET / DELETE (catalog cache),
+PUBLISH / SUBSCRIBE (event hub) and the rate limiter's token bucket script.
+There is no Lua here: `register_script` returns a Python port of each script
+the app registers, run under one lock as Redis runs scripts atomically.
+Pass an instance wherever a backend takes a `redis.Redis` client.
+"""
+import math
+import queue
+import threading
+import time
+
+
+class _PubSub:
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        with self.server.lock:
+            self.server.subscribers.setdefault(channel, []).append(self.messages)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+
+class LocalRedis:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.values = {}             # key -> (value, expires at or None)
+        self.hashes = {}             # key -> (dict, expires at or None)
+        self.subscribers = {}
+        self.script_calls = 0
+
+    def _live(self, store, key):
+        entry = store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del store[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self.lock:
+            entry = self._live(self.values, key)
+            return None if entry is None else entry[0]
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.values[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(1 for key in keys if self.values.pop(key, None) or self.hashes.pop(key, None))
+
+    def publish(self, channel, message):
+        data = message.encode() if isinstance(message, str) else message
+        with self.lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for target in targets:
+            target.put({"type": "message", "channel": channel, "data": data})
+        return len(targets)
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return _PubSub(self)
+
+    def register_script(self, source):
+        from app.utils import rate_limit
+        ports = {rate_limit.TOKEN_BUCKET_SCRIPT: self._token_bucket}
+        if source not in ports:
+            raise NotImplementedError("LocalRedis has no port of this script")
+        port = ports[source]
+
+        def run(keys=(), args=()):
+            with self.lock:
+                self.script_calls += 1
+                return port(keys, args)
+        return run
+
+    def _token_bucket(self, keys, args):
+        # Port of rate_limit.TOKEN_BUCKET_SCRIPT (state in a hash, server clock, expiry once full again)
+        rate, burst, cost = (float(arg) for arg in args)
+        now = time.time()
+        entry = self._live(self.hashes, keys[0])
+        state = entry[0] if entry is not None else {}
+        tokens = float(state.get("tokens", burst))
+        elapsed = max(now - float(state.get("ts", now)), 0)
+        tokens = min(burst, tokens + elapsed * rate)
+        allowed, retry_after = 0, 0
+        if tokens >= cost:
+            tokens -= cost
+            allowed = 1
+        else:
+            retry_after = (cost - tokens) / rate
+        self.hashes[keys[0]] = ({"tokens": str(tokens), "ts": str(now)}, time.monotonic() + math.ceil(burst / rate) + 1)
+        return [allowed, str(retry_after), str(tokens)]